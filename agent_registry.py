@@ -0,0 +1,176 @@
+"""Reuse remote agent definitions across runs.
+
+Every agent created through ``AgentRegistry`` carries a fingerprint of its
+definition (name, model deployment, instructions, temperature, tools and
+tool resources) in its metadata. A later run asking for an identical
+definition gets the existing agent back instead of creating a new one; only
+definitions that changed are recreated. Superseded agents are removed by a
+policy-driven garbage collector rather than an interactive prompt.
+
+Concurrent runs on one project client use sessions of one registry
+(``registry.session()``). Sessions share the list of remote agents and
+create each definition at most once between them; an agent is only rolled
+back if no other session uses it, and garbage collection spares the agents
+of every session.
+"""
+import os
+import json
+import asyncio
+import hashlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+MANAGED_BY = "connected_agents"
+
+# off: never delete; orphans: delete unused agents created by this registry;
+# all: delete every agent in the project that is not in use by this run
+GC_POLICIES = ("off", "orphans", "all")
+DEFAULT_GC_POLICY = os.environ.get("AGENT_GC_POLICY", "orphans")
+# Orphans younger than this are left alone, as they may belong to a concurrent run
+DEFAULT_GC_MIN_AGE = timedelta(minutes=float(os.environ.get("AGENT_GC_MIN_AGE_MINUTES", "60")))
+
+
+def _jsonable(value):
+    """Convert SDK models (tool definitions, tool resources) to plain JSON data"""
+    if hasattr(value, "as_dict"):
+        return value.as_dict()
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+def fingerprint_definition(model, name, instructions, temperature=None, tools=None, tool_resources=None):
+    """Return a stable hash of everything that defines an agent's behaviour"""
+    definition = {
+        "model": model,
+        "name": name,
+        "instructions": instructions,
+        "temperature": temperature,
+        "tools": _jsonable(tools or []),
+        "tool_resources": _jsonable(tool_resources),
+    }
+    payload = json.dumps(definition, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AgentRegistry:
+    """Fingerprint-keyed lookup of remote agents for one project client.
+
+    ``created`` and ``reused`` list the agents this registry (or session)
+    handed out; ``in_use`` holds those of every session.
+    """
+
+    def __init__(self, project_client, shared=None):
+        self.project_client = project_client
+        self.created = []
+        self.reused = []
+        # State common to all sessions: remote agents, locks, agents in use and how many sessions claim each
+        self._shared = shared or SimpleNamespace(
+            remote=None, list_lock=asyncio.Lock(), definition_locks={}, in_use=set(), claims=Counter(),
+        )
+
+    def session(self):
+        """A registry for one run that shares this one's agents, locks and in-use set"""
+        return AgentRegistry(self.project_client, self._shared)
+
+    @property
+    def in_use(self):
+        return self._shared.in_use
+
+    @property
+    def _remote(self):
+        return self._shared.remote
+
+    @_remote.setter
+    def _remote(self, agents):
+        self._shared.remote = agents
+
+    async def refresh(self):
+        """Reload the list of remote agents"""
+        self._remote = [agent async for agent in self.project_client.agents.list_agents()]
+        return self._remote
+
+    def _find(self, name, fingerprint):
+        matches = [
+            agent for agent in self._remote
+            if agent.name == name and (agent.metadata or {}).get("fingerprint") == fingerprint
+        ]
+        # Prefer the newest agent if duplicates exist
+        return max(matches, key=lambda a: a.created_at) if matches else None
+
+    async def get_or_create(self, model, name, instructions, temperature=None, tools=None, tool_resources=None):
+        """Return an agent matching the definition, creating it only if none exists"""
+        async with self._shared.list_lock:
+            if self._remote is None:
+                await self.refresh()
+
+        fingerprint = fingerprint_definition(model, name, instructions, temperature, tools, tool_resources)
+        # Sessions asking for the same definition at once get one agent
+        async with self._shared.definition_locks.setdefault((name, fingerprint), asyncio.Lock()):
+            agent = self._find(name, fingerprint)
+            if agent is not None:
+                self.reused.append(agent.id)
+            else:
+                agent = await self.project_client.agents.create_agent(
+                    model=model,
+                    name=name,
+                    instructions=instructions,
+                    temperature=temperature,
+                    tools=tools,
+                    tool_resources=tool_resources,
+                    metadata={"managed_by": MANAGED_BY, "fingerprint": fingerprint},
+                )
+                self._remote.append(agent)
+                self.created.append(agent.id)
+            self.in_use.add(agent.id)
+            self._shared.claims[agent.id] += 1
+        return agent
+
+    async def delete_if_created(self, agent):
+        """Delete an agent only if this registry created it and no other session uses it (rolls back failed provisioning)"""
+        if agent.id not in self.created:
+            return
+        self.created.remove(agent.id)
+        self._shared.claims[agent.id] -= 1
+        if self._shared.claims[agent.id] > 0:
+            return
+        await self.project_client.agents.delete_agent(agent.id)
+        del self._shared.claims[agent.id]
+        self.in_use.discard(agent.id)
+        self._remote = [a for a in self._remote if a.id != agent.id]
+
+    async def collect_garbage(self, policy=DEFAULT_GC_POLICY, min_age=DEFAULT_GC_MIN_AGE, log=None):
+        """Delete agents that are no longer referenced, according to ``policy``.
+
+        Never prompts; returns the list of deleted agent IDs. ``log(level, text)``
+        receives progress messages, where level is "info" or "error".
+        """
+        if policy not in GC_POLICIES:
+            raise ValueError(f"Unknown agent GC policy {policy!r}, expected one of {GC_POLICIES}")
+        log = log or (lambda level, text: None)
+        if policy == "off":
+            return []
+
+        cutoff = datetime.now(timezone.utc) - min_age
+        candidates = []
+        for agent in await self.refresh():
+            if agent.id in self.in_use:
+                continue
+            if policy == "orphans":
+                if (agent.metadata or {}).get("managed_by") != MANAGED_BY or agent.created_at > cutoff:
+                    continue
+            candidates.append(agent)
+
+        deleted = []
+        for agent in candidates:
+            try:
+                await self.project_client.agents.delete_agent(agent.id)
+                deleted.append(agent.id)
+                log("info", f"Deleted agent {agent.name} ({agent.id})")
+            except Exception as e:
+                log("error", f"Failed to delete agent {agent.id}: {e}")
+        self._remote = [agent for agent in self._remote if agent.id not in deleted]
+        return deleted
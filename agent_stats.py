@@ -0,0 +1,244 @@
+"""Measured per-agent latency, time to first token, token usage and tool-call timings.
+
+Group chat turns are timed in-process: a turn starts when the manager selects
+an agent and ends when its response reaches the manager, and the first
+streamed text chunk in between marks the time to first token. Connected-agent
+and file-search calls run server-side, so their durations and token usage are
+read back from the run steps of each turn (service timestamps have one-second
+resolution).
+
+Durations go into streaming histograms with a fixed relative error, so memory
+stays constant however many turns a run has.
+"""
+import math
+import time
+import asyncio
+from collections import deque
+from datetime import datetime
+
+
+class StreamingHistogram:
+    """Log-bucketed histogram of non-negative values with quantiles accurate to ``relative_error``"""
+
+    def __init__(self, relative_error=0.02, min_value=1e-4):
+        self.relative_error = relative_error
+        self.min_value = min_value
+        self._gamma = (1 + relative_error) / (1 - relative_error)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        value = max(float(value), 0.0)
+        index = math.ceil(math.log(max(value, self.min_value)) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile (0 <= q <= 1), or None if nothing was recorded"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Bucket midpoint in log space; clamp to the observed range
+                estimate = 2 * self._gamma ** index / (self._gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self, digits=3):
+        """Count, mean, p50/p95/p99 and max, rounded for JSON output"""
+        def rounded(value):
+            return round(value, digits) if value is not None else None
+
+        return {
+            "count": self.count,
+            "mean": rounded(self.mean),
+            "p50": rounded(self.quantile(0.50)),
+            "p95": rounded(self.quantile(0.95)),
+            "p99": rounded(self.quantile(0.99)),
+            "max": rounded(self.max),
+        }
+
+
+class TurnRecord:
+    __slots__ = ("timestamp", "content_length", "response_time", "time_to_first_token")
+
+    def __init__(self, timestamp, content_length, response_time, time_to_first_token):
+        self.timestamp = timestamp
+        self.content_length = content_length
+        self.response_time = response_time
+        self.time_to_first_token = time_to_first_token
+
+    def to_dict(self):
+        return {
+            "timestamp": self.timestamp.isoformat(),
+            "content_length": self.content_length,
+            "response_time": round(self.response_time, 3),
+            "time_to_first_token": round(self.time_to_first_token, 3) if self.time_to_first_token is not None else None,
+        }
+
+
+class AgentStats:
+    """Timing and token statistics for one agent"""
+
+    def __init__(self, recent_size=5):
+        self.invocations = 0
+        self.first_invocation = None
+        self.last_invocation = None
+        self.latency = StreamingHistogram()
+        self.time_to_first_token = StreamingHistogram()
+        self.tool_calls = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        # Questions answered from the response cache without calling the agent
+        self.cache_hits = 0
+        self.recent = deque(maxlen=recent_size)
+
+    @property
+    def total_response_time(self):
+        return self.latency.total
+
+    @property
+    def avg_response_time(self):
+        return self.latency.mean or 0
+
+    def record_invocation(self, latency, content_length=None, time_to_first_token=None):
+        now = datetime.now()
+        self.invocations += 1
+        self.last_invocation = now
+        if self.first_invocation is None:
+            self.first_invocation = now
+        self.latency.record(latency)
+        if time_to_first_token is not None:
+            self.time_to_first_token.record(time_to_first_token)
+        self.recent.append(TurnRecord(now, content_length, latency, time_to_first_token))
+
+    def record_tokens(self, usage):
+        """Add a run or run step ``usage`` object (may be None when the service omits it)"""
+        if usage is None:
+            return
+        self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+        self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def record_cache_hit(self):
+        self.cache_hits += 1
+
+    def record_tool_call(self, tool, duration):
+        self.tool_calls.setdefault(tool, StreamingHistogram()).record(duration)
+
+    def to_dict(self):
+        return {
+            "invocations": self.invocations,
+            "latency": self.latency.summary(),
+            "time_to_first_token": self.time_to_first_token.summary(),
+            "tool_calls": {tool: histogram.summary() for tool, histogram in self.tool_calls.items()},
+            "tokens": {
+                "prompt": self.prompt_tokens,
+                "completion": self.completion_tokens,
+                "total": self.prompt_tokens + self.completion_tokens,
+            },
+            "cache_hits": self.cache_hits,
+        }
+
+
+class AgentStatsCollector:
+    """Times group chat turns and gathers server-side tool-call timings for every agent of one run"""
+
+    def __init__(self, on_tool_call=None):
+        """``on_tool_call(agent_name, tool, started_at, completed_at)`` receives every tool call found in run steps"""
+        self.on_tool_call = on_tool_call
+        self.agents = {}
+        self._turn_started = {}
+        self._first_token = {}
+        self._pending = set()
+
+    def total_tokens(self):
+        """Prompt plus completion tokens recorded so far across all agents"""
+        return sum(stats.prompt_tokens + stats.completion_tokens for stats in self.agents.values())
+
+    def get(self, agent_name):
+        if agent_name not in self.agents:
+            self.agents[agent_name] = AgentStats()
+        return self.agents[agent_name]
+
+    def turn_started(self, agent_name):
+        """The group chat manager selected ``agent_name`` to speak next"""
+        self._turn_started[agent_name] = time.perf_counter()
+        self._first_token.pop(agent_name, None)
+
+    def chunk_received(self, agent_name, text):
+        """A streamed chunk arrived; the first one with text marks the time to first token"""
+        if text and agent_name in self._turn_started and agent_name not in self._first_token:
+            self._first_token[agent_name] = time.perf_counter()
+
+    def turn_finished(self, message, agents_client=None):
+        """Record a completed turn; with ``agents_client``, also fetch its run steps in the background"""
+        agent_name = message.name or str(message.role)
+        started = self._turn_started.pop(agent_name, None)
+        if started is None:
+            return
+        finished = time.perf_counter()
+        first_token = self._first_token.pop(agent_name, None)
+        self.get(agent_name).record_invocation(
+            finished - started,
+            content_length=len(str(message.content)),
+            time_to_first_token=first_token - started if first_token is not None else None,
+        )
+        thread_id = (message.metadata or {}).get("thread_id")
+        if agents_client is not None and thread_id:
+            task = asyncio.create_task(self.collect_run_steps(agents_client, agent_name, thread_id))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def collect_run_steps(self, agents_client, agent_name, thread_id):
+        """Record token usage and tool-call durations of the latest run on ``thread_id``"""
+        async for run in agents_client.runs.list(thread_id=thread_id, limit=1, order="desc"):
+            self.get(agent_name).record_tokens(run.usage)
+            await self._collect_steps(agents_client, agent_name, thread_id, run.id)
+            break
+
+    def _record_tool_call(self, agent_name, tool, step):
+        self.get(agent_name).record_tool_call(tool, (step.completed_at - step.created_at).total_seconds())
+        if self.on_tool_call:
+            self.on_tool_call(agent_name, tool, step.created_at, step.completed_at)
+
+    async def _collect_steps(self, agents_client, agent_name, thread_id, run_id):
+        async for step in agents_client.run_steps.list(thread_id=thread_id, run_id=run_id):
+            details = step.step_details
+            if getattr(details, "type", None) != "tool_calls" or not (step.created_at and step.completed_at):
+                continue
+            # Tool calls of one step run in parallel and share its duration
+            for tool_call in details.tool_calls or []:
+                if tool_call.type != "connected_agent":
+                    self._record_tool_call(agent_name, tool_call.type, step)
+                    continue
+                connected = tool_call.connected_agent
+                self._record_tool_call(agent_name, f"connected_agent.{connected.name}", step)
+                # The connected agent ran on its own thread; attribute its usage and file searches to it
+                connected_stats = self.get(connected.name)
+                connected_stats.record_invocation(
+                    (step.completed_at - step.created_at).total_seconds(),
+                    content_length=len(connected.output or ""),
+                )
+                if connected.thread_id and connected.run_id:
+                    connected_run = await agents_client.runs.get(thread_id=connected.thread_id, run_id=connected.run_id)
+                    connected_stats.record_tokens(connected_run.usage)
+                    await self._collect_steps(agents_client, connected.name, connected.thread_id, connected.run_id)
+
+    async def drain(self):
+        """Wait for background run-step collection; failures only cost statistics"""
+        while self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
@@ -1,205 +1,212 @@
-from flask import Flask, jsonify, render_template_string, send_from_directory
+from quart import Quart, jsonify, make_response, send_from_directory, request
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import asyncio
-import json
+import contextlib
+import glob
 import os
+import time
+import uuid
 from dotenv import load_dotenv
 from datetime import datetime
-import threading
-import queue
-import random
 
-from azure.identity.aio import DefaultAzureCredential
 from semantic_kernel.agents import (
-    AzureAIAgent,
     AzureAIAgentSettings,
     AzureAIAgentThread,
     GroupChatOrchestration,
     RoundRobinGroupChatManager,
     BooleanResult,
 )
-from azure.ai.agents.models import ConnectedAgentTool
 from semantic_kernel.agents.runtime import InProcessRuntime
-from semantic_kernel.contents import ChatMessageContent, ChatHistory
-from azure.ai.projects.aio import AIProjectClient
-from azure.ai.agents.models import FilePurpose, FileSearchTool, ToolResources
+from semantic_kernel.contents import ChatMessageContent, ChatHistory, StreamingChatMessageContent
 
-# Import agent instructions and custom manager from main.py
+# Import the custom manager and provisioning from main.py
 from main import (
-    CRITIC_AGENT_INSTRUCTIONS,
-    RECRUITER_AGENT_INSTRUCTIONS,
-    JOB_POSTING_AGENT_INSTRUCTIONS,
-    SCREENING_AGENT_INSTRUCTIONS,
+    DEFAULT_MAX_ROUNDS,
     CustomGroupChatManager,
-    RESUME_NAMES
+    provision_agents,
+    recruiter_plugins,
 )
+from agent_stats import AgentStatsCollector
+from broadcaster import Broadcaster
+from candidate_records import ResultCollector, open_sinks
+from message_store import MessageStore
+from clients import ProjectClientPool, agent_class, model_deployment_name
+from response_cache import ResponseCache
+from runs import RunManager
+from scheduler import PRIORITIES
+from telemetry import RUNS_IN_FLIGHT, RUNS_QUEUED, SSE_SUBSCRIBERS, RunTelemetry, configure_tracing
 
-app = Flask(__name__)
+app = Quart(__name__)
 load_dotenv()
 
-# Global queue for SSE messages
-message_queue = queue.Queue()
+# Credential, project client and file manifest shared by all runs
+client_pool = ProjectClientPool()
+
+# Shared by all runs so a repeated question is answered without calling the agent (RESPONSE_CACHE)
+response_cache = ResponseCache.from_env()
+
+# Every run's ranked candidates are written to these as they are produced (RESULT_SINKS)
+result_sinks = open_sinks()
+
+# Resumes screened per run (0 = every PDF in resumes/); the demo default keeps runs short
+MAX_RESUMES = int(os.environ.get("MAX_RESUMES", "5"))
+
+# Forward agent responses to SSE clients token by token as message.delta events
+DEFAULT_STREAM_RESPONSES = os.environ.get("STREAM_RESPONSES", "1").lower() not in ("0", "false", "no")
+# Deltas arriving faster than this are coalesced so slow clients are not flooded
+DEFAULT_STREAM_DELTA_INTERVAL = float(os.environ.get("STREAM_DELTA_INTERVAL", "0.05"))
 
 class AgentWorkflow:
-    def __init__(self):
+    def __init__(self, run_id=None, pool=None, stream_responses=DEFAULT_STREAM_RESPONSES):
+        self.run_id = run_id
+        self.pool = pool or client_pool
+        self.stream_responses = stream_responses
+        # Responses being streamed, by agent name: message ID, unsent text and last flush time
+        self._streams = {}
         self.status = "idle"
-        self.messages = []
+        # Recent messages in memory; the full transcript goes to TRANSCRIPT_DIR if set
+        self.messages = MessageStore.for_run(run_id)
         self.agents_created = []
         self.vector_stores = []
-        self.credential = None
         self.project_client = None
         
-        # Agent statistics tracking
-        self.agent_stats = {}
+        # Fans this run's messages out to every connected SSE client
+        self.broadcaster = Broadcaster()
+        
+        # One trace per run, plus measured per-agent latency, token and tool-call statistics
+        self.telemetry = RunTelemetry(run_id)
+        self.agent_stats = AgentStatsCollector(on_tool_call=self.telemetry.tool_call)
         self.workflow_start_time = None
+        self.provisioning_timings = {}
+        # Why the group chat ended: ranking_complete, critic_completed, token_budget, time_budget or max_rounds
+        self.termination_reason = None
+        # Ranked candidates as typed records, served by /api/runs/<id>/results
+        self.results = ResultCollector(run_id, result_sinks, on_error=self.result_sink_failed)
         
     async def run_workflow(self):
         """Run the complete agent workflow"""
         self.status = "running"
         self.workflow_start_time = datetime.now()
         self.add_message("system", "Starting agent workflow...")
+        self.telemetry.start()
+        runtime = None
+        gc_task = None
         
         try:
-            endpoint = os.environ["AZURE_AI_AGENT_ENDPOINT"]
-            deployment_name = os.environ["AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME"]
-            
-            # Create credential and client that will persist for the entire workflow
-            self.credential = DefaultAzureCredential()
-            self.project_client = AIProjectClient(endpoint=endpoint, credential=self.credential)
+            deployment_name = model_deployment_name(self.pool.backend)
             
-            # Upload files
-            self.add_message("system", "Uploading job description PDF...")
-            job_desc_file = await self.project_client.agents.files.upload_and_poll(
-                file_path="job_description.pdf", 
-                purpose=FilePurpose.AGENTS
-            )
-            
-            self.add_message("system", "Uploading resumes...")
-            resume_files = []
-            for resume_name in RESUME_NAMES[:5]:  # Limit to 5 for demo
-                resume_path = os.path.join("resumes", resume_name)
-                if os.path.exists(resume_path):
-                    file_obj = await self.project_client.agents.files.upload_and_poll(
-                        file_path=resume_path,
-                        purpose=FilePurpose.AGENTS
-                    )
-                    resume_files.append(file_obj)
+            # The credential and client are shared across runs and outlive this workflow
+            self.project_client = await self.pool.get_client()
+            # Shared by all runs, which share its uploads and vector store locks
+            manifest = self.pool.manifest
             
-            # Create vector stores
-            self.add_message("system", "Creating vector store for resumes...")
-            resume_file_ids = [f.id for f in resume_files]
-            resumes_vector_store = await self.project_client.agents.vector_stores.create_and_poll(
-                file_ids=resume_file_ids,
-                name="resumes_vector_store"
+            # Provision files, vector stores and agents; independent steps run concurrently
+            self.add_message("system", "Provisioning files, vector stores and agents...")
+            resume_paths = sorted(glob.glob(os.path.join("resumes", "*.pdf")))
+            if MAX_RESUMES:
+                resume_paths = resume_paths[:MAX_RESUMES]
+            # A session of the pool's registry: concurrent runs share agents instead of racing to create them
+            registry = self.pool.registry.session()
+            provisioned, graph = await provision_agents(
+                self.project_client,
+                deployment_name,
+                manifest,
+                registry,
+                resume_paths,
+                on_step=self.report_provisioning_step,
+                on_upload_progress=self.report_upload_progress,
+                local_tools=response_cache is not None,
             )
-            self.vector_stores.append(resumes_vector_store.id)
+            self.provisioning_timings = graph.timings
             
-            self.add_message("system", "Creating vector store for job description...")
-            jd_vector_store = await self.project_client.agents.vector_stores.create_and_poll(
-                file_ids=[job_desc_file.id],
-                name="job_description_vector_store"
-            )
-            self.vector_stores.append(jd_vector_store.id)
+            screening_agents = provisioned["screening_agents"]
+            sharded = len(screening_agents) > 1
+            # With RETRIEVAL_BACKEND=local there are no vector stores, the agents search in-process
+            local_search = bool(provisioned["search_tools"])
+            resume_store_ids = [[store.id] for store in provisioned["resumes_vector_stores"]] or [[]] * len(screening_agents)
+            jd_store_ids = [] if local_search else [provisioned["job_description_vector_store"].id]
+            self.vector_stores.extend(sum(resume_store_ids, []) + jd_store_ids)
+            search_tool = "search_documents" if local_search else "file_search"
             
-            # Create agents with statistics tracking
-            self.add_message("system", "Creating JobPosting agent...")
-            jd_file_search_tool = FileSearchTool(vector_store_ids=[jd_vector_store.id])
-            workflow_agent_def = await self.project_client.agents.create_agent(
-                model=deployment_name,
-                name="JobPosting_agent",
-                instructions=JOB_POSTING_AGENT_INSTRUCTIONS,
-                tools=jd_file_search_tool.definitions,
-                tool_resources=ToolResources(file_search={"vector_store_ids": [jd_vector_store.id]})
-            )
+            # Register agents with statistics tracking
             self.agents_created.append({
                 "name": "JobPosting_agent", 
-                "id": workflow_agent_def.id,
+                "id": provisioned["JobPosting_agent"].id,
                 "description": "Analyzes job postings and requirements",
-                "tools": ["file_search"],
-                "vector_stores": [jd_vector_store.id]
+                "tools": [search_tool],
+                "vector_stores": jd_store_ids
             })
-            self.init_agent_stats("JobPosting_agent")
-            
-            self.add_message("system", "Creating CandidateScreening agent...")
-            screening_file_search_tool = FileSearchTool(vector_store_ids=[resumes_vector_store.id])
-            screening_agent_def = await self.project_client.agents.create_agent(
-                model=deployment_name,
-                name="CandidateScreening_agent",
-                instructions=SCREENING_AGENT_INSTRUCTIONS,
-                tools=screening_file_search_tool.definitions,
-                tool_resources=ToolResources(file_search={"vector_store_ids": [resumes_vector_store.id]})
+            self.agents_created.extend(
+                {
+                    "name": agent.name, 
+                    "id": agent.id,
+                    "description": "Evaluates candidate resumes against job requirements"
+                                   + (f" (shard {shard + 1} of {len(screening_agents)})" if sharded else ""),
+                    "tools": [search_tool],
+                    "vector_stores": store_ids
+                }
+                for shard, (agent, store_ids) in enumerate(zip(screening_agents, resume_store_ids))
             )
-            self.agents_created.append({
-                "name": "CandidateScreening_agent", 
-                "id": screening_agent_def.id,
-                "description": "Evaluates candidate resumes against job requirements",
-                "tools": ["file_search"],
-                "vector_stores": [resumes_vector_store.id]
-            })
-            self.init_agent_stats("CandidateScreening_agent")
+            self.agents_created.extend([
+                {
+                    "name": "recruiter", 
+                    "id": provisioned["recruiter"].id,
+                    "description": "Orchestrates the recruitment workflow",
+                    "tools": ["summarize_job_posting", "screen_candidates"] if provisioned["local_tools"]
+                             else ["connected_agent.JobPosting_agent"]
+                             + (["screen_candidates"] if sharded else ["connected_agent.CandidateScreening_agent"]),
+                    "vector_stores": []
+                },
+                {
+                    "name": "workflow", 
+                    "id": provisioned["workflow"].id,
+                    "description": "Guides and critiques the recruitment process",
+                    "tools": [],
+                    "vector_stores": []
+                },
+            ])
+            for agent in self.agents_created:
+                self.agent_stats.get(agent["name"])
+            recruiter_agent_def = provisioned["recruiter"]
+            critic_agent_def = provisioned["workflow"]
             
-            self.add_message("system", "Creating Recruiter agent...")
-            workflow_tool = ConnectedAgentTool(
-                id=workflow_agent_def.id, 
-                name="JobPosting_agent", 
-                description="Summarizes the job posting."
-            )
-            screening_tool = ConnectedAgentTool(
-                id=screening_agent_def.id, 
-                name="CandidateScreening_agent", 
-                description="Screens a candidate's CV against a job description."
-            )
-            recruiter_agent_def = await self.project_client.agents.create_agent(
-                model=deployment_name,
-                name="recruiter",
-                instructions=RECRUITER_AGENT_INSTRUCTIONS,
-                temperature=0.1,
-                tools=[screening_tool.definitions[0], workflow_tool.definitions[0]],
+            reused = sum(f.reused for f in provisioned["resume_files"])
+            resumes = len(provisioned["resume_paths"])
+            critical_path = " → ".join(graph.critical_path())
+            self.add_message(
+                "system",
+                f"Provisioning finished in {graph.timings['total']['duration']:.2f}s "
+                + (f"({resumes} resumes searched locally, " if local_search
+                   else f"({reused} of {resumes} resumes reused from cache, ")
+                + f"{len(registry.reused)} agents reused, {len(registry.created)} created; "
+                f"critical path: {critical_path})"
             )
-            self.agents_created.append({
-                "name": "recruiter", 
-                "id": recruiter_agent_def.id,
-                "description": "Orchestrates the recruitment workflow",
-                "tools": ["connected_agent.JobPosting_agent", "connected_agent.CandidateScreening_agent"],
-                "vector_stores": []
-            })
-            self.init_agent_stats("recruiter")
             
-            self.add_message("system", "Creating Workflow critic agent...")
-            critic_agent_def = await self.project_client.agents.create_agent(
-                model=deployment_name,
-                name="workflow",
-                temperature=0.1,
-                instructions=CRITIC_AGENT_INSTRUCTIONS,
-            )
-            self.agents_created.append({
-                "name": "workflow", 
-                "id": critic_agent_def.id,
-                "description": "Guides and critiques the recruitment process",
-                "tools": [],
-                "vector_stores": []
-            })
-            self.init_agent_stats("workflow")
+            # Clean up superseded agents in the background while the chat runs
+            gc_task = asyncio.create_task(self.collect_orphaned_agents(registry))
             
-            # Create agent instances
-            critic_agent = AzureAIAgent(
+            # Create agent instances (FakeAgent with AGENT_BACKEND=fake)
+            Agent = agent_class(self.pool.backend)
+            critic_agent = Agent(
                 client=self.project_client,
                 definition=critic_agent_def,
                 description="Asks questions to identify the best candidates for the job posting."
             )
-            recruiter_agent = AzureAIAgent(
+            # Sharded or cached tool calls go through local functions
+            recruiter_agent = Agent(
                 client=self.project_client,
                 definition=recruiter_agent_def,
-                description="Recruiter agent with access to candidate data."
+                description="Recruiter agent with access to candidate data.",
+                plugins=recruiter_plugins(
+                    self.project_client.agents, provisioned, self.agent_stats, response_cache, manifest
+                ),
             )
             
-            # Agent response callback with timing
+            # Agent response callback (timing is recorded by the manager's turn hooks)
             def agent_response_callback(message: ChatMessageContent) -> None:
                 content = str(message.content)
                 agent_name = message.name or message.role
                 
-                # Track agent invocation for ALL agents (including critic and recruiter)
-                self.track_agent_invocation(agent_name, content)
-                
                 # Detect tool usage for better visualization
                 if "connected_agent" in content:
                     content = f"[DELEGATION] {content}"
@@ -210,15 +217,32 @@ class AgentWorkflow:
                 self.add_message(
                     agent_name,
                     content,
-                    agent_type=agent_name
+                    agent_type=agent_name,
+                    message_id=self.finish_stream(agent_name)
                 )
+                if agent_name == "recruiter":
+                    self.add_results(content, agent_name)
+            
+            # The first streamed text chunk of a turn marks its time to first token
+            def streaming_agent_response_callback(message: StreamingChatMessageContent, is_final: bool) -> None:
+                agent_name = message.name or str(message.role)
+                self.agent_stats.chunk_received(agent_name, message.content)
+                if self.stream_responses:
+                    self.stream_delta(agent_name, message.content, is_final)
             
-            # Set up group chat
+            # Set up group chat; the manager times each turn from agent selection to response
             agents = [recruiter_agent, critic_agent]
             group_chat_orchestration = GroupChatOrchestration(
                 members=agents,
-                manager=CustomGroupChatManager(max_rounds=10),
+                manager=CustomGroupChatManager(
+                    max_rounds=DEFAULT_MAX_ROUNDS,
+                    on_turn_start=self.turn_started,
+                    on_turn_end=self.turn_finished,
+                    on_terminate=self.chat_terminated,
+                    token_usage=self.agent_stats.total_tokens,
+                ),
                 agent_response_callback=agent_response_callback,
+                streaming_agent_response_callback=streaming_agent_response_callback,
             )
             
             # Start runtime
@@ -238,6 +262,8 @@ class AgentWorkflow:
             self.add_message("system", f"Workflow completed: {value}")
             
             await runtime.stop_when_idle()
+            runtime = None
+            await gc_task
             
             self.status = "completed"
             
@@ -245,134 +271,321 @@ class AgentWorkflow:
             self.status = "error"
             self.add_message("error", f"Error: {str(e)}")
         finally:
-            # Clean up resources
-            if self.project_client:
-                await self.project_client.close()
-                self.project_client = None
-            if self.credential:
-                await self.credential.close()
-                self.credential = None
+            # A failed or cancelled run must not keep deleting agents and posting messages
+            if gc_task is not None:
+                if not gc_task.done():
+                    gc_task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await gc_task
+            # Stop the runtime if the run failed or was cancelled mid-chat
+            if runtime is not None:
+                await runtime.stop()
+            await self.agent_stats.drain()
+            # A cancelled run is still "running" here; RunManager marks it cancelled afterwards
+            self.telemetry.finish(self.status if self.status != "running" else "cancelled")
+            # Release the reference; the pooled client stays open for other runs
+            self.project_client = None
     
-    def init_agent_stats(self, agent_name):
-        """Initialize statistics for an agent"""
-        self.agent_stats[agent_name] = {
-            "invocations": 0,
-            "total_response_time": 0,
-            "avg_response_time": 0,
-            "first_invocation": None,
-            "last_invocation": None,
-            "messages": []
-        }
-    
-    def track_agent_invocation(self, agent_name, content):
-        """Track agent invocation statistics"""
-        # Initialize stats for any agent that sends a message (including critic/recruiter)
-        if agent_name not in self.agent_stats:
-            self.init_agent_stats(agent_name)
-        
-        now = datetime.now()
-        stats = self.agent_stats[agent_name]
+    async def collect_orphaned_agents(self, registry):
+        """Delete superseded agents according to AGENT_GC_POLICY without failing the run"""
+        def log(level, text):
+            self.add_message("error" if level == "error" else "system", text)
         
-        stats["invocations"] += 1
-        stats["last_invocation"] = now
-        if stats["first_invocation"] is None:
-            stats["first_invocation"] = now
-        
-        # Simple response time simulation (in real scenario, track actual timing)
-        response_time = len(content) * 0.01 + random.uniform(0.5, 2.0)  # Simulate based on content length
-        stats["total_response_time"] += response_time
-        stats["avg_response_time"] = stats["total_response_time"] / stats["invocations"]
-        
-        stats["messages"].append({
-            "timestamp": now.isoformat(),
-            "content_length": len(content),
-            "response_time": response_time
-        })
-            
-    def add_message(self, sender, content, agent_type=None):
-        """Add a message and notify SSE clients"""
+        try:
+            await registry.collect_garbage(log=log)
+        except Exception as e:
+            self.add_message("error", f"Agent cleanup failed: {str(e)}")
+    
+    def report_provisioning_step(self, name, event, elapsed):
+        """Report provisioning steps as they start and finish"""
+        self.telemetry.provisioning_step(name, event, elapsed)
+        if event == "start":
+            self.add_message("system", f"Provisioning {name}...")
+        elif event == "done":
+            self.add_message("system", f"Provisioned {name} in {elapsed:.2f}s")
+        else:
+            self.add_message("error", f"Provisioning {name} failed after {elapsed:.2f}s")
+    
+    def report_upload_progress(self, done, total, path):
+        """Report upload progress roughly every 10% of the batch"""
+        if done == total or done % max(1, total // 10) == 0:
+            self.add_message("system", f"Uploaded {done}/{total} files ({os.path.basename(path)})")
+    
+    def turn_started(self, agent_name):
+        """Group chat manager hook: an agent was selected to speak"""
+        self.agent_stats.turn_started(agent_name)
+        self.telemetry.turn_started(agent_name)
+    
+    def turn_finished(self, message):
+        """Group chat manager hook: an agent's response reached the chat"""
+        self.agent_stats.turn_finished(message, self.project_client.agents)
+        self.telemetry.turn_finished(message)
+    
+    def chat_terminated(self, reason):
+        """Group chat manager hook: the chat is over"""
+        self.termination_reason = reason
+        self.telemetry.chat_terminated(reason)
+        self.add_message("system", f"Group chat ended: {reason.replace('_', ' ')}")
+    
+    def add_results(self, content, source):
+        """Record the ranking in a reply and send its records to SSE clients as a results event"""
+        records = self.results.add_reply(content, source=source)
+        if records:
+            self.broadcaster.publish(
+                {"type": "results", "ranking": self.results.rankings, "records": [r._asdict() for r in records]},
+                event="results",
+            )
+    
+    def result_sink_failed(self, sink, error):
+        self.add_message("error", f"Writing results to {type(sink).__name__} failed: {error}")
+    
+    def add_message(self, sender, content, agent_type=None, message_id=None):
+        """Add a message and notify SSE clients; ``message_id`` ties it to the deltas streamed before it"""
         message = {
             "timestamp": datetime.now().isoformat(),
             "sender": sender,
             "content": content,
             "agent_type": agent_type or sender
         }
+        if message_id:
+            message["message_id"] = message_id
+        self.broadcaster.publish(message)
         self.messages.append(message)
-        message_queue.put(json.dumps(message))
+    
+    def stream_delta(self, agent_name, text, is_final=False):
+        """Forward a streamed chunk as a message.delta event, coalescing chunks that arrive in quick succession"""
+        stream = self._streams.get(agent_name)
+        if stream is None:
+            # A lone final chunk is a complete or intermediate message; add_message will publish it whole
+            if is_final or not text:
+                return
+            stream = self._streams[agent_name] = {"message_id": uuid.uuid4().hex[:12], "pending": "", "flushed": 0.0}
+        stream["pending"] += text or ""
+        now = time.monotonic()
+        if is_final or now - stream["flushed"] >= DEFAULT_STREAM_DELTA_INTERVAL:
+            self._flush_stream(agent_name, stream)
+            stream["flushed"] = now
+    
+    def _flush_stream(self, agent_name, stream):
+        if not stream["pending"]:
+            return
+        self.broadcaster.publish({
+            "type": "message.delta",
+            "message_id": stream["message_id"],
+            "sender": agent_name,
+            "agent_type": agent_name,
+            "delta": stream["pending"],
+        }, event="message.delta", retain=False)
+        stream["pending"] = ""
+    
+    def finish_stream(self, agent_name):
+        """Flush and close ``agent_name``'s open stream; return its message ID, or None if nothing was streamed"""
+        stream = self._streams.pop(agent_name, None)
+        if stream is None:
+            return None
+        self._flush_stream(agent_name, stream)
+        return stream["message_id"]
+
+# Runs execute concurrently up to MAX_CONCURRENT_RUNS; the rest wait in a queue
+run_manager = RunManager(lambda run_id: AgentWorkflow(run_id))
 
-# Global workflow instance
-workflow = AgentWorkflow()
+# Stands in for "the latest run" before any run has been started
+idle_workflow = AgentWorkflow()
+
+# Gauges are read from live state whenever /metrics is scraped
+RUNS_QUEUED.set_function(lambda: len(run_manager.queued))
+RUNS_IN_FLIGHT.set_function(lambda: len(run_manager.running))
+SSE_SUBSCRIBERS.set_function(
+    lambda: sum(run.workflow.broadcaster.subscriber_count for run in run_manager.runs.values())
+    + idle_workflow.broadcaster.subscriber_count
+)
+
+def latest_workflow():
+    """Return the most recently started run's workflow"""
+    run = run_manager.latest
+    return run.workflow if run else idle_workflow
+
+@app.before_serving
+async def startup():
+    """Install the trace exporter selected by TRACE_EXPORTER"""
+    configure_tracing()
+
+@app.after_serving
+async def shutdown():
+    """Cancel unfinished runs and close shared clients when the server shuts down"""
+    await run_manager.shutdown()
+    await client_pool.close()
+    if response_cache is not None:
+        response_cache.close()
+    for sink in result_sinks:
+        sink.close()
 
 @app.route('/')
-def index():
+async def index():
     """Serve the frontend"""
-    return send_from_directory('ui', 'index.html')
+    return await send_from_directory('ui', 'index.html')
 
 @app.route('/ui/<path:path>')
-def send_ui(path):
+async def send_ui(path):
     """Serve UI files"""
-    return send_from_directory('ui', path)
+    return await send_from_directory('ui', path)
 
-@app.route('/api/status')
-def get_status():
-    """Get current workflow status"""
-    return jsonify({
+def status_payload(workflow):
+    """Serialize a workflow's status, messages and resources"""
+    return {
+        "run_id": workflow.run_id,
         "status": workflow.status,
-        "messages": workflow.messages,
+        "seq": workflow.broadcaster.seq,
+        "total_messages": len(workflow.messages),
+        "messages": workflow.messages.recent(),
         "agents": workflow.agents_created,
-        "vector_stores": workflow.vector_stores
-    })
+        "vector_stores": workflow.vector_stores,
+        "provisioning_timings": workflow.provisioning_timings,
+        "termination_reason": workflow.termination_reason
+    }
 
-@app.route('/api/start', methods=['POST'])
-def start_workflow():
-    """Start the agent workflow"""
-    if workflow.status == "running":
-        return jsonify({"error": "Workflow already running"}), 400
-    
-    # Reset workflow
-    workflow.status = "idle"
-    workflow.messages = []
-    workflow.agents_created = []
-    workflow.vector_stores = []
-    
-    # Run workflow in background
-    def run_async_workflow():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            loop.run_until_complete(workflow.run_workflow())
-        finally:
-            loop.close()
+DEFAULT_STATUS_PAGE_SIZE = 200
+MAX_STATUS_PAGE_SIZE = 1000
+
+def status_response(workflow):
+    """Full status, or only messages after ``?since=<seq>`` (paged by ``limit``), with ETag/304 support"""
+    since = request.args.get("since", type=int)
+    limit = request.args.get("limit", type=int)
     
-    thread = threading.Thread(target=run_async_workflow)
-    thread.daemon = True
-    thread.start()
+    # The latest sequence number changes with every message, so it versions the whole payload
+    etag = f"{workflow.run_id}-{workflow.status}-{workflow.broadcaster.seq}-{since}-{limit}"
+    if request.if_none_match.contains_weak(etag):
+        return "", 304, {"ETag": f'W/"{etag}"'}
     
-    return jsonify({"status": "started"})
+    if since is None and limit is None:
+        response = jsonify(status_payload(workflow))
+    else:
+        limit = min(max(1, limit or DEFAULT_STATUS_PAGE_SIZE), MAX_STATUS_PAGE_SIZE)
+        page, has_more = workflow.messages.page(since or 0, limit)
+        response = jsonify({
+            "run_id": workflow.run_id,
+            "status": workflow.status,
+            "seq": workflow.broadcaster.seq,
+            "total_messages": len(workflow.messages),
+            "next_since": page[-1]["seq"] if page else since,
+            "has_more": has_more,
+            "messages": page
+        })
+    response.set_etag(etag, weak=True)
+    return response
 
-@app.route('/api/events')
-def events():
-    """Server-sent events for real-time updates"""
-    def generate():
-        while True:
-            try:
-                message = message_queue.get(timeout=1)
-                yield f"data: {message}\n\n"
-            except queue.Empty:
-                yield f"data: {json.dumps({'type': 'heartbeat'})}\n\n"
+async def event_stream(workflow):
+    """Server-sent events response for one workflow's messages"""
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    async def generate():
+        async for frame in workflow.broadcaster.stream(last_event_id):
+            yield frame.encode("utf-8")
     
-    return app.response_class(
+    response = await make_response(
         generate(),
-        mimetype="text/event-stream",
-        headers={
+        {
+            'Content-Type': 'text/event-stream',
             'Cache-Control': 'no-cache',
             'X-Accel-Buffering': 'no'
         }
     )
+    response.timeout = None  # SSE streams stay open indefinitely
+    return response
+
+@app.route('/api/status')
+async def get_status():
+    """Get current workflow status (latest run)"""
+    return status_response(latest_workflow())
+
+@app.route('/api/start', methods=['POST'])
+async def start_workflow():
+    """Start a new agent workflow run, queueing it if all run slots are busy.
+
+    ``?priority=batch`` lets the run's agent service requests wait behind interactive runs'.
+    """
+    priority = request.args.get("priority", "interactive")
+    if priority not in PRIORITIES:
+        return jsonify({"error": f"priority must be one of {', '.join(PRIORITIES)}"}), 400
+    queued = len(run_manager.running) + len(run_manager.queued) >= run_manager.max_concurrent
+    run = run_manager.start(priority)
+    return jsonify({"status": "queued" if queued else "started", "run_id": run.id, "priority": priority})
+
+@app.route('/api/events')
+async def events():
+    """Server-sent events for real-time updates (latest run)"""
+    return await event_stream(latest_workflow())
+
+@app.route('/api/runs')
+async def list_runs():
+    """List retained runs, newest first"""
+    return jsonify({
+        "max_concurrent": run_manager.max_concurrent,
+        "running": len(run_manager.running),
+        "queued": len(run_manager.queued),
+        "runs": [run.summary() for run in reversed(run_manager.runs.values())]
+    })
+
+@app.route('/api/runs/<run_id>/status')
+async def get_run_status(run_id):
+    """Get the status of a specific run"""
+    run = run_manager.get(run_id)
+    if not run:
+        return jsonify({"error": "Run not found"}), 404
+    return status_response(run.workflow)
+
+@app.route('/api/runs/<run_id>/results')
+async def get_run_results(run_id):
+    """Ranked candidates of a run as typed records: the latest ranking, or every record from ``?since=<seq>``"""
+    run = run_manager.get(run_id)
+    if not run:
+        return jsonify({"error": "Run not found"}), 404
+    results = run.workflow.results
+    since = request.args.get("since", type=int)
+    records = results.latest() if since is None else results.since(max(0, since))
+    return jsonify({
+        "run_id": run_id,
+        "status": run.workflow.status,
+        "ranking": results.rankings,
+        "final": run.workflow.status == "completed",
+        "next_since": len(results.records),
+        "records": [record._asdict() for record in records],
+    })
+
+@app.route('/api/runs/<run_id>/events')
+async def run_events(run_id):
+    """Server-sent events for a specific run"""
+    run = run_manager.get(run_id)
+    if not run:
+        return jsonify({"error": "Run not found"}), 404
+    return await event_stream(run.workflow)
+
+@app.route('/api/runs/<run_id>/cancel', methods=['POST'])
+async def cancel_run(run_id):
+    """Cancel a queued or running run"""
+    run = run_manager.get(run_id)
+    if not run:
+        return jsonify({"error": "Run not found"}), 404
+    if not run_manager.cancel(run_id):
+        return jsonify({"error": f"Run already {run.status}"}), 400
+    return jsonify({"status": "cancelling", "run_id": run_id})
 
 @app.route('/api/agent/<agent_name>')
-def get_agent_details(agent_name):
-    """Get detailed information about a specific agent"""
+async def get_agent_details(agent_name):
+    """Get detailed information about a specific agent (latest run unless ?run_id= is given)"""
+    run_id = request.args.get("run_id")
+    if run_id:
+        run = run_manager.get(run_id)
+        if not run:
+            return jsonify({"error": "Run not found"}), 404
+        workflow = run.workflow
+    else:
+        workflow = latest_workflow()
+    
     # First check if it's one of the pre-created agents
     agent_info = None
     for agent in workflow.agents_created:
@@ -403,16 +616,12 @@ def get_agent_details(agent_name):
     if not agent_info:
         return jsonify({"error": "Agent not found"}), 404
     
-    stats = workflow.agent_stats.get(agent_name, {})
+    stats = workflow.agent_stats.get(agent_name)
     
     # Calculate additional metrics
     total_time = None
-    if workflow.workflow_start_time and stats.get("last_invocation"):
-        if isinstance(stats["last_invocation"], str):
-            last_invocation = datetime.fromisoformat(stats["last_invocation"])
-        else:
-            last_invocation = stats["last_invocation"]
-        total_time = (last_invocation - workflow.workflow_start_time).total_seconds()
+    if workflow.workflow_start_time and stats.last_invocation:
+        total_time = (stats.last_invocation - workflow.workflow_start_time).total_seconds()
     
     playground_url = None
     if os.environ.get("AZURE_PLAYGROUND_URL_PREFIX") and agent_info["id"] != "critic-agent-id" and agent_info["id"] != "recruiter-agent-id":
@@ -426,20 +635,35 @@ def get_agent_details(agent_name):
         "vector_stores": agent_info["vector_stores"],
         "playground_url": playground_url,
         "statistics": {
-            "invocations": stats.get("invocations", 0),
-            "avg_response_time": round(stats.get("avg_response_time", 0), 2),
-            "total_response_time": round(stats.get("total_response_time", 0), 2),
-            "first_invocation": stats.get("first_invocation").isoformat() if stats.get("first_invocation") else None,
-            "last_invocation": stats.get("last_invocation").isoformat() if stats.get("last_invocation") else None,
+            **stats.to_dict(),
+            "avg_response_time": round(stats.avg_response_time, 2),
+            "total_response_time": round(stats.total_response_time, 2),
+            "first_invocation": stats.first_invocation.isoformat() if stats.first_invocation else None,
+            "last_invocation": stats.last_invocation.isoformat() if stats.last_invocation else None,
             "total_workflow_time": round(total_time, 2) if total_time else None
         },
-        "messages": stats.get("messages", [])[-5:]  # Last 5 messages
+        "messages": [record.to_dict() for record in stats.recent]  # Last 5 turns
     })
 
+@app.route('/api/pool')
+async def get_pool_stats():
+    """Shared client instrumentation: connection reuse and token refresh counts"""
+    return jsonify({
+        **client_pool.stats(),
+        "response_cache": response_cache.stats() if response_cache is not None else None,
+    })
+
+@app.route('/metrics')
+async def metrics():
+    """Prometheus metrics: queue depth, runs in flight, SSE subscribers and per-phase latency histograms"""
+    return generate_latest(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
+
 @app.route('/api/config')
-def get_config():
+async def get_config():
     """Get configuration for the frontend"""
     return jsonify({
+        "agent_backend": client_pool.backend,
+        "stream_responses": DEFAULT_STREAM_RESPONSES,
         "playground_url_prefix": os.environ.get("AZURE_PLAYGROUND_URL_PREFIX", ""),
         "azure_endpoint": os.environ.get("AZURE_AI_AGENT_ENDPOINT", ""),
         "model_deployment": os.environ.get("AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME", "")
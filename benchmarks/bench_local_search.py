@@ -0,0 +1,89 @@
+"""Benchmark local retrieval: IVF recall and latency against exact brute-force search.
+
+Indexes synthetic resume texts (see bench_prerank.py) with text_index, embeds
+their chunks and times queries made of random skill phrases. Brute force is
+the baseline; for each ``--probes`` value the IVF index reports its recall@k
+(share of the exact top-k it finds) and its latency. Query embedding is timed
+separately. Example:
+
+    python benchmarks/bench_local_search.py --resumes 20000 --embedder hashing --probes 4 8 16 32
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_prerank import synthetic_resume
+from bench_text_index import read_texts
+from local_search import EMBEDDERS, BruteForceIndex, IVFIndex, embed_chunks, make_embedder
+from prerank import SKILL_PHRASES
+from text_index import TextIndex
+
+
+def median_ms(function, queries):
+    times = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(function(query))
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resumes", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--embedder", choices=sorted(EMBEDDERS), default="hashing")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--probes", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "resumes"))
+        paths = [os.path.join(tmp, "resumes", f"resume_{i:06d}.txt") for i in range(args.resumes)]
+        for i, path in enumerate(paths):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(synthetic_resume(i))
+        index = TextIndex(os.path.join(tmp, "index"))
+        index.update(paths, extract=read_texts)
+
+        embedder = make_embedder(args.embedder, args.dim)
+        start = time.perf_counter()
+        vectors = np.ascontiguousarray(embed_chunks(index, np.arange(index.num_chunks), embedder))
+        print(f"{index.num_chunks} chunks of {args.resumes} resumes embedded ({embedder.name or args.embedder}) "
+              f"in {time.perf_counter() - start:.2f}s")
+
+    queries = [" ".join(random.sample(SKILL_PHRASES, 4)) for _ in range(args.queries)]
+    embed_time, query_vectors = median_ms(lambda query: embedder.embed([query])[0], queries)
+    print(f"query embedding: {embed_time:.3f} ms")
+
+    exact = BruteForceIndex(vectors)
+    exact_time, exact_results = median_ms(lambda q: exact.search(q, args.top_k)[0], query_vectors)
+    print(f"{'index':<28} {'build (s)':>10} {'query (ms)':>11} {'recall@' + str(args.top_k):>10}")
+    print(f"{'brute force':<28} {0:>10.2f} {exact_time:>11.3f} {1:>10.3f}")
+
+    start = time.perf_counter()
+    ivf = IVFIndex(vectors)
+    build_time = time.perf_counter() - start
+    for probes in args.probes:
+        ivf.probes = probes
+        ivf_time, ivf_results = median_ms(lambda q: ivf.search(q, args.top_k)[0], query_vectors)
+        recall = statistics.mean(len(set(found.tolist()) & set(expected.tolist())) / max(1, len(expected))
+                                 for found, expected in zip(ivf_results, exact_results))
+        label = f"IVF {len(ivf.centroids)} lists, {probes} probes"
+        print(f"{label:<28} {build_time:>10.2f} {ivf_time:>11.3f} {recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
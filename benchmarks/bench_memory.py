@@ -0,0 +1,82 @@
+"""Measure message-history memory for a long run, with and without the bounded store.
+
+Publishes N messages through ``AgentWorkflow.add_message`` and records N agent
+turns, then reports memory held as measured by ``tracemalloc``. The baseline is
+the old behaviour, which kept every message dict in a list. Example:
+
+    python benchmarks/bench_memory.py --messages 10000 --content-size 800
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import AgentWorkflow
+from message_store import MessageStore
+
+
+class UnboundedList(list):
+    """The previous storage: every message dict kept in memory"""
+
+    def append(self, message):
+        super().append(dict(message))
+
+    def close(self):
+        pass
+
+
+def run(label, messages, content_size, store_factory):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    workflow = AgentWorkflow("bench")
+    workflow.messages = store_factory()
+    body = "x" * content_size
+    for i in range(messages):
+        sender = ("recruiter", "workflow")[i % 2]
+        workflow.add_message(sender, f"{i} {body}", agent_type=sender)
+        workflow.agent_stats.get(sender).record_invocation(1.5, content_length=content_size, time_to_first_token=0.4)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    workflow.messages.close()
+    print(f"{label:>22} {current / 2**20:>12.2f} {peak / 2**20:>10.2f} {messages / elapsed:>12.0f}")
+    return workflow
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--content-size", type=int, default=800, help="characters per message")
+    parser.add_argument("--window", type=int, default=500, help="messages kept in memory")
+    args = parser.parse_args()
+
+    print(f"{args.messages} messages of ~{args.content_size} characters")
+    print(f"{'storage':>22} {'held (MiB)':>12} {'peak (MiB)':>10} {'messages/s':>12}")
+    run("unbounded list", args.messages, args.content_size, UnboundedList)
+    run("bounded", args.messages, args.content_size, lambda: MessageStore(args.window))
+    with tempfile.TemporaryDirectory() as transcript_dir:
+        workflow = run(
+            "bounded + transcript", args.messages, args.content_size,
+            lambda: MessageStore.for_run("bench", transcript_dir=transcript_dir, max_messages=args.window),
+        )
+        # Page the whole history back from disk to check nothing was lost
+        start = time.perf_counter()
+        since, paged = 0, 0
+        while True:
+            page, has_more = workflow.messages.page(since, 1000)
+            paged += len(page)
+            if not has_more:
+                break
+            since = page[-1]["seq"]
+        elapsed = time.perf_counter() - start
+        print(f"paged back {paged} messages from the transcript in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark the local BM25 pre-ranking stage over a large synthetic candidate pool.
+
+Generates resume texts with the create_data.py generators (in memory, so 10k
+resumes take seconds) and ranks them against a freshly generated job
+description PDF. It reports indexing and query time and how much resume text
+would still reach the LLM screening agents. With ``--pdfs`` it also times PDF
+text extraction on that many real resume PDFs. Example:
+
+    python benchmarks/bench_prerank.py --resumes 10000 --top-k 50 --pdfs 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import create_data
+from prerank import BM25Index, build_vocabulary, extract_text, extract_texts, qualifications_section
+
+
+def synthetic_resume(i):
+    years = random.randint(5, 15)
+    return create_data.RESUME_TEMPLATE.format(
+        name=f"Candidate {i}",
+        email=f"candidate.{i}@email.com",
+        phone="(555) 123-4567",
+        location=random.choice(["Seattle, WA", "Bellevue, WA", "Redmond, WA", "San Francisco, CA"]),
+        summary=f"Experienced Software Engineer with {years}+ years in enterprise software development.",
+        experience=create_data.generate_experience(years),
+        education="Master of Science in Computer Science",
+        skills=create_data.generate_skills(),
+        certifications=create_data.generate_certifications(),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resumes", type=int, default=10000)
+    parser.add_argument("--top-k", type=int, default=50)
+    parser.add_argument("--pdfs", type=int, default=0, help="also time text extraction on this many resume PDFs")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        job_path = os.path.join(tmp, "job_description.pdf")
+        create_data.create_job_posting(job_path)
+        query = qualifications_section(extract_text(job_path))
+
+        if args.pdfs:
+            paths = [os.path.join(tmp, f"Resume_Software_Engineer_Candidate_{i}.pdf") for i in range(args.pdfs)]
+            for i, path in enumerate(paths):
+                create_data.create_resume(f"Candidate {i}", "Software Engineer", path)
+            start = time.perf_counter()
+            extract_texts(paths)
+            elapsed = time.perf_counter() - start
+            print(f"PDF extraction: {args.pdfs} files in {elapsed:.2f}s ({args.pdfs / elapsed:.0f} files/s)")
+
+    start = time.perf_counter()
+    texts = [synthetic_resume(i) for i in range(args.resumes)]
+    print(f"generated {args.resumes} resume texts in {time.perf_counter() - start:.2f}s")
+
+    vocabulary = build_vocabulary(query)
+    start = time.perf_counter()
+    index = BM25Index(vocabulary).fit(texts)
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    top = index.top_k(query, args.top_k)
+    query_time = time.perf_counter() - start
+
+    print(f"vocabulary: {len(vocabulary)} terms, matrix: {index.matrix.shape[0]}x{index.matrix.shape[1]}, "
+          f"{index.matrix.nnz} non-zeros")
+    print(f"index: {fit_time:.2f}s ({args.resumes / fit_time:,.0f} resumes/s), top-{args.top_k} query: "
+          f"{query_time * 1000:.1f} ms")
+    print(f"best score {top[0][1]:.2f}, {args.top_k}th score {top[-1][1]:.2f}")
+
+    # Rough proxy for what screening would cost: resume characters the agents would search over
+    pool_chars = sum(len(text) for text in texts)
+    kept_chars = sum(len(texts[i]) for i, _ in top)
+    print(f"resumes sent to screening: {len(top)} of {args.resumes} "
+          f"({args.resumes / len(top):.0f}x fewer; {pool_chars / 4 / 1e6:.1f}M -> {kept_chars / 4 / 1e3:.1f}k "
+          f"approx. tokens of resume text)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark the request scheduler against uncoordinated calls on a rate-limited fake service.
+
+A burst of batch requests (thread creations) is fired at once at a fake
+service that accepts ``--rate-limit`` requests per second and answers the
+rest with 429; interactive requests arrive while the batch is still going.
+Uncoordinated callers retry each 429 on their own after its Retry-After, as
+azure-core's retry policy does; the scheduler runs them through one
+``RequestScheduler`` (without, and then with, a client-side rate limit).
+For each it reports the makespan, the share of service calls that were
+throttled and the interactive and batch latencies. Example:
+
+    python benchmarks/bench_scheduler.py --requests 1000 --rate-limit 50 --latency fixed:0.05
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_backend import FakeAgentsClient
+from scheduler import RequestScheduler, priority, throttle_delay
+
+
+async def uncoordinated(client):
+    while True:
+        try:
+            return await client.threads.create()
+        except Exception as e:
+            delay = throttle_delay(e)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+async def run(args, scheduler):
+    client = FakeAgentsClient(latency=args.latency, rate_limit=args.rate_limit, retry_after=args.retry_after,
+                              scheduler=scheduler, seed=args.seed)
+    latencies = {"interactive": [], "batch": []}
+
+    async def request(kind):
+        start = time.perf_counter()
+        with priority(kind):
+            if scheduler is None:
+                await uncoordinated(client)
+            else:
+                await client.threads.create()
+        latencies[kind].append(time.perf_counter() - start)
+
+    async def interactive():
+        for _ in range(args.interactive):
+            await asyncio.sleep(args.interactive_interval)
+            asyncio.ensure_future(request("interactive"))
+
+    start = time.perf_counter()
+    batch = [asyncio.ensure_future(request("batch")) for _ in range(args.requests)]
+    await interactive()
+    await asyncio.gather(*batch)
+    while len(latencies["interactive"]) < args.interactive:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    calls = sum(client.calls.values())
+    throttled = sum(client.throttled.values())
+    return elapsed, calls, throttled, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500, help="batch requests fired at once")
+    parser.add_argument("--interactive", type=int, default=50, help="interactive requests during the batch")
+    parser.add_argument("--interactive-interval", type=float, default=0.1)
+    parser.add_argument("--rate-limit", type=float, default=50, help="requests per second the fake service accepts")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of injected throttles")
+    parser.add_argument("--latency", default="fixed:0.05")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    modes = [
+        ("uncoordinated", None),
+        ("scheduler (AIMD only)", RequestScheduler(rate_limits="")),
+        ("scheduler + token bucket", RequestScheduler(rate_limits=f"thread:{args.rate_limit * 0.95:g}")),
+    ]
+    total = args.requests + args.interactive
+    print(f"{total} requests against a {args.rate_limit:g}/s limit; at best {total / args.rate_limit:.1f}s")
+    print(f"{'mode':<26} {'time (s)':>9} {'req/s':>7} {'calls':>7} {'429s':>6} "
+          f"{'inter p50':>10} {'inter p95':>10} {'batch p95':>10}")
+    for label, scheduler in modes:
+        elapsed, calls, throttled, latencies = asyncio.run(run(args, scheduler))
+        interactive, batch = latencies["interactive"], latencies["batch"]
+        print(f"{label:<26} {elapsed:>9.2f} {total / elapsed:>7.1f} {calls:>7} {throttled:>6} "
+              f"{statistics.median(interactive):>10.3f} {percentile(interactive, 0.95):>10.3f} "
+              f"{percentile(batch, 0.95):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
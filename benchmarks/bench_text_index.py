@@ -0,0 +1,90 @@
+"""Benchmark the memory-mapped text and chunk index on a large synthetic resume pool.
+
+Writes synthetic resume texts (see bench_prerank.py) as text files, so PDF
+extraction, which is timed by bench_prerank.py --pdfs, does not dominate. It
+reports the full build, opening the index, random chunk reads, a no-op update
+and an incremental update after touching and changing 1% of the files, plus
+the index size on disk and the memory an opened index holds. Example:
+
+    python benchmarks/bench_text_index.py --resumes 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_prerank import synthetic_resume
+from text_index import TextIndex
+
+
+def read_texts(paths):
+    texts = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            texts.append(f.read())
+    return texts
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resumes", type=int, default=20000)
+    parser.add_argument("--reads", type=int, default=10000, help="random chunk reads to time")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        paths = [os.path.join(tmp, "resumes", f"resume_{i:06d}.txt") for i in range(args.resumes)]
+        os.makedirs(os.path.join(tmp, "resumes"))
+        for i, path in enumerate(paths):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(synthetic_resume(i))
+        print(f"generated {args.resumes} resume files in {time.perf_counter() - start:.2f}s")
+        index_dir = os.path.join(tmp, "index")
+
+        stats = TextIndex(index_dir).update(paths, extract=read_texts)
+        print(f"build: {stats['seconds']:.2f}s ({args.resumes / stats['seconds']:,.0f} documents/s), "
+              f"{stats['chunks']} chunks, {directory_size(index_dir) / 2**20:.1f} MiB on disk")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        index = TextIndex(index_dir)
+        open_time = time.perf_counter() - start
+        held = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"open: {open_time * 1000:.2f} ms, {held / 2**10:.0f} KiB allocated")
+
+        chunks = [random.randrange(index.num_chunks) for _ in range(args.reads)]
+        start = time.perf_counter()
+        for i in chunks:
+            index.chunk(i)
+        elapsed = time.perf_counter() - start
+        print(f"random chunk reads: {elapsed / args.reads * 1e6:.1f} us each")
+
+        stats = index.update(paths, extract=read_texts)
+        print(f"no-op update: {stats['seconds']:.2f}s")
+
+        sample = random.sample(paths, max(2, args.resumes // 100))
+        touched, changed = sample[::2], sample[1::2]
+        for path in touched:
+            os.utime(path)
+        for path in changed:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\nAdditional certification: CKA\n")
+        stats = index.update(paths, extract=read_texts)
+        print(f"incremental update ({len(touched)} touched, {len(changed)} changed): {stats['seconds']:.2f}s, "
+              f"{stats['changed']} re-extracted")
+
+
+if __name__ == "__main__":
+    main()
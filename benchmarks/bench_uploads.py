@@ -0,0 +1,49 @@
+"""Compare wall-clock upload time at different concurrency limits.
+
+Runs the upload pipeline against a fake ``agents.files`` client that sleeps
+for a simulated per-file latency, e.g.:
+
+    python benchmarks/bench_uploads.py --files 500 --latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_backend import FakeFilesClient
+from uploads import upload_files
+
+
+async def run(files, latency, jitter, failure_rate, concurrency):
+    client = FakeFilesClient(latency=latency, jitter=jitter, failure_rate=failure_rate, seed=42)
+    paths = [f"resumes/Resume_Fake_{i:05d}.pdf" for i in range(files)]
+    start = time.perf_counter()
+    file_objs = await upload_files(client, paths, concurrency=concurrency, backoff=0.01)
+    elapsed = time.perf_counter() - start
+    assert len(file_objs) == files
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.1, help="mean seconds per upload")
+    parser.add_argument("--jitter", type=float, default=0.03)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    print(f"{args.files} files, ~{args.latency:.3f}s simulated latency each")
+    print(f"{'concurrency':>12} {'seconds':>10} {'files/s':>10} {'speedup':>10}")
+    baseline = None
+    for concurrency in args.concurrency:
+        elapsed = asyncio.run(run(args.files, args.latency, args.jitter, args.failure_rate, concurrency))
+        baseline = baseline or elapsed
+        print(f"{concurrency:>12} {elapsed:>10.2f} {args.files / elapsed:>10.1f} {baseline / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
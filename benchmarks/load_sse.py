@@ -0,0 +1,159 @@
+"""Load-test the ASGI app: many SSE subscribers watching one workflow.
+
+Serves app.py with hypercorn in-process, replaces the workflow with the
+scripted fake from fake_backend.py, opens N event-stream connections and
+polls /api/status while messages are fanned out, e.g.:
+
+    python benchmarks/load_sse.py --subscribers 1000 --messages 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+
+import app as server
+from fake_backend import scripted_workflow
+
+
+async def http_request(host, port, method, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b"\r\n\r\n", 1)[1] or b"null")
+
+
+async def sse_client(host, port, path, expected, latencies, connected):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass  # response headers
+    connected.release()
+    received = 0
+    try:
+        while received < expected:
+            line = await reader.readline()
+            if not line:
+                break
+            if not line.startswith(b"data: "):
+                continue
+            message = json.loads(line[6:])
+            content = message.get("content", "")
+            if content.startswith("sent_at="):
+                latencies.append(time.perf_counter() - float(content.split()[0][8:]))
+                received += 1
+    finally:
+        writer.close()
+    return received
+
+
+async def measure(subscribers, messages, interval=0.01, host="127.0.0.1", port=5055):
+    """Serve the app, fan ``messages`` out to ``subscribers`` SSE clients and return the measurements"""
+    config = Config()
+    config.bind = [f"{host}:{port}"]
+    config.loglevel = "WARNING"
+    shutdown = asyncio.Event()
+    server_task = asyncio.create_task(serve(server.app, config, shutdown_trigger=shutdown.wait))
+    await asyncio.sleep(0.5)
+
+    # Every run uses the scripted workflow, which waits until all subscribers are connected
+    subscribers_ready = asyncio.Event()
+
+    def scripted_factory(run_id):
+        workflow = server.AgentWorkflow(run_id)
+
+        async def run_workflow():
+            await subscribers_ready.wait()
+            await scripted_workflow(workflow, messages=messages, interval=interval)
+
+        workflow.run_workflow = run_workflow
+        return workflow
+
+    server.run_manager.workflow_factory = scripted_factory
+    run_id = (await http_request(host, port, "POST", "/api/start"))["run_id"]
+
+    latencies = []
+    connected = asyncio.Semaphore(0)
+    start = time.perf_counter()
+    clients = [
+        asyncio.create_task(sse_client(
+            host, port, f"/api/runs/{run_id}/events", messages, latencies, connected
+        ))
+        for _ in range(subscribers)
+    ]
+    for _ in range(subscribers):
+        await connected.acquire()
+    connect_time = time.perf_counter() - start
+
+    status_times = []
+
+    async def poll_status():
+        while not all(c.done() for c in clients):
+            t0 = time.perf_counter()
+            await http_request(host, port, "GET", f"/api/runs/{run_id}/status")
+            status_times.append(time.perf_counter() - t0)
+            await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    subscribers_ready.set()
+    poller = asyncio.create_task(poll_status())
+    received = await asyncio.gather(*clients)
+    elapsed = time.perf_counter() - start
+    await poller
+
+    shutdown.set()
+    await server_task
+
+    delivered = sum(received)
+    latencies.sort()
+    return {
+        "subscribers": subscribers,
+        "messages": messages,
+        "connect_seconds": connect_time,
+        "delivered": delivered,
+        "delivery_ratio": delivered / (subscribers * messages),
+        "seconds": elapsed,
+        "events_per_second": delivered / elapsed,
+        "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+        "latency_p99": latencies[int(len(latencies) * 0.99)] if latencies else None,
+        "status_polls": len(status_times),
+        "status_median": statistics.median(status_times) if status_times else None,
+    }
+
+
+async def run(args):
+    result = await measure(args.subscribers, args.messages, args.interval, args.host, args.port)
+    print(f"subscribers:        {result['subscribers']} (connected in {result['connect_seconds']:.2f}s)")
+    print(f"messages:           {result['messages']} published, {result['delivered']} delivered "
+          f"({result['delivery_ratio']:.1%})")
+    print(f"throughput:         {result['events_per_second']:,.0f} events/s over {result['seconds']:.2f}s")
+    if result["latency_p50"] is not None:
+        print(f"delivery latency:   p50 {result['latency_p50'] * 1000:.1f} ms, "
+              f"p99 {result['latency_p99'] * 1000:.1f} ms")
+    if result["status_median"] is not None:
+        print(f"/api/status:        {result['status_polls']} polls, median {result['status_median'] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between workflow messages")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
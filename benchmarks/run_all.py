@@ -0,0 +1,249 @@
+"""Run the end-to-end benchmark suite on the fake backend and compare it with a stored baseline.
+
+Measures cold and warm ``AgentWorkflow.run_workflow`` provisioning, the
+per-round overhead of ``GroupChatOrchestration`` with ``CustomGroupChatManager``,
+``/api/status`` latency by message count, SSE throughput by subscriber count and
+memory over a long run. Results are written as JSON. With ``--baseline``, any
+metric that got worse by more than ``--threshold`` is reported and the exit
+status is 1. Examples:
+
+    python benchmarks/run_all.py --output bench.json --baseline benchmarks/baseline.json
+    python benchmarks/run_all.py --repeat 3 --update-baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# Fixed fake-service timings keep runs comparable with the baseline; set before the app reads them
+os.environ.update({
+    "AGENT_BACKEND": "fake",
+    "FAKE_LATENCY": "0.005",
+    "FAKE_AGENT_LATENCY": "0.02",
+    "FAKE_FAILURE_RATE": "0",
+    "FAKE_SEED": "42",
+    "FAKE_RATE_LIMIT": "0",
+    "FAKE_THROTTLE_RATE": "0",
+    "AGENT_RATE_LIMITS": "",
+    "AGENT_MAX_CONCURRENCY": "0",
+    "AGENT_INITIAL_CONCURRENCY": "0",
+    "AGENT_GC_POLICY": "off",
+})
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app as server
+import create_data
+import load_sse
+from clients import FAKE_ENDPOINT, ProjectClientPool
+from fake_backend import FakeAgent, FakeProjectClient, scripted_workflow
+from file_cache import FileManifest
+from main import CustomGroupChatManager
+from semantic_kernel.agents import GroupChatOrchestration
+from semantic_kernel.agents.runtime import InProcessRuntime
+
+DEFAULT_THRESHOLD = 0.2
+
+
+def metric(value, unit, better="lower"):
+    return {"value": value, "unit": unit, "better": better}
+
+
+async def bench_provisioning(resumes):
+    """Cold (empty caches, fresh service) versus warm (second run on the same pool) run_workflow"""
+    pool = ProjectClientPool(backend="fake")
+    await pool.get_client()
+    pool.manifest = FileManifest(FAKE_ENDPOINT, path=os.path.join(os.getcwd(), "agent_cache.json"))
+    server.MAX_RESUMES = resumes
+    results = {}
+    for label in ("cold", "warm"):
+        workflow = server.AgentWorkflow(f"bench-{label}", pool=pool)
+        start = time.perf_counter()
+        await workflow.run_workflow()
+        elapsed = time.perf_counter() - start
+        if workflow.status != "completed":
+            raise RuntimeError(f"{label} run ended with status {workflow.status}")
+        workflow.messages.close()
+        results[f"provisioning.{label}_s"] = metric(workflow.provisioning_timings["total"]["duration"], "s")
+        results[f"run.{label}_s"] = metric(elapsed, "s")
+    await pool.close()
+    return results
+
+
+async def bench_rounds(rounds):
+    """Wall time per group chat round with zero-latency fake agents, i.e. pure orchestration overhead"""
+    client = FakeProjectClient(latency=0, agent_latency=0, script={"recruiter": ["Noted."], "workflow": ["Go on."]})
+    members = []
+    for name in ("recruiter", "workflow"):
+        definition = await client.agents.create_agent(model="fake-model", name=name, instructions="")
+        members.append(FakeAgent(client=client, definition=definition, description=name))
+    orchestration = GroupChatOrchestration(members=members, manager=CustomGroupChatManager(max_rounds=rounds))
+    runtime = InProcessRuntime()
+    runtime.start()
+    start = time.perf_counter()
+    result = await orchestration.invoke(task="Start.", runtime=runtime)
+    await result.get()
+    elapsed = time.perf_counter() - start
+    await runtime.stop_when_idle()
+    return {"group_chat.round_overhead_ms": metric(elapsed / rounds * 1000, "ms")}
+
+
+async def bench_status(message_counts, requests=50):
+    """Median /api/status latency (full payload and a 50-message delta) by run length"""
+    results = {}
+    client = server.app.test_client()
+    for count in message_counts:
+        workflow = server.AgentWorkflow(f"bench-status-{count}")
+        for i in range(count):
+            workflow.add_message("recruiter", f"message {i} " + "x" * 200)
+        server.idle_workflow = workflow
+        for label, path in (("full", "/api/status"), ("delta", f"/api/status?since={max(0, count - 50)}")):
+            times = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = await client.get(path)
+                await response.get_data()
+                times.append(time.perf_counter() - start)
+            results[f"status.{label}_{count}_ms"] = metric(statistics.median(times) * 1000, "ms")
+        workflow.messages.close()
+    return results
+
+
+async def bench_sse(subscriber_counts, messages=200):
+    """Delivered SSE events per second through hypercorn for each subscriber count"""
+    results = {}
+    for i, subscribers in enumerate(subscriber_counts):
+        # A new server per measurement; fresh ports avoid waiting for the previous socket to close
+        result = await load_sse.measure(subscribers, messages, interval=0.002, port=5070 + i)
+        results[f"sse.events_per_s_{subscribers}"] = metric(result["events_per_second"], "events/s", "higher")
+        results[f"sse.delivery_ratio_{subscribers}"] = metric(result["delivery_ratio"], "ratio", "higher")
+    return results
+
+
+async def bench_memory(messages):
+    """Memory held and peak while a long run publishes ``messages`` messages and agent turns"""
+    gc.collect()
+    tracemalloc.start()
+    workflow = server.AgentWorkflow("bench-memory")
+    await scripted_workflow(workflow, messages=messages, interval=0)
+    for i in range(messages):
+        workflow.agent_stats.get(("recruiter", "workflow")[i % 2]).record_invocation(1.5, 800, 0.4)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    workflow.messages.close()
+    return {
+        "memory.held_mib": metric(current / 2**20, "MiB"),
+        "memory.peak_mib": metric(peak / 2**20, "MiB"),
+    }
+
+
+async def run_suite(args):
+    metrics = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        # run_workflow reads job_description.pdf and resumes/ from the working directory
+        cwd = os.getcwd()
+        os.chdir(data_dir)
+        try:
+            create_data.create_job_posting()
+            create_data.generate_resumes(args.resumes, "resumes", seed=1, workers=1)
+            print("provisioning...", flush=True)
+            metrics.update(await bench_provisioning(args.resumes))
+        finally:
+            os.chdir(cwd)
+    print("group chat rounds...", flush=True)
+    metrics.update(await bench_rounds(args.rounds))
+    print("/api/status...", flush=True)
+    metrics.update(await bench_status(args.status_messages))
+    print("SSE fan-out...", flush=True)
+    metrics.update(await bench_sse(args.subscribers))
+    print("memory...", flush=True)
+    metrics.update(await bench_memory(args.memory_messages))
+    return metrics
+
+
+def best_of(runs):
+    """Per metric, the best value across repeated runs, which filters out scheduling noise"""
+    merged = {}
+    for metrics in runs:
+        for name, value in metrics.items():
+            current = merged.get(name)
+            pick = max if value["better"] == "higher" else min
+            if current is None or pick(current["value"], value["value"]) != current["value"]:
+                merged[name] = value
+    return merged
+
+
+def compare(metrics, baseline, threshold):
+    """Print current versus baseline values; return the names of metrics that regressed"""
+    regressions = []
+    print(f"{'metric':<34} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, current in metrics.items():
+        reference = baseline.get(name)
+        if reference is None or not reference["value"]:
+            print(f"{name:<34} {'-':>12} {current['value']:>12.4g} {'new':>9}")
+            continue
+        change = current["value"] / reference["value"] - 1
+        worse = change > threshold if current["better"] == "lower" else change < -threshold
+        if worse:
+            regressions.append(name)
+        print(f"{name:<34} {reference['value']:>12.4g} {current['value']:>12.4g} {change:>+8.0%}"
+              + ("  REGRESSION" if worse else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare with this results file")
+    parser.add_argument("--update-baseline", metavar="PATH", help="write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative change that counts as a regression (default 0.2 = 20%%)")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a fast smoke run")
+    parser.add_argument("--repeat", type=int, default=1, help="run the suite this many times and keep the best values")
+    args = parser.parse_args()
+    args.resumes = 10 if args.quick else 50
+    args.rounds = 10 if args.quick else 40
+    args.status_messages = [100, 1000] if args.quick else [100, 1000, 10000]
+    args.subscribers = [1, 100] if args.quick else [1, 100, 1000]
+    args.memory_messages = 2000 if args.quick else 20000
+
+    metrics = best_of(asyncio.run(run_suite(args)) for _ in range(max(1, args.repeat)))
+    results = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "repeat": args.repeat,
+        "metrics": metrics,
+    }
+    for path in (args.output, args.update_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("quick") != args.quick:
+            print("warning: baseline and this run use different sizes (--quick)")
+        regressions = compare(metrics, baseline["metrics"], args.threshold)
+    else:
+        for name, value in metrics.items():
+            print(f"{name:<34} {value['value']:>12.4g} {value['unit']}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
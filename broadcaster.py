@@ -0,0 +1,146 @@
+"""Publish/subscribe fan-out of workflow messages to Server-Sent Event clients.
+
+Every published message gets a monotonically increasing sequence number that
+doubles as the SSE event ID, so a reconnecting browser can resume from its
+``Last-Event-ID``. Each subscriber reads from its own bounded ring buffer; a
+subscriber that falls behind either loses its oldest events (and is told how
+many it missed) or is disconnected, depending on the slow-consumer policy.
+Heartbeats come from a single shared timer instead of per-connection polling.
+
+All methods must be called from the event loop that serves the streams.
+"""
+import os
+import json
+import asyncio
+from collections import deque
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "disconnect")
+
+DEFAULT_BUFFER_SIZE = int(os.environ.get("SSE_BUFFER_SIZE", "256"))
+DEFAULT_HISTORY_SIZE = int(os.environ.get("SSE_HISTORY_SIZE", "1000"))
+DEFAULT_HEARTBEAT_INTERVAL = float(os.environ.get("SSE_HEARTBEAT_SECONDS", "15"))
+
+HEARTBEAT = object()
+
+
+def format_sse(seq, data, event=None):
+    """Format one Server-Sent Event frame"""
+    lines = [f"id: {seq}"]
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscriber:
+    def __init__(self, buffer_size):
+        self.buffer = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self.closed = False
+        self.wakeup = asyncio.Event()
+
+
+class Broadcaster:
+    def __init__(
+        self,
+        buffer_size=DEFAULT_BUFFER_SIZE,
+        history_size=DEFAULT_HISTORY_SIZE,
+        heartbeat_interval=DEFAULT_HEARTBEAT_INTERVAL,
+        slow_consumer_policy="drop_oldest",
+    ):
+        if slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy {slow_consumer_policy!r}")
+        self.buffer_size = buffer_size
+        self.heartbeat_interval = heartbeat_interval
+        self.slow_consumer_policy = slow_consumer_policy
+        self.seq = 0
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self._heartbeat_handle = None
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, message, event=None, retain=True):
+        """Assign the next sequence number to ``message`` (a dict), fan it out and return the number
+
+        ``retain=False`` events (streaming deltas) reach live subscribers but are not replayed on reconnect.
+        """
+        self.seq += 1
+        message["seq"] = self.seq
+        entry = (self.seq, json.dumps(message), event)
+        if retain:
+            self._history.append(entry)
+        for subscriber in list(self._subscribers):
+            self._deliver(subscriber, entry)
+        return self.seq
+
+    def _deliver(self, subscriber, entry):
+        if len(subscriber.buffer) == subscriber.buffer.maxlen:
+            if self.slow_consumer_policy == "disconnect":
+                subscriber.closed = True
+                self._subscribers.discard(subscriber)
+                subscriber.wakeup.set()
+                return
+            subscriber.dropped += 1  # deque discards the oldest entry on append
+        subscriber.buffer.append(entry)
+        subscriber.wakeup.set()
+
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber, replaying retained history after ``last_event_id``"""
+        subscriber = Subscriber(self.buffer_size)
+        if last_event_id is not None:
+            missed = [entry for entry in self._history if entry[0] > last_event_id]
+            if self._history and self._history[0][0] > last_event_id + 1:
+                subscriber.dropped += self._history[0][0] - last_event_id - 1
+            for entry in missed[-self.buffer_size:]:
+                subscriber.buffer.append(entry)
+            subscriber.dropped += max(0, len(missed) - self.buffer_size)
+        self._subscribers.add(subscriber)
+        self._ensure_heartbeat()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.closed = True
+        self._subscribers.discard(subscriber)
+        subscriber.wakeup.set()
+
+    def _ensure_heartbeat(self):
+        if self._heartbeat_handle is None and self.heartbeat_interval > 0:
+            loop = asyncio.get_running_loop()
+            self._heartbeat_handle = loop.call_later(self.heartbeat_interval, self._heartbeat)
+
+    def _heartbeat(self):
+        self._heartbeat_handle = None
+        if not self._subscribers:
+            return
+        # Only idle subscribers need a keep-alive frame
+        for subscriber in self._subscribers:
+            if not subscriber.buffer:
+                subscriber.buffer.append(HEARTBEAT)
+                subscriber.wakeup.set()
+        self._ensure_heartbeat()
+
+    async def stream(self, last_event_id=None):
+        """Yield SSE frames for a new subscriber until the client disconnects"""
+        subscriber = self.subscribe(last_event_id)
+        try:
+            while True:
+                while not subscriber.buffer and not subscriber.closed:
+                    subscriber.wakeup.clear()
+                    await subscriber.wakeup.wait()
+                if subscriber.closed and not subscriber.buffer:
+                    return
+                entries = list(subscriber.buffer)
+                subscriber.buffer.clear()
+                dropped, subscriber.dropped = subscriber.dropped, 0
+                if dropped:
+                    yield f"event: dropped\ndata: {json.dumps({'type': 'dropped', 'count': dropped})}\n\n"
+                for entry in entries:
+                    if entry is HEARTBEAT:
+                        yield ": heartbeat\n\n"
+                    else:
+                        yield format_sse(*entry)
+        finally:
+            self.unsubscribe(subscriber)
@@ -0,0 +1,169 @@
+"""Typed candidate records from the recruiter's rankings, streamed to pluggable sinks.
+
+Every recruiter reply with a ranked table is parsed into ``CandidateRecord``
+rows as soon as it arrives (see ``rankings.parse_rankings``), and the rows
+are written to every configured sink straight away. So consumers read
+rankings incrementally instead of scraping transcripts. A later ranking in
+the same run supersedes the earlier ones; records carry its number in
+``ranking``. Sinks are set in ``RESULT_SINKS`` as comma-separated
+``kind:path`` entries, for example ``jsonl:results.jsonl,sqlite:results.sqlite``.
+Any object with ``write(records)`` and ``close()`` can be a sink.
+"""
+import os
+import csv
+import json
+import sqlite3
+from collections import namedtuple
+from datetime import datetime
+
+from rankings import parse_rankings
+
+# Empty writes no files; records are still served by /api/runs/<id>/results
+DEFAULT_RESULT_SINKS = os.environ.get("RESULT_SINKS", "")
+
+# seq numbers a run's records in order; evidence is the ranking row's remaining columns
+CandidateRecord = namedtuple("CandidateRecord", [
+    "seq", "run_id", "posting", "ranking", "rank", "name", "score", "evidence", "source", "created_at",
+])
+
+
+class JSONLSink:
+    """Appends one JSON object per record"""
+
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, records):
+        for record in records:
+            self._file.write(json.dumps(record._asdict()) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class CSVSink:
+    """Appends one row per record, with a header when the file is new"""
+
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        if self._file.tell() == 0:
+            self._writer.writerow(CandidateRecord._fields)
+
+    def write(self, records):
+        self._writer.writerows(records)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink:
+    """Writes each batch of records as a Parquet row group (needs pyarrow); the file is replaced per process"""
+
+    def __init__(self, path):
+        # Imported here so that pyarrow is only needed when a Parquet sink is configured
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema([
+            ("seq", pa.int64()), ("run_id", pa.string()), ("posting", pa.string()), ("ranking", pa.int64()),
+            ("rank", pa.int64()), ("name", pa.string()), ("score", pa.float64()), ("evidence", pa.string()),
+            ("source", pa.string()), ("created_at", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, records):
+        columns = list(zip(*records))
+        self._writer.write_table(self._pa.Table.from_arrays(
+            [self._pa.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+            schema=self._schema,
+        ))
+
+    def close(self):
+        self._writer.close()
+
+
+class SQLiteSink:
+    """Upserts records into a ``candidate_records`` table"""
+
+    def __init__(self, path):
+        # Only ever used from the event loop thread, but not necessarily the one that opened it
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS candidate_records (seq INTEGER NOT NULL, run_id TEXT, posting TEXT, "
+            "ranking INTEGER NOT NULL, rank INTEGER NOT NULL, name TEXT NOT NULL, score REAL, evidence TEXT, "
+            "source TEXT, created_at TEXT NOT NULL, PRIMARY KEY (run_id, posting, seq))"
+        )
+
+    def write(self, records):
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO candidate_records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", records
+            )
+
+    def close(self):
+        self._db.close()
+
+
+SINKS = {"jsonl": JSONLSink, "csv": CSVSink, "parquet": ParquetSink, "sqlite": SQLiteSink}
+
+
+def open_sinks(spec=DEFAULT_RESULT_SINKS):
+    """The sinks in a ``kind:path,kind:path`` spec"""
+    sinks = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        kind, _, path = entry.partition(":")
+        if kind not in SINKS or not path:
+            raise ValueError(f"Invalid result sink {entry!r}, expected kind:path with kind one of {tuple(SINKS)}")
+        sinks.append(SINKS[kind](path))
+    return sinks
+
+
+class ResultCollector:
+    """The records of one run (or one batch posting), kept in memory and written to ``sinks`` as they come.
+
+    A sink that fails is reported to ``on_error(sink, exception)`` and does not stop the run.
+    """
+
+    def __init__(self, run_id=None, sinks=(), posting=None, on_error=None):
+        self.run_id = run_id
+        self.posting = posting
+        self.sinks = list(sinks)
+        self.on_error = on_error
+        self.records = []
+        self.rankings = 0
+
+    def add_reply(self, text, source=None):
+        """Record the ranking in ``text``, if it has one; returns the new records"""
+        candidates = parse_rankings(text, source=source)
+        if not candidates:
+            return []
+        self.rankings += 1
+        created_at = datetime.now().isoformat()
+        records = [
+            CandidateRecord(len(self.records) + i, self.run_id, self.posting, self.rankings, i + 1, candidate.name,
+                            candidate.score, candidate.notes, candidate.source, created_at)
+            for i, candidate in enumerate(candidates)
+        ]
+        self.records.extend(records)
+        for sink in self.sinks:
+            try:
+                sink.write(records)
+            except Exception as e:
+                if self.on_error is None:
+                    raise
+                self.on_error(sink, e)
+        return records
+
+    def latest(self):
+        """Records of the most recent ranking"""
+        return [record for record in self.records if record.ranking == self.rankings]
+
+    def since(self, seq):
+        """Every record from ``seq`` on"""
+        return self.records[seq:]
@@ -0,0 +1,218 @@
+"""Application-scoped Azure clients shared by every workflow run.
+
+``ProjectClientPool`` owns one credential, one ``AIProjectClient`` and one
+aiohttp session for the lifetime of the app, so runs reuse keep-alive
+connections instead of paying for a new credential-chain probe, token
+acquisition and connection pool each time. Tokens are cached by
+``CachingCredential`` and refreshed in the background before they expire,
+so no request ever waits on a token refresh. Every request of the agents client
+goes through the pool's ``scheduler.RequestScheduler``, which keeps it within
+the service's rate limits.
+
+With ``AGENT_BACKEND=fake`` the pool hands out an in-process
+``fake_backend.FakeProjectClient`` instead, and ``agent_class()`` returns
+``FakeAgent``, so runs work offline.
+"""
+import os
+import time
+import random
+import asyncio
+from collections import Counter
+
+import aiohttp
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.identity.aio import DefaultAzureCredential
+from azure.ai.projects.aio import AIProjectClient
+from semantic_kernel.agents import AzureAIAgent
+
+from agent_registry import AgentRegistry
+from fake_backend import FakeAgent, FakeProjectClient
+from file_cache import FileManifest
+from scheduler import RequestScheduler, pipeline_options
+
+# Refresh tokens this many seconds before they expire. Larger than the 300s
+# window in which azure-core's bearer token policy asks for a new token, so
+# the policy always finds a fresh token in the cache.
+DEFAULT_TOKEN_REFRESH_MARGIN = float(os.environ.get("TOKEN_REFRESH_MARGIN_SECONDS", "600"))
+DEFAULT_CONNECTION_LIMIT = int(os.environ.get("HTTP_CONNECTION_LIMIT", "100"))
+
+AGENT_BACKENDS = ("azure", "fake")
+DEFAULT_AGENT_BACKEND = os.environ.get("AGENT_BACKEND", "azure")
+# Manifest scope of the fake backend, whose IDs never match the real service's
+FAKE_ENDPOINT = "fake://local"
+
+
+def agent_class(backend=DEFAULT_AGENT_BACKEND):
+    """The Semantic Kernel agent type for group chat members on ``backend``"""
+    return FakeAgent if backend == "fake" else AzureAIAgent
+
+
+def model_deployment_name(backend=DEFAULT_AGENT_BACKEND):
+    """Model deployment for new agents; the fake backend does not need one configured"""
+    if backend == "fake":
+        return os.environ.get("AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME", "fake-model")
+    return os.environ["AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME"]
+
+
+class CachingCredential:
+    """Async token credential wrapper that caches tokens and refreshes them proactively"""
+
+    def __init__(self, credential, refresh_margin=DEFAULT_TOKEN_REFRESH_MARGIN, stats=None):
+        self._credential = credential
+        self.refresh_margin = refresh_margin
+        self.stats = stats if stats is not None else Counter()
+        self._tokens = {}
+        self._token_kwargs = {}
+        self._locks = {}
+        self._refresh_tasks = {}
+
+    async def get_token(self, *scopes, claims=None, tenant_id=None, **kwargs):
+        self.stats["token_requests"] += 1
+        if claims:
+            # Claims challenges (e.g. continuous access evaluation) must bypass the cache
+            self.stats["token_fetches"] += 1
+            return await self._credential.get_token(*scopes, claims=claims, tenant_id=tenant_id, **kwargs)
+
+        key = (scopes, tenant_id)
+        token = self._tokens.get(key)
+        if token and token.expires_on - time.time() > self.refresh_margin / 2:
+            self.stats["token_cache_hits"] += 1
+            return token
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            token = self._tokens.get(key)
+            if token and token.expires_on - time.time() > self.refresh_margin / 2:
+                self.stats["token_cache_hits"] += 1
+                return token
+            self._token_kwargs[key] = kwargs
+            token = await self._fetch(key)
+        return token
+
+    async def _fetch(self, key):
+        scopes, tenant_id = key
+        self.stats["token_fetches"] += 1
+        token = await self._credential.get_token(*scopes, tenant_id=tenant_id, **self._token_kwargs.get(key, {}))
+        self._tokens[key] = token
+        self._schedule_refresh(key, token)
+        return token
+
+    def _schedule_refresh(self, key, token):
+        task = self._refresh_tasks.get(key)
+        if task and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+        self._refresh_tasks[key] = asyncio.create_task(self._refresh_later(key, token))
+
+    async def _refresh_later(self, key, token):
+        # Jitter avoids several processes refreshing in lockstep
+        delay = token.expires_on - time.time() - self.refresh_margin * random.uniform(0.8, 1.0)
+        await asyncio.sleep(max(0.0, delay))
+        try:
+            async with self._locks.setdefault(key, asyncio.Lock()):
+                await self._fetch(key)
+            self.stats["token_refreshes"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Keep serving the old token; get_token fetches synchronously once it is too old
+            self.stats["token_refresh_failures"] += 1
+
+    async def close(self):
+        for task in self._refresh_tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._refresh_tasks.values(), return_exceptions=True)
+        self._refresh_tasks.clear()
+        await self._credential.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_details):
+        await self.close()
+
+
+class ProjectClientPool:
+    """Lazily creates one credential, project client, file manifest and agent registry and hands them to all runs"""
+
+    def __init__(self, endpoint=None, connection_limit=DEFAULT_CONNECTION_LIMIT, backend=DEFAULT_AGENT_BACKEND,
+                 scheduler=None):
+        if backend not in AGENT_BACKENDS:
+            raise ValueError(f"Unknown agent backend {backend!r}, expected one of {AGENT_BACKENDS}")
+        self.endpoint = endpoint
+        self.connection_limit = connection_limit
+        self.backend = backend
+        self.scheduler = scheduler or RequestScheduler()
+        self.credential = None
+        self.manifest = None
+        self.registry = None
+        self.counters = Counter()
+        self._client = None
+        self._session = None
+        self._lock = asyncio.Lock()
+
+    def _trace_config(self):
+        """aiohttp hooks that count requests and new versus reused connections"""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.counters["http_requests"] += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.counters["http_connections_created"] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.counters["http_connections_reused"] += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    async def get_client(self):
+        """Return the shared AIProjectClient, creating it on first use"""
+        async with self._lock:
+            self.counters["client_acquisitions"] += 1
+            if self._client is None and self.backend == "fake":
+                self._client = FakeProjectClient(scheduler=self.scheduler)
+                self.manifest = FileManifest(FAKE_ENDPOINT)
+                self.registry = AgentRegistry(self._client)
+                self.counters["clients_created"] += 1
+            elif self._client is None:
+                endpoint = self.endpoint or os.environ["AZURE_AI_AGENT_ENDPOINT"]
+                self.credential = CachingCredential(DefaultAzureCredential(), stats=self.counters)
+                self._session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=self.connection_limit, keepalive_timeout=60),
+                    trace_configs=[self._trace_config()],
+                )
+                # The project client and its agents client share one transport and connection pool
+                transport = AioHttpTransport(session=self._session, session_owner=False)
+                self._client = AIProjectClient(endpoint=endpoint, credential=self.credential, transport=transport,
+                                               **pipeline_options(self.scheduler))
+                self.manifest = FileManifest(endpoint)
+                self.registry = AgentRegistry(self._client)
+                self.counters["clients_created"] += 1
+            return self._client
+
+    def stats(self):
+        """Connection reuse, token refresh and request scheduling counters"""
+        counters = dict(self.counters)
+        counters["client_reuses"] = counters.get("client_acquisitions", 0) - counters.get("clients_created", 0)
+        counters["active"] = self._client is not None
+        counters["backend"] = self.backend
+        counters["scheduler"] = self.scheduler.stats()
+        if self.backend == "fake" and self._client is not None:
+            counters["fake_service"] = self._client.agents.stats()
+        return counters
+
+    async def close(self):
+        """Close the shared client, connection pool and credential (on application shutdown)"""
+        async with self._lock:
+            if self._client is not None:
+                await self._client.close()
+                self._client = None
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+            if self.credential is not None:
+                await self.credential.close()
+                self.credential = None
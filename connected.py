@@ -0,0 +1,184 @@
+"""Call agents from local code instead of through server-side connected-agent tools.
+
+Server-side ``ConnectedAgentTool`` calls run one at a time per tool, and they
+return free text. ``ShardedScreeningPlugin`` is a local function tool for the
+recruiter. It queries every screening shard concurrently, parses each shard's
+ranked table and returns one merged top-K table. ``JobPostingPlugin`` does the
+same for the job posting summary. Because these calls are made locally, a
+``ResponseCache`` can answer repeated questions without calling the agent,
+and agents with local function tools (``local_search.SearchTool``) have
+their function calls executed in this process.
+"""
+import os
+import json
+import time
+import asyncio
+from typing import Annotated
+
+from azure.ai.agents.models import MessageRole, RunStatus, ToolOutput
+from semantic_kernel.functions import kernel_function
+
+from agent_registry import fingerprint_definition
+from rankings import RANKING_FORMAT_INSTRUCTIONS, format_rankings, merge_rankings, parse_rankings
+from response_cache import cache_key
+
+DEFAULT_SCREENING_TOP_K = int(os.environ.get("SCREENING_TOP_K", "10"))
+RUN_POLL_INTERVAL = 0.25
+
+
+def _call_function(functions, tool_call):
+    """Output of one requested function call; errors go back to the agent as text"""
+    function = functions.get(tool_call.function.name)
+    if function is None:
+        return f"Error: unknown function {tool_call.function.name}"
+    try:
+        return str(function(**json.loads(tool_call.function.arguments or "{}")))
+    except Exception as e:
+        return f"Error: {e}"
+
+
+async def _process_run(agents_client, run, functions):
+    """Poll ``run`` to a final status, answering its function calls from ``functions``"""
+    while run.status in (RunStatus.QUEUED, RunStatus.IN_PROGRESS, RunStatus.REQUIRES_ACTION):
+        if run.status == RunStatus.REQUIRES_ACTION:
+            tool_outputs = [
+                ToolOutput(tool_call_id=tool_call.id, output=_call_function(functions, tool_call))
+                for tool_call in run.required_action.submit_tool_outputs.tool_calls
+            ]
+            run = await agents_client.runs.submit_tool_outputs(
+                thread_id=run.thread_id, run_id=run.id, tool_outputs=tool_outputs
+            )
+            continue
+        await asyncio.sleep(RUN_POLL_INTERVAL)
+        run = await agents_client.runs.get(thread_id=run.thread_id, run_id=run.id)
+    return run
+
+
+async def invoke_agent(agents_client, agent_id, prompt, functions=None):
+    """Run an agent on a fresh thread; returns ``(reply_text, run)`` and deletes the thread.
+
+    ``functions`` maps the names of the agent's function tools to local callables.
+    """
+    thread = await agents_client.threads.create()
+    try:
+        await agents_client.messages.create(thread_id=thread.id, role=MessageRole.USER, content=prompt)
+        if functions:
+            run = await agents_client.runs.create(thread_id=thread.id, agent_id=agent_id)
+            run = await _process_run(agents_client, run, functions)
+        else:
+            run = await agents_client.runs.create_and_process(thread_id=thread.id, agent_id=agent_id)
+        if run.status != RunStatus.COMPLETED:
+            raise RuntimeError(f"Run {run.id} of agent {agent_id} ended with status {run.status}: {run.last_error}")
+        message = await agents_client.messages.get_last_message_text_by_role(thread_id=thread.id, role=MessageRole.AGENT)
+        return (message.text.value if message else ""), run
+    finally:
+        await agents_client.threads.delete(thread.id)
+
+
+def response_cache_key(agent, prompt, manifest, search_tool=None):
+    """Cache key for ``agent`` answering ``prompt``, or None if its data cannot be identified"""
+    if not (agent.metadata or {}).get("fingerprint"):
+        return None
+    # The registry fingerprint also covers the vector store IDs, which change whenever a store is
+    # recreated; the data behind them is covered by its content hash instead
+    fingerprint = fingerprint_definition(agent.model, agent.name, agent.instructions, agent.temperature, agent.tools)
+    file_search = agent.tool_resources.file_search if agent.tool_resources else None
+    hashes = [manifest.content_hash(store_id) for store_id in (file_search.vector_store_ids if file_search else [])]
+    if search_tool is not None:
+        hashes.append(search_tool.content_hash)
+    # A vector store not created through the manifest may change without notice
+    if None in hashes:
+        return None
+    return cache_key(fingerprint, ",".join(hashes), prompt, scope=manifest.endpoint)
+
+
+class AgentCaller:
+    """Ask agents one-off questions, through ``cache`` (a ``ResponseCache``) when one is given.
+
+    ``search_tools`` maps agent names to the ``SearchTool`` that answers their function calls.
+    """
+
+    def __init__(self, agents_client, agent_stats=None, cache=None, manifest=None, search_tools=None):
+        self.agents_client = agents_client
+        self.agent_stats = agent_stats
+        self.cache = cache if manifest is not None else None
+        self.manifest = manifest
+        self.search_tools = search_tools or {}
+
+    async def ask(self, agent, prompt):
+        """Return ``agent``'s reply to ``prompt``"""
+        search_tool = self.search_tools.get(agent.name)
+        key = response_cache_key(agent, prompt, self.manifest, search_tool) if self.cache is not None else None
+        if key is not None:
+            text = self.cache.get(key)
+            if text is not None:
+                if self.agent_stats is not None:
+                    self.agent_stats.get(agent.name).record_cache_hit()
+                return text
+        started = time.perf_counter()
+        text, run = await invoke_agent(self.agents_client, agent.id, prompt,
+                                       search_tool.functions if search_tool is not None else None)
+        if self.agent_stats is not None:
+            stats = self.agent_stats.get(agent.name)
+            stats.record_invocation(time.perf_counter() - started, content_length=len(text))
+            stats.record_tokens(run.usage)
+        if key is not None and text:
+            self.cache.put(key, text)
+        return text
+
+
+class JobPostingPlugin:
+    """Recruiter function tool that asks the job posting agent, in place of its connected-agent tool"""
+
+    def __init__(self, agents_client, job_posting_agent, agent_stats=None, cache=None, manifest=None,
+                 search_tools=None):
+        self.agent = job_posting_agent
+        self.caller = AgentCaller(agents_client, agent_stats, cache, manifest, search_tools)
+
+    @kernel_function(
+        name="summarize_job_posting",
+        description="Answers questions about the job posting, e.g. a summary of its requirements.",
+    )
+    async def summarize_job_posting(
+        self,
+        request: Annotated[str, "What to find out about the job posting"],
+    ) -> Annotated[str, "Answer based on the job description document"]:
+        return await self.caller.ask(self.agent, request)
+
+
+class ShardedScreeningPlugin:
+    """Recruiter function tool that screens every resume shard in parallel and merges the rankings"""
+
+    def __init__(self, agents_client, shard_agents, top_k=DEFAULT_SCREENING_TOP_K, agent_stats=None,
+                 cache=None, manifest=None, search_tools=None):
+        self.agents_client = agents_client
+        self.shard_agents = shard_agents
+        self.top_k = top_k
+        self.agent_stats = agent_stats
+        self.caller = AgentCaller(agents_client, agent_stats, cache, manifest, search_tools)
+
+    async def _screen_shard(self, agent, prompt):
+        text = await self.caller.ask(agent, prompt)
+        return parse_rankings(text, source=agent.name)
+
+    @kernel_function(
+        name="screen_candidates",
+        description="Screens all candidate resumes against a request (searching every resume shard in parallel) "
+                    "and returns the best candidates as one ranked table with scores from 0 to 100.",
+    )
+    async def screen_candidates(
+        self,
+        request: Annotated[str, "What to screen the candidates for, e.g. the job requirements to match"],
+    ) -> Annotated[str, "Markdown table of the top candidates across all shards"]:
+        prompt = f"{request}\n\n{RANKING_FORMAT_INSTRUCTIONS}"
+        results = await asyncio.gather(
+            *(self._screen_shard(agent, prompt) for agent in self.shard_agents), return_exceptions=True
+        )
+        rankings = [result for result in results if not isinstance(result, Exception)]
+        failed = [agent.name for agent, result in zip(self.shard_agents, results) if isinstance(result, Exception)]
+        if not rankings:
+            return f"Screening failed on every shard: {results[0]}"
+        text = format_rankings(merge_rankings(rankings, self.top_k))
+        if failed:
+            text += f"\n\nNo answer from {', '.join(failed)}; their candidates are missing."
+        return text
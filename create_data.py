@@ -1,7 +1,10 @@
 import os
 import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
 from fpdf import FPDF
-from datetime import datetime
 
 # Skills and experience pools
 PROGRAMMING_LANGUAGES = [
@@ -47,6 +50,31 @@ COMPANIES = [
     ("Fabrikam", "Digital Innovation")
 ]
 
+LOCATIONS = ["Seattle, WA", "Bellevue, WA", "Redmond, WA", "San Francisco, CA"]
+
+ROLES = [
+    "Software Engineer", "DevOps Engineer", "Data Scientist", "Cloud Architect", "ML Engineer",
+    "Security Engineer", "Backend Developer", "Frontend Developer", "Full Stack Developer",
+    "Site Reliability Engineer", "QA Engineer", "Systems Engineer"
+]
+
+# Names for bulk generation: every first/last pair, then hyphenated double last names
+FIRST_NAMES = [
+    "Alexander", "Maria", "Thomas", "Aisha", "Lucas", "Nina", "James", "Sarah", "Marcus", "Rachel",
+    "Omar", "Emma", "David", "Sofia", "Michael", "Priya", "Daniel", "Elena", "Kenji", "Fatima",
+    "Samuel", "Chloe", "Mateo", "Hannah", "Arjun", "Grace", "Noah", "Yuki", "Ethan", "Leila",
+    "Gabriel", "Olivia", "Ivan", "Amara", "Liam", "Mei", "Oscar", "Zara", "Victor", "Isabel",
+    "Hugo", "Anya", "Felix", "Nadia", "Jonah", "Camila", "Tariq", "Ingrid", "Ravi", "Lena"
+]
+
+LAST_NAMES = [
+    "Kumar", "Gonzalez", "Chen", "Patel", "Bishop", "Rodriguez", "Kim", "OConnor", "Singh", "Zhou",
+    "Hassan", "Thompson", "Nguyen", "Martinez", "Chang", "Okafor", "Schmidt", "Rossi", "Tanaka", "Haddad",
+    "Kowalski", "Dubois", "Silva", "Andersen", "Mehta", "Walsh", "Cohen", "Sato", "Morales", "Novak",
+    "Ibrahim", "Larsen", "Fischer", "Reyes", "Murphy", "Wang", "Petrov", "Adeyemi", "Lopez", "Berg",
+    "Yilmaz", "Costa", "Jensen", "Moreau", "Park", "Ali", "Hughes", "Romero", "Sharma", "Lindqvist"
+]
+
 CONTOSO_JOB_TEMPLATE = """
 {role_title}
 Contoso Corporation
@@ -91,17 +119,16 @@ CERTIFICATIONS
 {certifications}
 """
 
-def generate_experience(years_of_experience):
-    """Generate random work experience with realistic progression"""
-    experience = []
-    current_year = datetime.now().year
-    current_date = current_year
-    
-    companies_used = random.sample(COMPANIES, min(len(COMPANIES), years_of_experience // 2))
+def _experience_entries(years_of_experience, rng=random, current_year=None):
+    """Random work history with realistic progression, most recent job first"""
+    entries = []
+    current_date = current_year or datetime.now().year
+
+    companies_used = rng.sample(COMPANIES, min(len(COMPANIES), years_of_experience // 2))
     for company, industry in companies_used:
-        duration = random.randint(1, 3)
+        duration = rng.randint(1, 3)
         start_year = current_date - duration
-        
+
         # Generate random achievements
         achievements = [
             "Led development of cloud-native applications",
@@ -115,43 +142,90 @@ def generate_experience(years_of_experience):
             "Led agile transformation",
             "Reduced operational costs"
         ]
-        
-        experience.append(f"""
-{company} ({industry})
-{random.choice(['Senior', 'Lead', 'Principal', 'Staff'])} Engineer | {start_year} - {current_date if company == companies_used[-1][0] else start_year + duration}
-- {random.choice(achievements)}
-- {random.choice(achievements)}""")
-        
+
+        entries.append({
+            "company": company,
+            "industry": industry,
+            "title": f"{rng.choice(['Senior', 'Lead', 'Principal', 'Staff'])} Engineer",
+            "years": f"{start_year} - {current_date}",
+            "achievements": [rng.choice(achievements), rng.choice(achievements)],
+        })
+
         current_date = start_year
 
-    return "\n".join(reversed(experience))
+    return entries
+
+def _format_experience(entries):
+    return "\n".join(f"""
+{entry['company']} ({entry['industry']})
+{entry['title']} | {entry['years']}
+- {entry['achievements'][0]}
+- {entry['achievements'][1]}""" for entry in reversed(entries))
+
+def generate_experience(years_of_experience, rng=random, current_year=None):
+    """Generate random work experience with realistic progression"""
+    return _format_experience(_experience_entries(years_of_experience, rng, current_year))
+
+def _skill_groups(rng=random):
+    return {
+        "Programming": rng.sample(PROGRAMMING_LANGUAGES, 4),
+        "Frameworks": rng.sample(FRAMEWORKS, 3),
+        "Cloud & DevOps": rng.sample(CLOUD_TECHNOLOGIES, 4),
+        "Databases": rng.sample(DATABASES, 2),
+    }
+
+def _format_skills(groups):
+    return "".join(f"\n{group}: {', '.join(skills)}" for group, skills in groups.items())
 
-def generate_skills():
+def generate_skills(rng=random):
     """Generate a random but coherent set of skills"""
-    skills = []
-    # Pick random skills from each category
-    skills.extend(random.sample(PROGRAMMING_LANGUAGES, random.randint(3, 5)))
-    skills.extend(random.sample(FRAMEWORKS, random.randint(2, 4)))
-    skills.extend(random.sample(CLOUD_TECHNOLOGIES, random.randint(3, 5)))
-    skills.extend(random.sample(DATABASES, random.randint(2, 3)))
-    
-    # Group skills by category
-    return f"""
-Programming: {', '.join(random.sample(PROGRAMMING_LANGUAGES, 4))}
-Frameworks: {', '.join(random.sample(FRAMEWORKS, 3))}
-Cloud & DevOps: {', '.join(random.sample(CLOUD_TECHNOLOGIES, 4))}
-Databases: {', '.join(random.sample(DATABASES, 2))}"""
-
-def generate_certifications():
+    return _format_skills(_skill_groups(rng))
+
+def generate_certifications(rng=random):
     """Generate a realistic set of certifications"""
-    return "\n- ".join(random.sample(CERTIFICATIONS, random.randint(2, 4)))
+    return "\n- ".join(rng.sample(CERTIFICATIONS, rng.randint(2, 4)))
 
-def create_job_posting(output_path="job_description.pdf"):
-    """Create a Contoso-style job posting PDF"""
+def _wrap(pdf, line, width):
+    """Greedy word wrap of one line to ``width`` in the current font"""
+    if pdf.get_string_width(line) <= width:
+        return [line]
+    lines, current = [], ""
+    for word in line.split(" "):
+        candidate = f"{current} {word}" if current else word
+        if current and pdf.get_string_width(candidate) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    lines.append(current)
+    return lines
+
+def render_pdf(text, output_path, creation_date=None, line_height=10):
+    """Write plain text to a PDF, one 12pt line per row.
+
+    Lines are wrapped here and placed with ``FPDF.text``; FPDF's own
+    ``multi_cell`` line breaker is about ten times slower and dominated bulk
+    generation. A fixed ``creation_date`` makes the output byte-identical
+    across runs.
+    """
     pdf = FPDF()
+    if creation_date is not None:
+        pdf.set_creation_date(creation_date)
     pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    
+    pdf.set_font("helvetica", size=12)
+    # Baseline offset that matches a multi_cell row of the same height
+    baseline = (line_height + 0.3 * pdf.font_size) / 2
+    for paragraph in text.split("\n"):
+        for line in _wrap(pdf, paragraph, pdf.epw):
+            if pdf.y + line_height > pdf.page_break_trigger:
+                pdf.add_page()
+            if line.strip():
+                pdf.text(pdf.l_margin, pdf.y + baseline, line)
+            pdf.y += line_height
+    pdf.output(output_path)
+
+def create_job_posting(output_path="job_description.pdf", creation_date=None):
+    """Create a Contoso-style job posting PDF"""
     job_content = CONTOSO_JOB_TEMPLATE.format(
         role_title="Senior Cloud Solutions Engineer",
         location="Bellevue, WA",
@@ -172,38 +246,120 @@ def create_job_posting(output_path="job_description.pdf"):
 - Strong communication and presentation skills
 - Background in enterprise software development"""
     )
-    
-    pdf.multi_cell(0, 10, txt=job_content)
-    pdf.output(output_path)
 
-def create_resume(name, role, output_path):
-    """Create a resume PDF with randomized experience and skills"""
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    
-    years_of_experience = random.randint(5, 15)
-    
+    render_pdf(job_content, output_path, creation_date)
+
+def generate_resume(name, role, rng=random, current_year=None):
+    """Return ``(resume_text, fields)``; fields are the structured values the text was built from"""
+    years_of_experience = rng.randint(5, 15)
+    location = rng.choice(LOCATIONS)
+    experience = _experience_entries(years_of_experience, rng, current_year)
+    skills = _skill_groups(rng)
+    certifications = rng.sample(CERTIFICATIONS, rng.randint(2, 4))
+    email = f"{name.lower().replace(' ', '.')}@email.com"
+
     resume_content = RESUME_TEMPLATE.format(
         name=name,
-        email=f"{name.lower().replace(' ', '.')}@email.com",
+        email=email,
         phone="(555) 123-4567",
-        location=random.choice(["Seattle, WA", "Bellevue, WA", "Redmond, WA", "San Francisco, CA"]),
+        location=location,
         summary=f"""Experienced {role} with {years_of_experience}+ years in enterprise software development. 
         Specialized in cloud architecture and distributed systems.""",
-        experience=generate_experience(years_of_experience),
+        experience=_format_experience(experience),
         education="""
 Master of Science in Computer Science
 University of Washington | 2016
 
 Bachelor of Science in Software Engineering
 Georgia Institute of Technology | 2014""",
-        skills=generate_skills(),
-        certifications=generate_certifications()
+        skills=_format_skills(skills),
+        certifications="\n- ".join(certifications)
     )
-    
-    pdf.multi_cell(0, 10, txt=resume_content)
-    pdf.output(output_path)
+
+    fields = {
+        "name": name,
+        "role": role,
+        "email": email,
+        "location": location,
+        "years_experience": years_of_experience,
+        "companies": "; ".join(entry["company"] for entry in experience),
+        "programming": "; ".join(skills["Programming"]),
+        "frameworks": "; ".join(skills["Frameworks"]),
+        "cloud": "; ".join(skills["Cloud & DevOps"]),
+        "databases": "; ".join(skills["Databases"]),
+        "certifications": "; ".join(certifications),
+    }
+    return resume_content, fields
+
+def create_resume(name, role, output_path, rng=random, current_year=None, creation_date=None):
+    """Create a resume PDF with randomized experience and skills; returns its structured fields"""
+    resume_content, fields = generate_resume(name, role, rng, current_year)
+    render_pdf(resume_content, output_path, creation_date)
+    return fields
+
+def resume_filename(name, role):
+    """'Alexander Kumar', 'DevOps Engineer' -> 'Resume_DevOps_Engineer_Alexander_Kumar.pdf'"""
+    return f"Resume_{role.replace(' ', '_')}_{name.replace(' ', '_')}.pdf"
+
+def unique_names(count, rng=random):
+    """``count`` distinct candidate names: first/last pairs, then hyphenated double last names"""
+    last_count = len(LAST_NAMES)
+    pairs = len(FIRST_NAMES) * last_count
+    doubles = pairs * (last_count - 1)
+    if count > pairs + doubles:
+        raise ValueError(f"Can generate at most {pairs + doubles} unique names, not {count}")
+    picks = rng.sample(range(pairs), min(count, pairs))
+    picks += [pairs + pick for pick in rng.sample(range(doubles), max(0, count - pairs))]
+
+    names = []
+    for pick in picks:
+        if pick < pairs:
+            first, last = divmod(pick, last_count)
+            names.append(f"{FIRST_NAMES[first]} {LAST_NAMES[last]}")
+        else:
+            first, rest = divmod(pick - pairs, last_count * (last_count - 1))
+            last, other = divmod(rest, last_count - 1)
+            other += other >= last
+            names.append(f"{FIRST_NAMES[first]} {LAST_NAMES[last]}-{LAST_NAMES[other]}")
+    return names
+
+def _bulk_resume(task):
+    """Render one bulk resume in a worker process; its RNG depends only on the seed and index"""
+    seed, index, name, output_dir, current_year = task
+    rng = random.Random(f"{seed}:{index}")
+    role = rng.choice(ROLES)
+    filename = resume_filename(name, role)
+    creation_date = datetime(current_year, 1, 1, tzinfo=timezone.utc)
+    fields = create_resume(name, role, os.path.join(output_dir, filename), rng, current_year, creation_date)
+    return {"file": filename, **fields}
+
+def generate_resumes(count, output_dir="resumes", seed=0, workers=None, current_year=None):
+    """Render ``count`` resumes with unique names across a process pool; returns one field dict per resume.
+
+    Every resume draws from its own RNG seeded with ``(seed, index)``, so the
+    files are byte-identical for the same seed, year and count whatever the
+    number of workers.
+    """
+    current_year = current_year or datetime.now().year
+    os.makedirs(output_dir, exist_ok=True)
+    names = unique_names(count, random.Random(seed))
+    tasks = [(seed, index, name, output_dir, current_year) for index, name in enumerate(names)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [_bulk_resume(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_bulk_resume, tasks, chunksize=max(1, count // (workers * 8))))
+
+def write_manifest(rows, path):
+    """Write the resume fields as CSV, or as Parquet if ``path`` ends in .parquet (needs pyarrow)"""
+    # Imported here so that modules reusing the skill lists (prerank.py) do not pay for pandas
+    import pandas as pd
+
+    frame = pd.DataFrame(rows)
+    if path.endswith(".parquet"):
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
 
 def main():
     """Create job posting and resume files if they don't exist"""
@@ -223,9 +379,29 @@ def main():
         resume_path = os.path.join("resumes", resume_name)
         if not os.path.exists(resume_path):
             # Extract name from filename (e.g., "Resume_DevOps_Engineer_Alexander_Kumar.pdf" -> "Alexander Kumar")
-            name = " ".join(resume_name.split("_")[3:-1])
+            name = " ".join(os.path.splitext(resume_name)[0].split("_")[-2:])
             create_resume(name, "Software Engineer", resume_path)
             print(f"Created resume for {name}")
 
+def bulk_main(args):
+    """Generate ``args.count`` reproducible resumes (and optionally a manifest)"""
+    start = datetime.now()
+    rows = generate_resumes(args.count, args.output_dir, args.seed, args.workers, args.year)
+    print(f"Created {len(rows)} resumes in {args.output_dir} in {(datetime.now() - start).total_seconds():.1f}s")
+    if args.manifest:
+        write_manifest(rows, args.manifest)
+        print(f"Wrote manifest {args.manifest}")
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate the sample job description and resumes")
+    parser.add_argument("--count", type=int, help="generate this many resumes with unique names instead of the 15 samples")
+    parser.add_argument("--seed", type=int, default=0, help="same seed, count and year give byte-identical PDFs")
+    parser.add_argument("--workers", type=int, help="rendering processes (default: CPU count)")
+    parser.add_argument("--output-dir", default="resumes")
+    parser.add_argument("--year", type=int, help="year work histories end in (default: this year)")
+    parser.add_argument("--manifest", help="also write the structured fields to this .csv or .parquet file")
+    args = parser.parse_args()
+    if args.count:
+        bulk_main(args)
+    else:
+        main()
@@ -0,0 +1,750 @@
+"""Local stand-ins for the Azure AI agent service, used by benchmarks and offline runs.
+
+With ``AGENT_BACKEND=fake`` the web app and console run talk to a
+``FakeProjectClient`` instead of ``AIProjectClient``, and group chat members are
+``FakeAgent`` instead of ``AzureAIAgent``. Every service call sleeps for a
+latency drawn from a configurable distribution and can fail at a configurable
+rate. Agents answer from a script, and their replies are streamed in chunks.
+Runs, run steps, connected-agent calls and token usage are recorded the way the
+service reports them, so every performance feature can be measured end to end
+without Azure credentials. Like the service, it answers requests beyond its
+rate limit (or, for testing, a random share of them) with 429 and a
+``Retry-After`` header.
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+import hashlib
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any
+
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from semantic_kernel.agents import Agent, AgentResponseItem, AgentThread
+from semantic_kernel.contents import AuthorRole, ChatMessageContent, StreamingChatMessageContent
+
+# Latency specs: a number of seconds, or fixed:S, uniform:LO:HI, gauss:MEAN:SD,
+# lognormal:MEDIAN:SIGMA or exp:MEAN
+DEFAULT_FAKE_LATENCY = os.environ.get("FAKE_LATENCY", "lognormal:0.05:0.5")
+DEFAULT_FAKE_AGENT_LATENCY = os.environ.get("FAKE_AGENT_LATENCY", "lognormal:1.0:0.4")
+DEFAULT_FAKE_FAILURE_RATE = float(os.environ.get("FAKE_FAILURE_RATE", "0"))
+# Requests per second the fake service accepts per operation class (0 is unlimited) and the
+# probability that any request is throttled anyway; throttled requests get a 429
+DEFAULT_FAKE_RATE_LIMIT = float(os.environ.get("FAKE_RATE_LIMIT", "0"))
+DEFAULT_FAKE_THROTTLE_RATE = float(os.environ.get("FAKE_THROTTLE_RATE", "0"))
+DEFAULT_FAKE_RETRY_AFTER = float(os.environ.get("FAKE_RETRY_AFTER", "1"))
+# JSON file of scripted replies per agent name, merged over DEFAULT_SCRIPT
+DEFAULT_FAKE_SCRIPT = os.environ.get("FAKE_SCRIPT")
+DEFAULT_FAKE_SEED = os.environ.get("FAKE_SEED")
+
+# Share of an agent turn spent before the first token (retrieval, tool calls, prompt processing)
+FIRST_TOKEN_SHARE = 0.3
+STREAM_CHUNKS = 8
+
+JOB_SUMMARY = (
+    "Senior Cloud Solutions Engineer, Contoso Corporation (Bellevue, WA). Requirements: 5+ years of cloud "
+    "architecture and development, distributed systems and microservices, Azure/AWS/GCP, and a track record "
+    "of delivering complex technical solutions. Agile, communication skills and enterprise software background preferred."
+)
+
+# Replies per agent, by turn on a thread; the last entry repeats. {name} placeholders call the agent's tools:
+# a connected agent, a kernel function, or {candidates} for whichever screening tool it has
+# ({JobPosting_agent} also resolves to the local summarize_job_posting function).
+# Agents without a script answer with a ranking of the resumes in their vector stores.
+DEFAULT_SCRIPT = {
+    "recruiter": [
+        "Here is a summary of the job posting:\n{JobPosting_agent}",
+        "These candidates best match the job description:\n\n{candidates}",
+    ],
+    "workflow": [
+        "Please provide a list of 5 candidates that best match the job description. "
+        "Format as table, include columns with scoring and ranking.",
+        "COMPLETED",
+    ],
+    "JobPosting_agent": [JOB_SUMMARY],
+}
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+def parse_latency(spec):
+    """Return ``sample(rng) -> seconds`` for a latency spec such as '0.1' or 'lognormal:0.5:0.4'"""
+    try:
+        seconds = float(spec)
+        return lambda rng: seconds
+    except (TypeError, ValueError):
+        pass
+    kind, *params = spec.split(":")
+    params = [float(param) for param in params]
+    samplers = {
+        "fixed": lambda rng: params[0],
+        "uniform": lambda rng: rng.uniform(params[0], params[1]),
+        "gauss": lambda rng: max(0.0, rng.gauss(params[0], params[1])),
+        "lognormal": lambda rng: params[0] * math.exp(rng.gauss(0.0, params[1])),
+        "exp": lambda rng: rng.expovariate(1 / params[0]) if params[0] > 0 else 0.0,
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution {kind!r}, expected one of {tuple(samplers)}")
+    return samplers[kind]
+
+
+def load_script(path=DEFAULT_FAKE_SCRIPT):
+    """DEFAULT_SCRIPT, overridden per agent by the JSON file at ``path``"""
+    script = dict(DEFAULT_SCRIPT)
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            script.update(json.load(f))
+    return script
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _model(**fields):
+    return SimpleNamespace(**fields)
+
+
+def _fake_id(prefix):
+    # Random rather than sequential: IDs persisted by an earlier process (such as those in
+    # the file cache manifest) must not name a different object of this one
+    return f"{prefix}fake{uuid.uuid4().hex[:20]}"
+
+
+def _not_found(kind, id):
+    return ResourceNotFoundError(f"{kind} {id} not found")
+
+
+def _too_many_requests(operation, retry_after):
+    error = HttpResponseError(f"Simulated 429 Too Many Requests for {operation}")
+    error.status_code = 429
+    error.response = _model(status_code=429, reason="Too Many Requests", headers={"Retry-After": f"{retry_after:.3f}"})
+    return error
+
+
+def operation_class(operation):
+    """Scheduler operation class (see ``scheduler.OPERATION_CLASSES``) of a fake operation such as 'runs.get'"""
+    group, _, method = operation.rpartition(".")
+    if method in ("get", "list", "get_agent", "list_agents", "get_last_message_text_by_role"):
+        return "read"
+    if group.startswith("vector_store"):
+        return "vector_store"
+    if group == "files":
+        return "upload"
+    if method in ("create_agent", "delete_agent"):
+        return "agent"
+    return "run" if group == "runs" else "thread"
+
+
+def candidate_ranking(filenames, top_k=5):
+    """A markdown ranking of the candidates behind resume file names, with stable pseudo-random scores"""
+    rows = []
+    for filename in filenames:
+        parts = os.path.splitext(filename)[0].split("_")
+        name = " ".join(parts[-2:])
+        role = " ".join(parts[1:-2]) or "Candidate"
+        score = 50 + int(hashlib.sha256(name.encode("utf-8")).hexdigest(), 16) % 46
+        rows.append((score, name, role))
+    rows.sort(key=lambda row: (-row[0], row[1]))
+    lines = ["| Candidate | Score | Notes |", "|---|---|---|"]
+    lines += [f"| {name} | {score} | {role}; cloud and distributed systems experience |" for score, name, role in rows[:top_k]]
+    return "\n".join(lines)
+
+
+class FakeFile:
+    def __init__(self, id, filename):
+        self.id = id
+        self.filename = filename
+
+
+class FakeFilesClient:
+    """Mimics ``project_client.agents.files`` with simulated upload latency.
+
+    As part of a ``FakeAgentsClient`` (``service``), its round trips are that
+    service's, with its latency, rate limit and scheduler.
+    """
+
+    def __init__(self, latency=0.1, jitter=0.05, failure_rate=0.0, seed=None, service=None):
+        # A number is the mean of a normal distribution with standard deviation ``jitter``
+        self._latency = parse_latency(latency) if isinstance(latency, str) else parse_latency(f"gauss:{latency}:{jitter}")
+        self.failure_rate = failure_rate
+        self.uploads = 0
+        self.files = {}
+        self._service = service
+        self._rng = random.Random(seed)
+
+    async def _round_trip(self, operation):
+        if self._service is not None:
+            await self._service.simulate(operation)
+        else:
+            await asyncio.sleep(self._latency(self._rng))
+
+    async def upload_and_poll(self, file_path, purpose=None, **kwargs):
+        await self._round_trip("files.upload_and_poll")
+        if self._rng.random() < self.failure_rate:
+            raise ConnectionError(f"Simulated upload failure for {file_path}")
+        self.uploads += 1
+        file = FakeFile(_fake_id("assistant-"), os.path.basename(file_path))
+        self.files[file.id] = file
+        return file
+
+    async def get(self, file_id, **kwargs):
+        await self._round_trip("files.get")
+        if file_id not in self.files:
+            raise _not_found("File", file_id)
+        return self.files[file_id]
+
+    async def delete(self, file_id, **kwargs):
+        await self._round_trip("files.delete")
+        if self.files.pop(file_id, None) is None:
+            raise _not_found("File", file_id)
+
+
+class _Operations:
+    """One operation group of ``FakeAgentsClient`` (``threads``, ``runs``, ...)"""
+
+    def __init__(self, backend):
+        self._backend = backend
+
+
+class FakeVectorStoresClient(_Operations):
+    async def create_and_poll(self, file_ids=None, name=None, **kwargs):
+        await self._backend.simulate("vector_stores.create_and_poll")
+        store = _model(id=self._backend.new_id("vs"), name=name, status="completed",
+                       file_ids=list(file_ids or []), created_at=_now())
+        self._backend._vector_stores[store.id] = store
+        return store
+
+    async def get(self, vector_store_id, **kwargs):
+        await self._backend.simulate("vector_stores.get")
+        return self._backend.vector_store(vector_store_id)
+
+    async def delete(self, vector_store_id, **kwargs):
+        await self._backend.simulate("vector_stores.delete")
+        self._backend.vector_store(vector_store_id)
+        del self._backend._vector_stores[vector_store_id]
+
+
+class FakeVectorStoreFileBatchesClient(_Operations):
+    async def create_and_poll(self, vector_store_id, file_ids=None, **kwargs):
+        await self._backend.simulate("vector_store_file_batches.create_and_poll")
+        store = self._backend.vector_store(vector_store_id)
+        store.file_ids.extend(file_id for file_id in file_ids or [] if file_id not in store.file_ids)
+        return _model(id=self._backend.new_id("vsfb"), vector_store_id=vector_store_id, status="completed")
+
+
+class FakeVectorStoreFilesClient(_Operations):
+    async def delete(self, vector_store_id, file_id, **kwargs):
+        await self._backend.simulate("vector_store_files.delete")
+        store = self._backend.vector_store(vector_store_id)
+        if file_id not in store.file_ids:
+            raise _not_found("Vector store file", file_id)
+        store.file_ids.remove(file_id)
+
+
+class FakeThreadsClient(_Operations):
+    async def create(self, **kwargs):
+        await self._backend.simulate("threads.create")
+        return self._backend.new_thread()
+
+    async def delete(self, thread_id, **kwargs):
+        await self._backend.simulate("threads.delete")
+        self._backend.thread(thread_id)
+        del self._backend._threads[thread_id]
+
+
+class FakeMessagesClient(_Operations):
+    async def create(self, thread_id, role, content, **kwargs):
+        await self._backend.simulate("messages.create")
+        return self._backend.add_message(thread_id, role, content)
+
+    async def list(self, thread_id, **kwargs):
+        await self._backend.simulate("messages.list")
+        for message in reversed(self._backend.thread(thread_id).messages):
+            yield message
+
+    async def get_last_message_text_by_role(self, thread_id, role, **kwargs):
+        await self._backend.simulate("messages.get_last_message_text_by_role")
+        for message in reversed(self._backend.thread(thread_id).messages):
+            if message.role == role:
+                return _model(text=_model(value=message.content))
+        return None
+
+
+class FakeRunsClient(_Operations):
+    async def create(self, thread_id, agent_id, **kwargs):
+        """Start a run in the background; function tool calls wait for ``submit_tool_outputs``"""
+        await self._backend.simulate("runs.create")
+        run = self._backend.new_run(thread_id, agent_id)
+        self._backend.start(run)
+        return run
+
+    async def submit_tool_outputs(self, thread_id, run_id, tool_outputs, **kwargs):
+        await self._backend.simulate("runs.submit_tool_outputs")
+        run = await self.get(thread_id, run_id)
+        waiting = self._backend._tool_outputs.pop(run_id, None)
+        if waiting is None:
+            raise ValueError(f"Run {run_id} is not waiting for tool outputs")
+        run.status = "in_progress"
+        run.required_action = None
+        waiting.set_result([output.output for output in tool_outputs])
+        return run
+
+    async def create_and_process(self, thread_id, agent_id, **kwargs):
+        await self._backend.simulate("runs.create_and_process")
+        run = self._backend.new_run(thread_id, agent_id)
+        async for _ in self._backend.execute(run):
+            pass
+        return run
+
+    async def get(self, thread_id, run_id, **kwargs):
+        await self._backend.simulate("runs.get")
+        run = self._backend._runs.get(run_id)
+        if run is None or run.thread_id != thread_id:
+            raise _not_found("Run", run_id)
+        return run
+
+    async def list(self, thread_id, limit=None, order="desc", **kwargs):
+        await self._backend.simulate("runs.list")
+        runs = self._backend.thread(thread_id).runs
+        for run in (runs[::-1] if order == "desc" else runs)[:limit]:
+            yield run
+
+
+class FakeRunStepsClient(_Operations):
+    async def list(self, thread_id, run_id, **kwargs):
+        await self._backend.simulate("run_steps.list")
+        for step in self._backend._run_steps.get(run_id, []):
+            yield step
+
+
+class FakeAgentsClient:
+    """Mimics ``project_client.agents``: files, vector stores, agents, threads, messages, runs and run steps.
+
+    ``latency`` applies to every service call and ``agent_latency`` to a whole
+    agent turn; both are latency specs (see ``parse_latency``). Each call fails
+    with ``ConnectionError`` with probability ``failure_rate``, and each agent run
+    ends with status "failed" with the same probability. Beyond ``rate_limit``
+    requests per second of one operation class, and with probability
+    ``throttle_rate`` in any case, a call raises a 429 ``HttpResponseError``.
+    Calls go through ``scheduler`` (a ``scheduler.RequestScheduler``) if one
+    is given, as requests of the real client go through its HTTP pipeline.
+    ``calls``, ``failures`` and ``throttled`` count operations by name.
+    """
+
+    def __init__(self, latency=DEFAULT_FAKE_LATENCY, agent_latency=DEFAULT_FAKE_AGENT_LATENCY,
+                 failure_rate=DEFAULT_FAKE_FAILURE_RATE, script=None, seed=DEFAULT_FAKE_SEED,
+                 rate_limit=DEFAULT_FAKE_RATE_LIMIT, throttle_rate=DEFAULT_FAKE_THROTTLE_RATE,
+                 retry_after=DEFAULT_FAKE_RETRY_AFTER, scheduler=None):
+        self.latency = parse_latency(latency)
+        self.agent_latency = parse_latency(agent_latency)
+        self.failure_rate = failure_rate
+        self.rate_limit = rate_limit
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.scheduler = scheduler
+        self.script = script if script is not None else load_script()
+        self.rng = random.Random(seed)
+        self.calls = Counter()
+        self.failures = Counter()
+        self.throttled = Counter()
+        self._buckets = {}
+        self._agents = {}
+        self._vector_stores = {}
+        self._threads = {}
+        self._runs = {}
+        self._run_steps = {}
+        self._turns = Counter()
+        self._tool_outputs = {}
+        self._background_runs = set()
+
+        self.files = FakeFilesClient(str(latency), seed=self.rng.random(), service=self)
+        self.vector_stores = FakeVectorStoresClient(self)
+        self.vector_store_file_batches = FakeVectorStoreFileBatchesClient(self)
+        self.vector_store_files = FakeVectorStoreFilesClient(self)
+        self.threads = FakeThreadsClient(self)
+        self.messages = FakeMessagesClient(self)
+        self.runs = FakeRunsClient(self)
+        self.run_steps = FakeRunStepsClient(self)
+
+    def new_id(self, prefix):
+        return _fake_id(f"{prefix}_")
+
+    async def simulate(self, operation):
+        """One service round trip, through ``scheduler`` if there is one"""
+        if self.scheduler is None:
+            return await self._round_trip(operation)
+        return await self.scheduler.run(operation_class(operation), lambda: self._round_trip(operation))
+
+    async def _round_trip(self, operation):
+        """Sleep for one service round trip; throttle it or fail it with probability ``failure_rate``"""
+        self.calls[operation] += 1
+        retry_after = self._admit(operation_class(operation))
+        await asyncio.sleep(self.latency(self.rng))
+        if retry_after is not None:
+            self.throttled[operation] += 1
+            raise _too_many_requests(operation, retry_after)
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            self.failures[operation] += 1
+            raise ConnectionError(f"Simulated {operation} failure")
+
+    def _admit(self, operation_class):
+        """None if the service takes a request of ``operation_class`` now, else its Retry-After in seconds"""
+        if self.throttle_rate and self.rng.random() < self.throttle_rate:
+            return self.retry_after
+        if not self.rate_limit:
+            return None
+        # A token bucket holding one second's worth of requests
+        now = time.monotonic()
+        capacity = max(1.0, self.rate_limit)
+        tokens, updated = self._buckets.get(operation_class, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * self.rate_limit)
+        if tokens < 1:
+            self._buckets[operation_class] = (tokens, now)
+            return (1 - tokens) / self.rate_limit
+        self._buckets[operation_class] = (tokens - 1, now)
+        return None
+
+    def stats(self):
+        """Service calls, injected failures and throttled calls by operation"""
+        return {"calls": dict(self.calls), "failures": dict(self.failures), "throttled": dict(self.throttled),
+                "uploads": self.files.uploads}
+
+    # Agents
+
+    async def create_agent(self, model, name=None, instructions=None, temperature=None, tools=None,
+                           tool_resources=None, metadata=None, **kwargs):
+        await self.simulate("create_agent")
+        agent = _model(id=self.new_id("asst"), object="assistant", name=name, model=model, instructions=instructions,
+                       temperature=temperature, tools=list(tools or []), tool_resources=tool_resources,
+                       metadata=dict(metadata or {}), created_at=_now(), description=None)
+        self._agents[agent.id] = agent
+        return agent
+
+    async def get_agent(self, agent_id, **kwargs):
+        await self.simulate("get_agent")
+        return self.agent(agent_id)
+
+    async def list_agents(self, **kwargs):
+        await self.simulate("list_agents")
+        for agent in list(self._agents.values()):
+            yield agent
+
+    async def delete_agent(self, agent_id, **kwargs):
+        await self.simulate("delete_agent")
+        self.agent(agent_id)
+        del self._agents[agent_id]
+
+    async def close(self):
+        pass
+
+    # Stored objects
+
+    def agent(self, agent_id):
+        if agent_id not in self._agents:
+            raise _not_found("Agent", agent_id)
+        return self._agents[agent_id]
+
+    def vector_store(self, vector_store_id):
+        if vector_store_id not in self._vector_stores:
+            raise _not_found("Vector store", vector_store_id)
+        return self._vector_stores[vector_store_id]
+
+    def thread(self, thread_id):
+        if thread_id not in self._threads:
+            raise _not_found("Thread", thread_id)
+        return self._threads[thread_id]
+
+    def new_thread(self):
+        thread = _model(id=self.new_id("thread"), created_at=_now(), messages=[], runs=[])
+        self._threads[thread.id] = thread
+        return thread
+
+    def add_message(self, thread_id, role, content, run_id=None):
+        # MessageRole and AuthorRole are str enums; store their plain values
+        role = getattr(role, "value", role)
+        message = _model(id=self.new_id("msg"), thread_id=thread_id, role=role, content=str(content),
+                         run_id=run_id, created_at=_now())
+        self.thread(thread_id).messages.append(message)
+        return message
+
+    def new_run(self, thread_id, agent_id):
+        run = _model(id=self.new_id("run"), thread_id=thread_id, agent_id=agent_id, status="queued",
+                     created_at=_now(), completed_at=None, usage=None, last_error=None, required_action=None)
+        self.thread(thread_id).runs.append(run)
+        self._runs[run.id] = run
+        self._run_steps[run.id] = []
+        return run
+
+    # Agent runs
+
+    def _script_entry(self, agent_name, thread_id):
+        """Next scripted reply for ``agent_name`` on a thread (shards use their base name's script), or None"""
+        entries = self.script.get(agent_name) or self.script.get(re.sub(r"_\d+$", "", agent_name or ""))
+        if not entries:
+            return None
+        # Counted per thread, so a reused agent starts its script over in the next run's chat
+        turn = self._turns[agent_name, thread_id]
+        self._turns[agent_name, thread_id] += 1
+        return entries[min(turn, len(entries) - 1)]
+
+    def _vector_store_files(self, agent):
+        file_search = getattr(agent.tool_resources, "file_search", None) if agent.tool_resources else None
+        store_ids = getattr(file_search, "vector_store_ids", None) or []
+        filenames = []
+        for store_id in store_ids:
+            store = self._vector_stores.get(store_id)
+            for file_id in store.file_ids if store else []:
+                file = self.files.files.get(file_id)
+                filenames.append(file.filename if file else file_id)
+        return store_ids, filenames
+
+    def _record_step(self, run, step_type, started, tool_calls=None):
+        details = _model(type=step_type, tool_calls=tool_calls) if step_type == "tool_calls" else _model(type=step_type)
+        self._run_steps[run.id].append(_model(id=self.new_id("step"), run_id=run.id, type=step_type,
+                                              status="completed", step_details=details,
+                                              created_at=started, completed_at=_now(), usage=None))
+
+    async def _call_tool(self, run, agent, name, prompt, kernel):
+        """Resolve one ``{name}`` placeholder by running a connected agent or a kernel function"""
+        connected = {tool.connected_agent.name: tool.connected_agent.id
+                     for tool in agent.tools if getattr(tool, "type", None) == "connected_agent"}
+        functions = {}
+        for plugin in (kernel.plugins.values() if kernel is not None else []):
+            functions.update(plugin.functions)
+        if name == "candidates":
+            name = "screen_candidates" if "screen_candidates" in functions else "CandidateScreening_agent"
+        elif name == "JobPosting_agent" and "summarize_job_posting" in functions:
+            name = "summarize_job_posting"
+
+        started = _now()
+        if name in functions:
+            result = await kernel.invoke(functions[name], request=prompt)
+            output = str(result.value) if result is not None else ""
+            call = _model(id=self.new_id("call"), type="function", function=_model(name=name, output=output))
+        elif name in connected:
+            thread = self.new_thread()
+            self.add_message(thread.id, "user", prompt)
+            sub_run = self.new_run(thread.id, connected[name])
+            async for _ in self.execute(sub_run):
+                pass
+            output = thread.messages[-1].content if sub_run.status == "completed" else f"Error: {sub_run.last_error.message}"
+            call = _model(id=self.new_id("call"), type="connected_agent", connected_agent=_model(
+                name=name, output=output, thread_id=thread.id, run_id=sub_run.id))
+        else:
+            return "{" + name + "}"
+        self._record_step(run, "tool_calls", started, [call])
+        return output
+
+    async def _call_functions(self, run, agent, prompt):
+        """Have the client run the agent's function tools on the prompt; returns the PDFs their outputs cite"""
+        calls = [_model(id=self.new_id("call"), type="function",
+                        function=_model(name=tool.function.name, arguments=json.dumps({"query": prompt})))
+                 for tool in agent.tools if getattr(tool, "type", None) == "function"]
+        if not calls:
+            return []
+        started = _now()
+        waiting = self._tool_outputs[run.id] = asyncio.get_running_loop().create_future()
+        run.status = "requires_action"
+        run.required_action = _model(type="submit_tool_outputs", submit_tool_outputs=_model(tool_calls=calls))
+        outputs = await waiting
+        for call, output in zip(calls, outputs):
+            call.function.output = output
+        self._record_step(run, "tool_calls", started, calls)
+        return re.findall(r"^\[([^\]\n]+\.pdf)\]", "\n".join(outputs), re.M)
+
+    def start(self, run):
+        """Execute ``run`` in the background, with function tools called through the client"""
+        async def drive():
+            async for _ in self.execute(run, function_calls=True):
+                pass
+        task = asyncio.create_task(drive())
+        self._background_runs.add(task)
+        task.add_done_callback(self._background_runs.discard)
+
+    async def execute(self, run, kernel=None, function_calls=False):
+        """Run the scripted agent turn of ``run``, yielding its reply in chunks as they are 'generated'.
+
+        The reply is added to the thread and the run gets its status, usage and
+        steps. An injected failure ends the run with status "failed" and no
+        reply. ``kernel`` provides the function tools of a ``FakeAgent``; with
+        ``function_calls``, the run stops in "requires_action" until the client
+        submits the outputs of the agent's function tools.
+        """
+        agent = self.agent(run.agent_id)
+        thread = self.thread(run.thread_id)
+        run.status = "in_progress"
+        turn_latency = self.agent_latency(self.rng)
+        prompt = thread.messages[-1].content if thread.messages else ""
+
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            await asyncio.sleep(turn_latency * FIRST_TOKEN_SHARE)
+            self.failures["runs"] += 1
+            run.status = "failed"
+            run.last_error = _model(code="server_error", message="Simulated run failure")
+            run.completed_at = _now()
+            return
+
+        # Retrieval and tool calls happen before the first token
+        started = _now()
+        store_ids, filenames = self._vector_store_files(agent)
+        await asyncio.sleep(turn_latency * FIRST_TOKEN_SHARE)
+        if store_ids:
+            self._record_step(run, "tool_calls", started, [_model(id=self.new_id("call"), type="file_search")])
+        if function_calls:
+            filenames = list(dict.fromkeys(filenames + await self._call_functions(run, agent, prompt)))
+        template = self._script_entry(agent.name, thread.id)
+        if template is None:
+            text = candidate_ranking(filenames) if filenames else "I could not find anything relevant to answer that."
+        else:
+            text = template
+            for name in dict.fromkeys(_PLACEHOLDER.findall(template)):
+                text = text.replace("{" + name + "}", await self._call_tool(run, agent, name, prompt, kernel))
+
+        started = _now()
+        words = text.split(" ")
+        size = max(1, math.ceil(len(words) / STREAM_CHUNKS))
+        chunks = [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "") for i in range(0, len(words), size)]
+        for chunk in chunks:
+            yield chunk
+            await asyncio.sleep(turn_latency * (1 - FIRST_TOKEN_SHARE) / len(chunks))
+
+        self.add_message(thread.id, "assistant", text, run_id=run.id)
+        self._record_step(run, "message_creation", started)
+        prompt_tokens = (len(agent.instructions or "") + sum(len(m.content) for m in thread.messages[:-1])) // 4
+        completion_tokens = len(text) // 4 + 1
+        run.usage = _model(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                           total_tokens=prompt_tokens + completion_tokens)
+        run.status = "completed"
+        run.completed_at = _now()
+
+
+class FakeProjectClient:
+    """Mimics ``AIProjectClient``; ``agents`` is a ``FakeAgentsClient``"""
+
+    def __init__(self, agents=None, **kwargs):
+        self.agents = agents or FakeAgentsClient(**kwargs)
+
+    async def close(self):
+        await self.agents.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_details):
+        await self.close()
+
+
+class FakeAgentThread(AgentThread):
+    """Conversation thread of a ``FakeAgent``, stored in the fake service"""
+
+    def __init__(self, client, thread_id=None):
+        super().__init__()
+        self._client = client
+        self._id = thread_id
+
+    async def _create(self):
+        return (await self._client.threads.create()).id
+
+    async def _delete(self):
+        await self._client.threads.delete(self._id)
+
+    async def _on_new_message(self, new_message):
+        # The agent's own replies are already on the thread
+        if (new_message.metadata or {}).get("thread_id") != self._id:
+            await self._client.messages.create(thread_id=self._id, role=new_message.role, content=str(new_message.content))
+
+
+class FakeAgent(Agent):
+    """Drop-in for ``AzureAIAgent`` whose turns run on a ``FakeProjectClient``.
+
+    Takes the same ``client``, ``definition``, ``description`` and ``plugins``
+    arguments. Replies stream in chunks, carry the thread and run IDs in their
+    metadata like ``AzureAIAgent`` replies, and call plugin functions the
+    script asks for.
+    """
+
+    client: Any
+    definition: Any
+
+    def __init__(self, *, client, definition, description=None, plugins=None, kernel=None, **kwargs):
+        args = {
+            "client": client,
+            "definition": definition,
+            "id": definition.id,
+            "name": definition.name,
+            "description": description,
+            "instructions": definition.instructions,
+        }
+        if plugins:
+            args["plugins"] = plugins
+        if kernel is not None:
+            args["kernel"] = kernel
+        super().__init__(**args, **kwargs)
+
+    async def _thread(self, messages, thread):
+        return await self._ensure_thread_exists_with_messages(
+            messages=messages,
+            thread=thread,
+            construct_thread=lambda: FakeAgentThread(self.client.agents),
+            expected_type=FakeAgentThread,
+        )
+
+    async def invoke_stream(self, messages=None, *, thread=None, on_intermediate_message=None, **kwargs):
+        thread = await self._thread(messages, thread)
+        agents = self.client.agents
+        await agents.simulate("runs.stream")
+        run = agents.new_run(thread.id, self.id)
+        async for chunk in agents.execute(run, kernel=self.kernel):
+            yield AgentResponseItem(
+                message=StreamingChatMessageContent(
+                    role=AuthorRole.ASSISTANT,
+                    choice_index=0,
+                    content=chunk,
+                    name=self.name,
+                    metadata={"thread_id": thread.id, "run_id": run.id, "agent_id": self.id},
+                ),
+                thread=thread,
+            )
+        if run.status != "completed":
+            raise RuntimeError(f"Run {run.id} of agent {self.name} ended with status {run.status}: {run.last_error.message}")
+
+    async def invoke(self, messages=None, *, thread=None, on_intermediate_message=None, **kwargs):
+        chunks = []
+        async for item in self.invoke_stream(messages, thread=thread, **kwargs):
+            chunks.append(item.message.content)
+            thread = item.thread
+        metadata = item.message.metadata if chunks else {}
+        yield AgentResponseItem(
+            message=ChatMessageContent(role=AuthorRole.ASSISTANT, content="".join(chunks), name=self.name,
+                                       metadata=metadata),
+            thread=thread,
+        )
+
+    async def get_response(self, messages=None, *, thread=None, **kwargs):
+        response = None
+        async for response in self.invoke(messages, thread=thread, **kwargs):
+            pass
+        return response
+
+
+async def scripted_workflow(workflow, messages=100, interval=0.01, senders=("recruiter", "workflow")):
+    """Drive an ``AgentWorkflow``'s message stream the way a real run would, without Azure.
+
+    Message content carries the ``time.perf_counter()`` at publish time so
+    in-process consumers can measure delivery latency.
+    """
+    workflow.status = "running"
+    workflow.add_message("system", "Starting agent workflow...")
+    for i in range(messages):
+        sender = senders[i % len(senders)]
+        workflow.add_message(sender, f"sent_at={time.perf_counter():.6f} message {i}", agent_type=sender)
+        await asyncio.sleep(interval)
+    workflow.add_message("workflow", "COMPLETED", agent_type="workflow")
+    workflow.status = "completed"
@@ -0,0 +1,209 @@
+"""Content-addressed cache of uploaded files and vector stores.
+
+A local JSON manifest maps the SHA-256 of every uploaded PDF to its remote
+file ID, and every named vector store to its ID and the file hashes it
+contains. Unchanged files reuse their IDs, vector stores are updated
+incrementally, and IDs that no longer exist remotely are dropped. Runs that
+share a manifest also share its in-flight uploads and take turns updating a
+vector store, so concurrent runs neither upload a file twice nor detach each
+other's files.
+"""
+import os
+import json
+import asyncio
+import hashlib
+from collections import namedtuple
+from contextlib import AsyncExitStack
+from datetime import datetime
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from uploads import upload_files
+
+DEFAULT_MANIFEST_PATH = os.environ.get("AGENT_CACHE_PATH", ".agent_cache.json")
+VALIDATION_CONCURRENCY = 8
+
+CachedFile = namedtuple("CachedFile", ["id", "path", "sha256", "reused"])
+
+
+def file_sha256(path):
+    """Return the hex SHA-256 digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FileManifest:
+    """JSON index of remote file and vector-store IDs, scoped per project endpoint"""
+
+    def __init__(self, endpoint, path=DEFAULT_MANIFEST_PATH):
+        self.endpoint = endpoint
+        self.path = path
+        self._data = {"version": 1, "projects": {}}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                pass  # Corrupt manifest: start over, remote IDs get revalidated anyway
+        project = self._data["projects"].setdefault(endpoint, {})
+        self.files = project.setdefault("files", {})
+        self.vector_stores = project.setdefault("vector_stores", {})
+        # Not persisted: locks held while a file is uploaded and while a vector store is updated
+        self._file_locks = {}
+        self._store_locks = {}
+
+    def save(self):
+        """Atomically write the manifest to disk"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def invalidate_file(self, sha256, file_id=None):
+        """Forget a file; with ``file_id``, only if it still maps to that (stale) ID"""
+        if file_id is None or self.files.get(sha256, {}).get("file_id") == file_id:
+            self.files.pop(sha256, None)
+
+    def file_lock(self, sha256):
+        """Lock held while the file with this content hash is uploaded"""
+        return self._file_locks.setdefault(sha256, asyncio.Lock())
+
+    def store_lock(self, name):
+        """Lock held while the vector store ``name`` is checked and updated"""
+        return self._store_locks.setdefault(name, asyncio.Lock())
+
+    def invalidate_vector_store(self, name):
+        self.vector_stores.pop(name, None)
+
+    def content_hash(self, vector_store_id):
+        """Hash of the file contents in a vector store created through this manifest, or None if unknown"""
+        for entry in self.vector_stores.values():
+            if entry["id"] == vector_store_id:
+                return hashlib.sha256("\n".join(sorted(entry["files"])).encode("utf-8")).hexdigest()
+        return None
+
+
+async def _gather_limited(coros, limit=VALIDATION_CONCURRENCY):
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(c) for c in coros))
+
+
+async def _file_exists(project_client, file_id):
+    try:
+        await project_client.agents.files.get(file_id)
+        return True
+    except ResourceNotFoundError:
+        return False
+
+
+async def upload_files_cached(project_client, paths, manifest, validate=True, **upload_kwargs):
+    """Upload only files whose content is not already known remotely.
+
+    Returns a ``CachedFile`` per path, in input order. Cached IDs are checked
+    against the service (when ``validate`` is set) and re-uploaded if stale.
+    Files another call is already uploading through the same manifest are
+    waited for rather than uploaded again. Extra keyword arguments are passed
+    to ``uploads.upload_files``.
+    """
+    paths = list(paths)
+    hashes = await asyncio.gather(*(asyncio.to_thread(file_sha256, p) for p in paths))
+
+    known = {h: manifest.files[h]["file_id"] for h in set(hashes) if h in manifest.files}
+    cached = set(known)
+    if validate and cached:
+        cached_hashes = sorted(cached)
+        exists = await _gather_limited(
+            _file_exists(project_client, known[h]) for h in cached_hashes
+        )
+        for sha256, ok in zip(cached_hashes, exists):
+            if not ok:
+                manifest.invalidate_file(sha256, known[sha256])
+                cached.discard(sha256)
+
+    # Upload each missing hash once, even if several paths share the content or another run is uploading it
+    to_upload = {}
+    async with AsyncExitStack() as stack:
+        # Locked in sorted order, so calls with overlapping files cannot deadlock
+        for sha256 in sorted(set(hashes) - cached):
+            await stack.enter_async_context(manifest.file_lock(sha256))
+        for path, sha256 in zip(paths, hashes):
+            if sha256 in cached or sha256 in to_upload:
+                continue
+            if sha256 in manifest.files and manifest.files[sha256]["file_id"] != known.get(sha256):
+                # Uploaded by another run while this one waited
+                cached.add(sha256)
+            else:
+                to_upload[sha256] = path
+        if to_upload:
+            file_objs = await upload_files(project_client.agents.files, list(to_upload.values()), **upload_kwargs)
+            now = datetime.now().isoformat()
+            for (sha256, path), file_obj in zip(to_upload.items(), file_objs):
+                manifest.files[sha256] = {
+                    "file_id": file_obj.id,
+                    "filename": os.path.basename(path),
+                    "uploaded_at": now,
+                }
+            manifest.save()
+
+    return [
+        CachedFile(manifest.files[sha256]["file_id"], path, sha256, sha256 not in to_upload)
+        for path, sha256 in zip(paths, hashes)
+    ]
+
+
+async def get_or_create_vector_store(project_client, manifest, name, files):
+    """Return a vector store named ``name`` containing exactly ``files``.
+
+    An existing store is reused and updated incrementally: new files are added
+    in one batch and files that are no longer wanted are detached. A store that
+    has expired or been deleted remotely is recreated from scratch. Calls for
+    the same name through one manifest run one at a time.
+    """
+    async with manifest.store_lock(name):
+        return await _get_or_create_vector_store(project_client, manifest, name, files)
+
+
+async def _get_or_create_vector_store(project_client, manifest, name, files):
+    agents = project_client.agents
+    wanted = {f.sha256: f.id for f in files}
+    entry = manifest.vector_stores.get(name)
+
+    vector_store = None
+    if entry:
+        try:
+            vector_store = await agents.vector_stores.get(entry["id"])
+            if vector_store.status == "expired":
+                vector_store = None
+        except ResourceNotFoundError:
+            vector_store = None
+
+    if vector_store is None:
+        manifest.invalidate_vector_store(name)
+        vector_store = await agents.vector_stores.create_and_poll(file_ids=list(wanted.values()), name=name)
+    else:
+        current = entry["files"]
+        added = [file_id for sha256, file_id in wanted.items() if current.get(sha256) != file_id]
+        removed = [file_id for sha256, file_id in current.items() if wanted.get(sha256) != file_id]
+        if added:
+            await agents.vector_store_file_batches.create_and_poll(vector_store_id=vector_store.id, file_ids=added)
+        for file_id in removed:
+            try:
+                await agents.vector_store_files.delete(vector_store_id=vector_store.id, file_id=file_id)
+            except ResourceNotFoundError:
+                pass
+
+    manifest.vector_stores[name] = {
+        "id": vector_store.id,
+        "files": wanted,
+        "updated_at": datetime.now().isoformat(),
+    }
+    manifest.save()
+    return vector_store
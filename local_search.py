@@ -0,0 +1,307 @@
+"""In-process retrieval over the local text index, as an alternative to remote file search.
+
+With ``RETRIEVAL_BACKEND=local`` no files are uploaded and no vector stores
+are created. The job posting and screening agents instead get a
+``search_documents`` function tool, which the app executes locally against
+the chunks of their documents in ``text_index``. Chunks are embedded by a
+pluggable embedder: a CPU-only signed feature-hashing embedder by default,
+or TF-IDF over the most frequent terms. Any object with ``name``, ``dim``,
+``fit(texts)`` and ``embed(texts)`` returning unit-length rows works.
+Hashing embeddings are cached next to the index generation they belong to;
+an index update carries the rows of unchanged chunks over to the new one.
+Search is an exact NumPy dot product over all of an agent's chunks, or, from
+``LOCAL_IVF_MIN_CHUNKS`` chunks on, an inverted-file (IVF) index that only
+scans the k-means clusters closest to the query.
+"""
+import os
+import math
+import contextlib
+import zlib
+import hashlib
+from collections import Counter, namedtuple
+
+import numpy as np
+from scipy import sparse
+from azure.ai.agents.models import FunctionDefinition, FunctionToolDefinition
+
+from prerank import STOPWORDS, tokenize
+
+RETRIEVAL_BACKENDS = ("file_search", "local")
+DEFAULT_RETRIEVAL_BACKEND = os.environ.get("RETRIEVAL_BACKEND", "file_search")
+DEFAULT_EMBEDDER = os.environ.get("LOCAL_EMBEDDER", "hashing")
+DEFAULT_EMBEDDING_DIM = int(os.environ.get("LOCAL_EMBEDDING_DIM", "256"))
+DEFAULT_SEARCH_TOP_K = int(os.environ.get("LOCAL_SEARCH_TOP_K", "8"))
+# 0 always searches exhaustively
+DEFAULT_IVF_MIN_CHUNKS = int(os.environ.get("LOCAL_IVF_MIN_CHUNKS", "50000"))
+DEFAULT_IVF_PROBES = int(os.environ.get("LOCAL_IVF_PROBES", "32"))
+
+# Chunks a TF-IDF vocabulary is learned from, at most
+TFIDF_FIT_SAMPLE = 20000
+EMBED_BATCH = 4096
+
+SearchHit = namedtuple("SearchHit", ["path", "chunk", "score", "text"])
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _term_rows(texts, column):
+    """Sparse (texts x columns) matrix of sublinear term frequencies; ``column(token)`` gives (column, sign) or None"""
+    rows, cols, values = [], [], []
+    for row, text in enumerate(texts):
+        for token, count in Counter(tokenize(text)).items():
+            entry = column(token)
+            if entry is not None:
+                rows.append(row)
+                cols.append(entry[0])
+                values.append(entry[1] * (1.0 + math.log(count)))
+    return rows, cols, values
+
+
+class HashingEmbedder:
+    """Signed feature hashing of sublinear term counts; needs no fitting, so its embeddings can be cached"""
+
+    def __init__(self, dim=DEFAULT_EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+        self._columns = {}
+
+    def _column(self, token):
+        entry = self._columns.get(token)
+        if entry is None:
+            digest = zlib.crc32(token.encode("utf-8"))
+            # The sign makes colliding terms cancel out on average instead of adding up
+            entry = self._columns[token] = (digest % self.dim, 1.0 if (digest // self.dim) & 1 else -1.0)
+        return entry
+
+    def fit(self, texts):
+        return self
+
+    def embed(self, texts):
+        rows, cols, values = _term_rows(texts, self._column)
+        matrix = sparse.csr_matrix((values, (rows, cols)), shape=(len(texts), self.dim), dtype=np.float32)
+        return _normalize_rows(matrix.toarray())
+
+
+class TfidfEmbedder:
+    """TF-IDF over the ``dim`` terms found in the most chunks; fitted per corpus, so not cached"""
+
+    def __init__(self, dim=DEFAULT_EMBEDDING_DIM):
+        self.dim = dim
+        self.name = None
+        self.vocabulary = {}
+        self.idf = np.zeros(0, dtype=np.float32)
+
+    def fit(self, texts):
+        document_frequency = Counter()
+        for text in texts:
+            document_frequency.update(set(tokenize(text)))
+        terms = [term for term, _ in sorted(
+            ((term, df) for term, df in document_frequency.items() if term not in STOPWORDS),
+            key=lambda item: (-item[1], item[0]),
+        )[:self.dim]]
+        self.vocabulary = {term: (i, 1.0) for i, term in enumerate(terms)}
+        df = np.asarray([document_frequency[term] for term in terms], dtype=np.float32)
+        self.idf = np.log((1 + len(texts)) / (1 + df)) + 1
+        return self
+
+    def embed(self, texts):
+        rows, cols, values = _term_rows(texts, self.vocabulary.get)
+        matrix = sparse.csr_matrix((values, (rows, cols)), shape=(len(texts), self.dim), dtype=np.float32)
+        matrix = matrix.toarray()
+        matrix[:, :len(self.idf)] *= self.idf
+        return _normalize_rows(matrix)
+
+
+EMBEDDERS = {"hashing": HashingEmbedder, "tfidf": TfidfEmbedder}
+
+
+def make_embedder(name=DEFAULT_EMBEDDER, dim=DEFAULT_EMBEDDING_DIM):
+    if name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedder {name!r}, expected one of {tuple(EMBEDDERS)}")
+    return EMBEDDERS[name](dim)
+
+
+def _top_k(scores, k):
+    """Indices and values of the ``k`` largest ``scores``, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=scores.dtype)
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return top, scores[top]
+
+
+class BruteForceIndex:
+    """Exact search: one matrix-vector product over every vector"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, query, k):
+        """``(ids, scores)`` of the ``k`` vectors with the highest dot product with ``query``"""
+        return _top_k(self.vectors @ query, k)
+
+
+class IVFIndex:
+    """Approximate search: vectors grouped by their nearest k-means centroid, and only the
+    ``probes`` groups closest to the query are scanned"""
+
+    def __init__(self, vectors, lists=None, probes=DEFAULT_IVF_PROBES, iterations=10, seed=0):
+        n = len(vectors)
+        lists = max(1, min(n, lists or int(math.sqrt(n))))
+        self.probes = probes
+        rng = np.random.default_rng(seed)
+        sample = vectors[np.sort(rng.choice(n, min(n, lists * 64), replace=False))]
+        centroids = sample[rng.choice(len(sample), lists, replace=False)]
+        # Spherical k-means on the sample; a cluster that runs empty keeps its centroid
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            members = sparse.csr_matrix((np.ones(len(sample), dtype=np.float32), (assignment, np.arange(len(sample)))),
+                                        shape=(lists, len(sample)))
+            sums = members @ sample
+            filled = np.linalg.norm(sums, axis=1) > 0
+            centroids = np.where(filled[:, None], _normalize_rows(sums), centroids).astype(np.float32)
+        assignment = np.concatenate([np.argmax(vectors[i:i + EMBED_BATCH] @ centroids.T, axis=1)
+                                     for i in range(0, n, EMBED_BATCH)])
+        # Vectors of one list are stored contiguously, so a probe is a slice
+        self.ids = np.argsort(assignment, kind="stable")
+        self.vectors = np.ascontiguousarray(vectors[self.ids])
+        self.offsets = np.searchsorted(assignment[self.ids], np.arange(lists + 1))
+        self.centroids = centroids
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, query, k):
+        lists, _ = _top_k(self.centroids @ query, self.probes)
+        bounds = [(self.offsets[i], self.offsets[i + 1]) for i in lists]
+        # Score each probed list in place rather than gathering its vectors first
+        scores = np.concatenate([self.vectors[start:stop] @ query for start, stop in bounds])
+        ids = np.concatenate([self.ids[start:stop] for start, stop in bounds])
+        top, scores = _top_k(scores, k)
+        return ids[top], scores
+
+
+def _embed_rows(text_index, vectors, chunk_ids, embedder):
+    for start in range(0, len(chunk_ids), EMBED_BATCH):
+        batch = chunk_ids[start:start + EMBED_BATCH]
+        vectors[batch] = embedder.embed([text_index.chunk(i) for i in batch])
+
+
+def embed_chunks(text_index, chunk_ids, embedder):
+    """Embeddings of the given chunks. Cacheable embedders embed every chunk of the index once and
+    keep the result memory-mapped in the index generation; the rest are fitted to these chunks."""
+    if embedder.name and text_index.generation:
+        path, partial, missing = text_index.embeddings_paths(embedder.name)
+        if not os.path.exists(path):
+            if os.path.exists(partial):
+                # Rows carried over from the previous generation; only new chunks are embedded
+                vectors = np.load(partial)
+                _embed_rows(text_index, vectors, np.load(missing), embedder)
+            else:
+                vectors = np.zeros((text_index.num_chunks, embedder.dim), dtype=np.float32)
+                _embed_rows(text_index, vectors, np.arange(text_index.num_chunks), embedder)
+            with open(f"{path}.tmp", "wb") as f:
+                np.save(f, vectors)
+            os.replace(f"{path}.tmp", path)
+            for leftover in (partial, missing):
+                # Another process may have completed the same rows first
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(leftover)
+        return np.load(path, mmap_mode="r")[chunk_ids]
+    step = max(1, len(chunk_ids) // TFIDF_FIT_SAMPLE)
+    embedder.fit([text_index.chunk(i) for i in chunk_ids[::step]])
+    return np.concatenate([
+        embedder.embed([text_index.chunk(i) for i in chunk_ids[start:start + EMBED_BATCH]])
+        for start in range(0, len(chunk_ids), EMBED_BATCH)
+    ] or [np.zeros((0, embedder.dim), dtype=np.float32)])
+
+
+class LocalSearch:
+    """The chunks of some documents of a ``TextIndex``, searchable by text"""
+
+    def __init__(self, text_index, paths, embedder, vectors, chunk_ids, ivf_min_chunks=DEFAULT_IVF_MIN_CHUNKS,
+                 probes=DEFAULT_IVF_PROBES):
+        self.text_index = text_index
+        self.paths = list(paths)
+        self.embedder = embedder
+        self.chunk_ids = chunk_ids
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if ivf_min_chunks and len(chunk_ids) >= ivf_min_chunks:
+            self.index = IVFIndex(vectors, probes=probes)
+        else:
+            self.index = BruteForceIndex(vectors)
+        digest = hashlib.sha256(f"{embedder.name or type(embedder).__name__}-{embedder.dim}".encode("utf-8"))
+        for path in sorted(self.paths):
+            digest.update(text_index.sha256[text_index.document_id(path)].tobytes())
+        self.content_hash = digest.hexdigest()
+
+    @classmethod
+    def build(cls, text_index, paths, embedder=None, **kwargs):
+        """Embed the chunks of ``paths`` (all indexed already) and build their search index"""
+        embedder = embedder or make_embedder()
+        ranges = [text_index.document_chunks(path) for path in paths]
+        chunk_ids = np.concatenate([np.arange(r.start, r.stop) for r in ranges] or [np.zeros(0, dtype=np.int64)])
+        return cls(text_index, paths, embedder, embed_chunks(text_index, chunk_ids, embedder), chunk_ids, **kwargs)
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    def search(self, query, top_k=DEFAULT_SEARCH_TOP_K):
+        """The ``top_k`` chunks most similar to ``query``, best first"""
+        ids, scores = self.index.search(self.embedder.embed([query])[0], top_k)
+        hits = []
+        for i, score in zip(ids.tolist(), scores.tolist()):
+            chunk = int(self.chunk_ids[i])
+            path = self.text_index.paths[self.text_index.chunk_document(chunk)]
+            hits.append(SearchHit(path, chunk, score, self.text_index.chunk(chunk)))
+        return hits
+
+
+SEARCH_TOOL_DEFINITIONS = [FunctionToolDefinition(function=FunctionDefinition(
+    name="search_documents",
+    description="Searches the attached documents for the passages most relevant to a query.",
+    parameters={
+        "type": "object",
+        "properties": {"query": {
+            "type": "string",
+            "description": "What to look for, e.g. required skills, experience or qualifications.",
+        }},
+        "required": ["query"],
+    },
+))]
+
+
+class SearchTool:
+    """The ``search_documents`` function of one agent, answered from its ``LocalSearch``"""
+
+    def __init__(self, search, top_k=DEFAULT_SEARCH_TOP_K):
+        self.search = search
+        self.top_k = top_k
+        self.functions = {"search_documents": self.search_documents}
+
+    @property
+    def content_hash(self):
+        return f"{self.search.content_hash}-{self.top_k}"
+
+    def search_documents(self, query):
+        """Answers a ``search_documents`` call (see ``SEARCH_TOOL_DEFINITIONS``) with the best passages and their files"""
+        hits = self.search.search(query, self.top_k)
+        if not hits:
+            return "No matching passages."
+        return "\n\n".join(f"[{os.path.basename(hit.path)}] (score {hit.score:.2f})\n{hit.text}" for hit in hits)
+
+
+def ensure_indexed(text_index, paths):
+    """Add any of ``paths`` that ``text_index`` does not hold yet, keeping its other documents"""
+    missing = [path for path in paths if text_index.document_id(path) is None]
+    if missing:
+        text_index.update([path for path in text_index.paths if os.path.exists(path)] + missing)
+    return text_index
@@ -1,28 +1,64 @@
 import os
+import re
 import glob
+import json
+import time
+import argparse
+from datetime import datetime
+from typing import Callable
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
+from rich.progress import Progress
 from rich import box
 
 import asyncio
+from contextlib import AsyncExitStack
+
+# Module-level settings in the imports below are read from the environment at import time
+load_dotenv()
 
 from azure.identity.aio import DefaultAzureCredential
 from semantic_kernel.agents import (
-    AzureAIAgent,
     AzureAIAgentSettings,
     AzureAIAgentThread,
     GroupChatOrchestration,
     RoundRobinGroupChatManager,
     BooleanResult,
+    MessageResult,
+    StringResult,
 )
 from azure.ai.agents.models import ConnectedAgentTool
 from semantic_kernel.agents.runtime import InProcessRuntime
-from semantic_kernel.contents import ChatMessageContent, ChatHistory
+from semantic_kernel.contents import AuthorRole, ChatMessageContent, ChatHistory, StreamingChatMessageContent
 from azure.ai.projects.aio import AIProjectClient
-from azure.ai.agents.models import FilePurpose, FileSearchTool, ToolResources
-
+from azure.ai.agents.models import FileSearchTool, ToolResources
+
+from agent_registry import AgentRegistry
+from agent_stats import AgentStatsCollector
+from candidate_records import ResultCollector, open_sinks
+from clients import DEFAULT_AGENT_BACKEND, FAKE_ENDPOINT, agent_class, model_deployment_name
+from connected import JobPostingPlugin, ShardedScreeningPlugin
+from fake_backend import FakeProjectClient
+from file_cache import FileManifest, upload_files_cached, get_or_create_vector_store
+from local_search import DEFAULT_RETRIEVAL_BACKEND, SEARCH_TOOL_DEFINITIONS, LocalSearch, SearchTool, ensure_indexed
+from prerank import DEFAULT_PRERANK_TOP_K, prerank_resumes
+from text_index import DEFAULT_INDEX_DIR, TextIndex
+from provisioning import ProvisioningGraph
+from rankings import parse_rankings
+from response_cache import ResponseCache
+from scheduler import RequestScheduler, pipeline_options, request_priority
+from sharding import DEFAULT_RESUME_SHARDS, DEFAULT_SHARD_STRATEGY, partition, shard_name
+from telemetry import RunTelemetry, configure_tracing
+
+# Group chat limits; a budget of 0 is unlimited
+DEFAULT_MAX_ROUNDS = int(os.environ.get("MAX_ROUNDS", "10"))
+DEFAULT_MIN_RANKED_CANDIDATES = int(os.environ.get("MIN_RANKED_CANDIDATES", "3"))
+DEFAULT_RUN_TOKEN_BUDGET = int(os.environ.get("RUN_TOKEN_BUDGET", "0"))
+DEFAULT_RUN_TIME_BUDGET = float(os.environ.get("RUN_TIME_BUDGET", "0"))
+# Job postings screened at the same time by --batch-dir
+DEFAULT_BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "4"))
 
 CRITIC_AGENT_INSTRUCTIONS = """
 Guide the recruiter agent in identifying the best candidates for the job posting.
@@ -48,6 +84,30 @@ RECRUITER_AGENT_INSTRUCTIONS = """
 - **connected_agent.JobPosting_agent**: Evaluates candidate CVs
 
 
+"""
+
+# Used instead of RECRUITER_AGENT_INSTRUCTIONS when resumes are split across several screening agents
+SHARDED_RECRUITER_AGENT_INSTRUCTIONS = """
+- Never include "Persona XYZ Adopted" in your response. 
+- Never answer questions directly. ALWAYS use either the **screen_candidates** function or the **JobPosting_agent** to get the information you need.
+
+## 2. Available Tools
+- **screen_candidates**: Screens all candidate CVs in parallel and returns one merged ranking
+- **connected_agent.JobPosting_agent**: Provides job posting information
+
+
+"""
+
+# Used when both tools are local functions, so their answers can come from the response cache
+LOCAL_TOOLS_RECRUITER_AGENT_INSTRUCTIONS = """
+- Never include "Persona XYZ Adopted" in your response. 
+- Never answer questions directly. ALWAYS use either the **screen_candidates** function or the **summarize_job_posting** function to get the information you need.
+
+## 2. Available Tools
+- **screen_candidates**: Screens all candidate CVs and returns one ranked table
+- **summarize_job_posting**: Provides job posting information
+
+
 """
 
 JOB_POSTING_AGENT_INSTRUCTIONS = """
@@ -59,14 +119,106 @@ SCREENING_AGENT_INSTRUCTIONS = """
 - Only answer using myfiles_browser tool
 """
 
+# Used with RETRIEVAL_BACKEND=local, where documents are searched in-process instead of in vector stores
+LOCAL_SEARCH_JOB_POSTING_AGENT_INSTRUCTIONS = """
+- Only answer using the search_documents function (Search for 'Requirements' in the job description).
+"""
+
+LOCAL_SEARCH_SCREENING_AGENT_INSTRUCTIONS = """
+- Never include "Persona XYZ Adopted" in your response. 
+- Only answer using the search_documents function. Search once per requirement and name the resume file each finding comes from.
+"""
+
 class CustomGroupChatManager(RoundRobinGroupChatManager):
+    """Round-robin chat that ends as soon as the recruiter has produced a ranking, or a budget runs out.
+
+    The recruiter's replies are checked locally for a ranked table of at least
+    ``min_candidates`` candidates, so no critic round trip is needed just to say
+    COMPLETED (which is still honoured). A critic that repeats one of its own
+    earlier messages has nothing new to add, and its later turns go to the
+    recruiter instead. ``termination_reason`` records why the chat ended.
+    """
+    # Optional timing hooks: on_turn_start(agent_name) when an agent is selected to speak,
+    # on_turn_end(message) when its response has been added to the chat
+    on_turn_start: Callable[[str], None] | None = None
+    on_turn_end: Callable[[ChatMessageContent], None] | None = None
+    # on_terminate(reason) once the chat is over
+    on_terminate: Callable[[str], None] | None = None
+
+    recruiter_name: str = "recruiter"
+    critic_name: str = "workflow"
+    min_candidates: int = DEFAULT_MIN_RANKED_CANDIDATES
+    # 0 disables a budget; token_usage() returns tokens used so far (default: estimated from the chat)
+    token_budget: int = DEFAULT_RUN_TOKEN_BUDGET
+    time_budget: float = DEFAULT_RUN_TIME_BUDGET
+    token_usage: Callable[[], int] | None = None
+
+    termination_reason: str | None = None
+    skipped_turns: int = 0
+    started_at: float | None = None
+
+    async def select_next_agent(self, chat_history: ChatHistory, participant_descriptions: dict[str, str]) -> StringResult:
+        selection = await super().select_next_agent(chat_history, participant_descriptions)
+        if (selection.result == self.critic_name and self.recruiter_name in participant_descriptions
+                and self._critic_is_repeating(chat_history)):
+            self.skipped_turns += 1
+            selection = StringResult(result=self.recruiter_name, reason="Critic has nothing new to add.")
+        if self.on_turn_start:
+            self.on_turn_start(selection.result)
+        return selection
+
+    def _critic_is_repeating(self, chat_history):
+        said = [_normalize(message.content) for message in chat_history.messages if message.name == self.critic_name]
+        return len(said) > 1 and said[-1] in said[:-1]
+
+    def _tokens_used(self, chat_history):
+        if self.token_usage:
+            return self.token_usage()
+        # Rough estimate of about 4 characters per token
+        return sum(len(str(message.content)) for message in chat_history.messages) // 4
+
+    def _termination(self, chat_history):
+        """Reason to stop after the latest message, or None to continue"""
+        last = chat_history.messages[-1]
+        if last.name == self.recruiter_name and len(parse_rankings(str(last.content))) >= self.min_candidates:
+            return "ranking_complete"
+        if "COMPLETED" in str(last.content).upper():
+            return "critic_completed"
+        if self.token_budget and self._tokens_used(chat_history) >= self.token_budget:
+            return "token_budget"
+        if self.time_budget and time.perf_counter() - self.started_at >= self.time_budget:
+            return "time_budget"
+        return None
+
     async def should_terminate(self, chat_history: ChatHistory) -> BooleanResult:
-        # Terminate if the last message contains "COMPLETED"
-        if chat_history.messages and "COMPLETED" in chat_history.messages[-1].content.upper():
-            return BooleanResult(result=True, reason="Termination condition met.")
+        # Called once per finished turn; the first call only sees the kickoff task
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+        if self.on_turn_end and chat_history.messages and chat_history.messages[-1].role == AuthorRole.ASSISTANT:
+            self.on_turn_end(chat_history.messages[-1])
         
-        # Fallback to base class termination logic (e.g., max_rounds)
-        return await super().should_terminate(chat_history)
+        reason = self._termination(chat_history) if chat_history.messages else None
+        if reason is None:
+            # Fallback to base class termination logic (max_rounds)
+            result = await super().should_terminate(chat_history)
+            if not result.result:
+                return result
+            reason = "max_rounds"
+        self.termination_reason = reason
+        if self.on_terminate:
+            self.on_terminate(reason)
+        return BooleanResult(result=True, reason=reason)
+
+    async def filter_results(self, chat_history: ChatHistory) -> MessageResult:
+        # The latest ranking is the answer, even if the chat ended on the critic or a budget
+        for message in reversed(chat_history.messages):
+            if message.name == self.recruiter_name and parse_rankings(str(message.content)):
+                return MessageResult(result=message, reason="Latest ranking from the recruiter.")
+        return await super().filter_results(chat_history)
+
+
+def _normalize(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", str(text).lower()).split())
 
 RESUME_NAMES = [
     "Resume_DevOps_Engineer_Alexander_Kumar.pdf",
@@ -110,90 +262,133 @@ def check_required_files():
         return False
     return True
 
-async def delete_all_agents(project_client, console):
-    """Delete all existing agents in the project."""
-    try:
-        # List all agents
-        agents = [agent async for agent in project_client.agents.list_agents()]
-        if not agents:
-            console.print("[yellow]No existing agents found.[/yellow]")
-            return
+def ingest_documents(paths, directory=DEFAULT_INDEX_DIR):
+    """Update the local text and chunk index of ``paths``; returns it, or None when TEXT_INDEX_DIR is empty"""
+    if not directory:
+        return None
+    index = TextIndex(directory)
+    stats = index.update(paths)
+    console.print(f"[green]Text index ready[/green] ({len(index)} documents, {stats['chunks']} chunks; "
+                  f"{stats['added']} added, {stats['changed']} changed, {stats['removed']} removed "
+                  f"in {stats['seconds']:.2f}s)")
+    return index
+
+async def collect_orphaned_agents(registry, console):
+    """Delete agents superseded by this run according to AGENT_GC_POLICY (never prompts)."""
+    def log(level, text):
+        console.print(f"[red]{text}[/red]" if level == "error" else f"[green]{text}[/green]")
 
-        console.print(Panel.fit(f"[bold]Found {len(agents)} existing agents to delete...[/bold]", style="cyan"))
-        
-        # Add confirmation prompt
-        console.print("[yellow]Do you want to delete all existing agents? Press 'Y' to confirm or any other key to skip:[/yellow]")
-        user_input = input().strip().upper()
-        
-        if user_input != 'Y':
-            console.print("[yellow]Skipping agent deletion.[/yellow]")
-            return
-            
-        for agent in agents:
-            try:
-                await project_client.agents.delete_agent(agent.id)
-                console.print(f"[green]Deleted agent {agent.id}[/green]")
-            except Exception as e:
-                console.print(f"[red]Failed to delete agent {agent.id}:[/red] {e}")
+    try:
+        deleted = await registry.collect_garbage(log=log)
+        if deleted:
+            console.print(f"[yellow]Garbage-collected {len(deleted)} orphaned agents.[/yellow]")
     except Exception as e:
         console.print(f"[red]Error listing/deleting agents:[/red] {e}")
 
-async def main():
-    load_dotenv()
-    
-    # Check for required files first
-    if not check_required_files():
-        return
+async def provision_agents(project_client, deployment_name, manifest, registry, resume_paths,
+                           on_step=None, on_upload_progress=None,
+                           shards=DEFAULT_RESUME_SHARDS, shard_strategy=DEFAULT_SHARD_STRATEGY,
+                           prerank_top_k=DEFAULT_PRERANK_TOP_K, local_tools=False,
+                           job_description_path="job_description.pdf", posting=None, shared=None,
+                           text_index=None, retrieval=DEFAULT_RETRIEVAL_BACKEND):
+    """Upload files and create vector stores and agents as a dependency graph.
+
+    Returns ``(results, graph)``; results are keyed by step name, agent steps
+    are named after the agent. ``results["resumes_vector_stores"]`` and
+    ``results["screening_agents"]`` list the per-shard resources in shard order.
+    With more than one shard, the recruiter gets no screening tool; attach a
+    ``ShardedScreeningPlugin`` when creating it. With ``prerank_top_k`` set,
+    only that many best-matching resumes (BM25 against the job description)
+    are uploaded; ``results["resume_paths"]`` lists the ones used. With
+    ``local_tools``, the recruiter gets no connected-agent tools at all, and
+    ``recruiter_plugins`` provides both as local functions. Agents created by
+    this call are deleted again if a later step fails.
+
+    For batch screening, ``posting`` names this job posting's own job
+    description vector store, and ``shared`` is the result of an earlier call
+    for the same resumes. Its resume files, resume vector stores, screening
+    agents and critic are reused as they are, so only the posting's job
+    description and its agents are provisioned. Pre-ranking reads resume text
+    from ``text_index`` when given instead of extracting it again.
+
+    With ``retrieval="local"`` nothing is uploaded: the job posting and
+    screening agents get a ``search_documents`` function tool instead of file
+    search, ``results["search_tools"]`` maps their names to the ``SearchTool``
+    over their documents in ``text_index`` (opened from TEXT_INDEX_DIR if not
+    given), and the recruiter uses local tools.
+    """
+    graph = ProvisioningGraph(on_step=on_step)
+    local_search = retrieval == "local"
+    # Function tools are executed by this process, so the agents are only ever called locally
+    local_tools = local_tools or local_search
+    if shared is not None:
+        resume_paths = shared["resume_paths"]
+    elif 0 < prerank_top_k < len(resume_paths):
+        # Runs before the graph because the selection determines the shards
+        graph.on_step("resume_prerank", "start", 0.0)
+        started = time.perf_counter()
+        ranked = await asyncio.to_thread(prerank_resumes, job_description_path, list(resume_paths), prerank_top_k,
+                                         index=text_index)
+        resume_paths = [path for path, score in ranked]
+        graph.on_step("resume_prerank", "done", time.perf_counter() - started)
+    resume_shards = partition(resume_paths, shards, shard_strategy)
+    store_names = [shard_name("resumes_vector_store", i, len(resume_shards)) for i in range(len(resume_shards))]
+    agent_names = [shard_name("CandidateScreening_agent", i, len(resume_shards)) for i in range(len(resume_shards))]
+    sharded = len(resume_shards) > 1
+    jd_store_name = "job_description_vector_store" if posting is None else f"job_description_vector_store_{posting}"
+
+    def reuse(name):
+        async def step(results):
+            return shared[name]
+        return step
+
+    async def upload_job_description(results):
+        (job_desc_file,) = await upload_files_cached(project_client, [job_description_path], manifest)
+        return job_desc_file
+
+    async def upload_resumes(results):
+        return await upload_files_cached(project_client, resume_paths, manifest, on_progress=on_upload_progress)
+
+    async def create_jd_vector_store(results):
+        return await get_or_create_vector_store(
+            project_client, manifest, jd_store_name, [results["job_description_file"]]
+        )
 
-    try:
-        endpoint = os.environ["AZURE_AI_AGENT_ENDPOINT"]
-        deployment_name = os.environ["AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME"]
-    except KeyError as e:
-        console.print(f"[red]Error:[/red] Environment variable {e} not set.")
-        console.print("[yellow]Please set AZURE_AI_AGENT_ENDPOINT and AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME.[/yellow]")
-        return
+    def create_resumes_vector_store(shard):
+        async def create(results):
+            # Uploads come back in input order, so shard membership maps by path
+            files_by_path = dict(zip(resume_paths, results["resume_files"]))
+            return await get_or_create_vector_store(
+                project_client, manifest, store_names[shard], [files_by_path[path] for path in resume_shards[shard]]
+            )
+        return create
 
-    # Remove download section and continue with existing code
-    async with (
-        DefaultAzureCredential() as creds,
-        AIProjectClient(endpoint=endpoint, credential=creds) as project_client,
-    ):
-        # Delete any existing agents before proceeding
-        await delete_all_agents(project_client, console)
-
-        # Upload job description PDF
-        console.print(Panel.fit("[bold]Uploading job description PDF...[/bold]", style="cyan"))
-        job_desc_file = await project_client.agents.files.upload_and_poll(file_path="job_description.pdf", purpose=FilePurpose.AGENTS)
-
-        # Upload resumes
-        console.print(Panel.fit("[bold]Uploading resumes...[/bold]", style="cyan"))
-        resume_files = sorted(glob.glob("resumes/*.pdf"))
-        resume_file_objs = [
-            await project_client.agents.files.upload_and_poll(file_path=f, purpose=FilePurpose.AGENTS)
-            for f in resume_files
-        ]
-        resume_file_ids = [f.id for f in resume_file_objs]
-        console.print("[green]Resumes uploaded successfully.[/green]")
-
-        # Create vector store for resumes
-        console.print(Panel.fit("[bold]Creating vector store for resumes...[/bold]", style="cyan"))
-        resumes_vector_store = await project_client.agents.vector_stores.create_and_poll(
-            file_ids=resume_file_ids,
-            name="resumes_vector_store"
-        )
-        console.print(f"[green]Created vector store[/green] (ID: [bold]{resumes_vector_store.id}[/bold])")
+    def build_search_tools():
+        index = ensure_indexed(text_index or TextIndex(), [job_description_path, *resume_paths])
+        tools = {"JobPosting_agent": SearchTool(LocalSearch.build(index, [job_description_path]))}
+        for shard, name in enumerate(agent_names):
+            tools[name] = shared["search_tools"][name] if shared is not None else \
+                SearchTool(LocalSearch.build(index, resume_shards[shard]))
+        return tools
+
+    async def create_search_tools(results):
+        return await asyncio.to_thread(build_search_tools)
 
-        # Create vector store for job description
-        console.print(Panel.fit("[bold]Creating vector store for job description...[/bold]", style="cyan"))
-        jd_vector_store = await project_client.agents.vector_stores.create_and_poll(
-            file_ids=[job_desc_file.id],
-            name="job_description_vector_store"
+    async def create_local_search_agent(name, instructions):
+        return await registry.get_or_create(
+            model=deployment_name,
+            name=name,
+            instructions=instructions,
+            tools=SEARCH_TOOL_DEFINITIONS,
         )
-        console.print(f"[green]Created vector store[/green] (ID: [bold]{jd_vector_store.id}[/bold])")
 
-        # Create workflow agent (job summary, access to job description vector store)
+    # Workflow agent (job summary, access to job description vector store)
+    async def create_job_posting_agent(results):
+        if local_search:
+            return await create_local_search_agent("JobPosting_agent", LOCAL_SEARCH_JOB_POSTING_AGENT_INSTRUCTIONS)
+        jd_vector_store = results["job_description_vector_store"]
         jd_file_search_tool = FileSearchTool(vector_store_ids=[jd_vector_store.id])
-        workflow_agent_def = await project_client.agents.create_agent(
+        return await registry.get_or_create(
             model=deployment_name,
             name="JobPosting_agent",
             instructions=JOB_POSTING_AGENT_INSTRUCTIONS,
@@ -201,20 +396,42 @@ async def main():
             tool_resources=ToolResources(file_search={"vector_store_ids": [jd_vector_store.id]})
         )
 
-        # Create screening agent (access to resumes vector store)
-        screening_file_search_tool = FileSearchTool(vector_store_ids=[resumes_vector_store.id])
-        screening_agent_def = await project_client.agents.create_agent(
-            model=deployment_name,
-            name="CandidateScreening_agent",
-            instructions=SCREENING_AGENT_INSTRUCTIONS,
-            tools=screening_file_search_tool.definitions,
-            tool_resources=ToolResources(file_search={"vector_store_ids": [resumes_vector_store.id]})
-        )
-
-        # Create recruiter agent (has workflow agent and screening agent as tools)
-        workflow_tool = ConnectedAgentTool(id=workflow_agent_def.id, name="JobPosting_agent", description="Summarizes the job posting.")
-        screening_tool = ConnectedAgentTool(id=screening_agent_def.id, name="CandidateScreening_agent", description="Screens a candidate's CV against a job description.")
-        recruiter_agent_def = await project_client.agents.create_agent(
+    # Screening agent per shard (access to that shard's resumes vector store)
+    def create_screening_agent(shard):
+        async def create(results):
+            if local_search:
+                return await create_local_search_agent(agent_names[shard], LOCAL_SEARCH_SCREENING_AGENT_INSTRUCTIONS)
+            resumes_vector_store = results[store_names[shard]]
+            screening_file_search_tool = FileSearchTool(vector_store_ids=[resumes_vector_store.id])
+            return await registry.get_or_create(
+                model=deployment_name,
+                name=agent_names[shard],
+                instructions=SCREENING_AGENT_INSTRUCTIONS,
+                tools=screening_file_search_tool.definitions,
+                tool_resources=ToolResources(file_search={"vector_store_ids": [resumes_vector_store.id]})
+            )
+        return create
+
+    # Recruiter agent (has workflow agent and, unless sharded, the screening agent as tools)
+    async def create_recruiter_agent(results):
+        if local_tools:
+            return await registry.get_or_create(
+                model=deployment_name,
+                name="recruiter",
+                instructions=LOCAL_TOOLS_RECRUITER_AGENT_INSTRUCTIONS,
+                temperature=0.1,
+            )
+        workflow_tool = ConnectedAgentTool(id=results["JobPosting_agent"].id, name="JobPosting_agent", description="Summarizes the job posting.")
+        if sharded:
+            return await registry.get_or_create(
+                model=deployment_name,
+                name="recruiter",
+                instructions=SHARDED_RECRUITER_AGENT_INSTRUCTIONS,
+                temperature=0.1,
+                tools=workflow_tool.definitions,
+            )
+        screening_tool = ConnectedAgentTool(id=results["CandidateScreening_agent"].id, name="CandidateScreening_agent", description="Screens a candidate's CV against a job description.")
+        return await registry.get_or_create(
             model=deployment_name,
             name="recruiter",
             instructions=RECRUITER_AGENT_INSTRUCTIONS,
@@ -222,25 +439,288 @@ async def main():
             tools=[screening_tool.definitions[0], workflow_tool.definitions[0]],
         )
 
-        # Create critic agent (no tools)
-        critic_agent_def = await project_client.agents.create_agent(
+    # Critic agent (no tools, no dependencies)
+    async def create_critic_agent(results):
+        return await registry.get_or_create(
             model=deployment_name,
             name="workflow",
             temperature=0.1,
             instructions=CRITIC_AGENT_INSTRUCTIONS,
         )
 
-        # Create AzureAIAgent objects for group chat
-        critic_agent = AzureAIAgent(
-            client=project_client,
-            definition=critic_agent_def,
-            description="Asks questions to identify the best candidates for the job posting."
+    if local_search:
+        # Agents do not depend on the documents, so they are created while the chunks are embedded
+        graph.add_step("search_tools", create_search_tools)
+        store_names = []
+        jd_store_steps = []
+    else:
+        graph.add_step("job_description_file", upload_job_description)
+        graph.add_step("job_description_vector_store", create_jd_vector_store, depends_on=["job_description_file"])
+        jd_store_steps = ["job_description_vector_store"]
+    if shared is not None:
+        for name in ([] if local_search else ["resume_files"]) + [*store_names, *agent_names]:
+            graph.add_step(name, reuse(name))
+    else:
+        if not local_search:
+            graph.add_step("resume_files", upload_resumes)
+        for shard in range(len(resume_shards)):
+            if not local_search:
+                graph.add_step(store_names[shard], create_resumes_vector_store(shard), depends_on=["resume_files"])
+            graph.add_step(agent_names[shard], create_screening_agent(shard),
+                           depends_on=store_names[shard:shard + 1], cleanup=registry.delete_if_created)
+    graph.add_step("JobPosting_agent", create_job_posting_agent,
+                   depends_on=jd_store_steps, cleanup=registry.delete_if_created)
+    # Sharded screening goes through a local plugin, so the recruiter need not wait for the shards
+    graph.add_step("recruiter", create_recruiter_agent,
+                   depends_on=[] if local_tools else ["JobPosting_agent"] + ([] if sharded else agent_names),
+                   cleanup=registry.delete_if_created)
+    if shared is not None:
+        graph.add_step("workflow", reuse("workflow"))
+    else:
+        graph.add_step("workflow", create_critic_agent, cleanup=registry.delete_if_created)
+
+    results = await graph.run()
+    results["resume_paths"] = resume_paths
+    results["resumes_vector_stores"] = [results[name] for name in store_names]
+    results["screening_agents"] = [results[name] for name in agent_names]
+    results["local_tools"] = local_tools
+    results.setdefault("resume_files", [])
+    results.setdefault("job_description_vector_store", None)
+    results.setdefault("search_tools", {})
+    return results, graph
+
+def recruiter_plugins(agents_client, provisioned, agent_stats=None, cache=None, manifest=None):
+    """Local function tools the recruiter needs for ``provisioned`` agents, answering from ``cache`` if given"""
+    plugins = []
+    if provisioned["local_tools"]:
+        plugins.append(JobPostingPlugin(
+            agents_client, provisioned["JobPosting_agent"], agent_stats=agent_stats, cache=cache, manifest=manifest,
+            search_tools=provisioned["search_tools"],
+        ))
+    # With several resume shards the recruiter screens all of them through a local function
+    if provisioned["local_tools"] or len(provisioned["screening_agents"]) > 1:
+        plugins.append(ShardedScreeningPlugin(
+            agents_client, provisioned["screening_agents"], agent_stats=agent_stats, cache=cache, manifest=manifest,
+            search_tools=provisioned["search_tools"],
+        ))
+    return plugins
+
+def provisioning_timings_table(graph):
+    """Render per-step provisioning timings as a rich table"""
+    critical = set(graph.critical_path())
+    table = Table(title="Provisioning timings", box=box.SIMPLE)
+    table.add_column("Step")
+    table.add_column("Start (s)", justify="right")
+    table.add_column("Duration (s)", justify="right")
+    for name, timing in sorted(graph.timings.items(), key=lambda item: item[1]["start"]):
+        label = f"[bold]{name}[/bold] *" if name in critical else name
+        table.add_row(label, f"{timing['start']:.2f}", f"{timing['duration']:.2f}")
+    table.caption = "* critical path"
+    return table
+
+def agent_latency_table(collector):
+    """Render measured per-agent latency, time to first token and tokens as a rich table"""
+    table = Table(title="Agent latency (s)", box=box.SIMPLE)
+    table.add_column("Agent")
+    table.add_column("Turns", justify="right")
+    for column in ("p50", "p95", "p99", "TTFT p50", "Tokens", "Cache hits"):
+        table.add_column(column, justify="right")
+    for name, stats in collector.agents.items():
+        latency = stats.latency.summary()
+        ttft = stats.time_to_first_token.quantile(0.5)
+        table.add_row(
+            name,
+            str(stats.invocations),
+            *(f"{latency[q]:.2f}" if latency[q] is not None else "-" for q in ("p50", "p95", "p99")),
+            f"{ttft:.2f}" if ttft is not None else "-",
+            str(stats.prompt_tokens + stats.completion_tokens),
+            str(stats.cache_hits),
         )
-        recruiter_agent = AzureAIAgent(
-            client=project_client,
-            definition=recruiter_agent_def,
-            description="Recruiter agent with access to candidate data."
+    return table
+
+def connection_settings():
+    """Return ``(fake, endpoint, deployment_name)``, or None after reporting missing settings"""
+    fake = DEFAULT_AGENT_BACKEND == "fake"
+    try:
+        endpoint = FAKE_ENDPOINT if fake else os.environ["AZURE_AI_AGENT_ENDPOINT"]
+        deployment_name = model_deployment_name()
+    except KeyError as e:
+        console.print(f"[red]Error:[/red] Environment variable {e} not set.")
+        console.print("[yellow]Please set AZURE_AI_AGENT_ENDPOINT and AZURE_AI_AGENT_MODEL_DEPLOYMENT_NAME.[/yellow]")
+        return None
+    return fake, endpoint, deployment_name
+
+async def open_project_client(stack, fake, endpoint, scheduler=None):
+    """Enter the project client (and credential) into ``stack``; AGENT_BACKEND=fake uses the in-process fake service.
+
+    All agent service requests go through ``scheduler`` (rate limits, Retry-After, adaptive concurrency).
+    """
+    scheduler = scheduler or RequestScheduler()
+    if fake:
+        console.print("[yellow]Using the offline fake agent backend (AGENT_BACKEND=fake)[/yellow]")
+        return await stack.enter_async_context(FakeProjectClient(scheduler=scheduler))
+    creds = await stack.enter_async_context(DefaultAzureCredential())
+    return await stack.enter_async_context(
+        AIProjectClient(endpoint=endpoint, credential=creds, **pipeline_options(scheduler))
+    )
+
+def scheduler_summary(scheduler):
+    """One line of throttling counts, or None if the service never throttled a request"""
+    stats = scheduler.stats()
+    throttled = sum(lane.get("throttled", 0) for lane in stats.values())
+    if not throttled:
+        return None
+    retries = sum(lane.get("retries", 0) for lane in stats.values())
+    limits = ", ".join(f"{name} {lane['limit']:g}" for name, lane in stats.items() if lane.get("throttled"))
+    return f"{throttled} requests throttled, {retries} retried; concurrency limits now {limits}"
+
+async def run_group_chat(project_client, provisioned, agent_stats, telemetry, plugins,
+                         agent_response_callback=None, on_terminate=None):
+    """Run the recruiter/critic group chat on provisioned agents; returns ``(result, manager)``"""
+    # Create AzureAIAgent (or, offline, FakeAgent) objects for group chat
+    Agent = agent_class()
+    critic_agent = Agent(
+        client=project_client,
+        definition=provisioned["workflow"],
+        description="Asks questions to identify the best candidates for the job posting."
+    )
+    recruiter_agent = Agent(
+        client=project_client,
+        definition=provisioned["recruiter"],
+        description="Recruiter agent with access to candidate data.",
+        plugins=plugins,
+    )
+
+    def on_turn_start(agent_name):
+        agent_stats.turn_started(agent_name)
+        telemetry.turn_started(agent_name)
+
+    def on_turn_end(message):
+        agent_stats.turn_finished(message, project_client.agents)
+        telemetry.turn_finished(message)
+
+    def on_chat_terminated(reason):
+        telemetry.chat_terminated(reason)
+        if on_terminate:
+            on_terminate(reason)
+
+    def streaming_agent_response_callback(message: StreamingChatMessageContent, is_final: bool) -> None:
+        agent_stats.chunk_received(message.name or str(message.role), message.content)
+
+    # Set up group chat orchestration
+    agents = [recruiter_agent, critic_agent]
+    manager = CustomGroupChatManager(
+        max_rounds=DEFAULT_MAX_ROUNDS,
+        on_turn_start=on_turn_start,
+        on_turn_end=on_turn_end,
+        on_terminate=on_chat_terminated,
+        token_usage=agent_stats.total_tokens,
+    )
+    group_chat_orchestration = GroupChatOrchestration(
+        members=agents,
+        manager=manager,
+        agent_response_callback=agent_response_callback,
+        streaming_agent_response_callback=streaming_agent_response_callback,
+    )
+
+    # Start the runtime
+    runtime = InProcessRuntime()
+    runtime.start()
+    try:
+        # Initial task/message
+        kickoff_message = (
+            "Please provide a summary of the job posting. (using myfiles_browser)"
         )
+        orchestration_result = await group_chat_orchestration.invoke(
+            task=kickoff_message,
+            runtime=runtime,
+        )
+        value = await orchestration_result.get()
+        await runtime.stop_when_idle()
+    except BaseException:
+        await runtime.stop()
+        raise
+    return value, manager
+
+async def main():
+    load_dotenv()
+    
+    # Check for required files first
+    if not check_required_files():
+        return
+    resume_files = sorted(glob.glob("resumes/*.pdf"))
+    text_index = await asyncio.to_thread(ingest_documents, ["job_description.pdf", *resume_files])
+
+    settings = connection_settings()
+    if settings is None:
+        return
+    fake, endpoint, deployment_name = settings
+
+    scheduler = RequestScheduler()
+    async with AsyncExitStack() as stack:
+        project_client = await open_project_client(stack, fake, endpoint, scheduler)
+        # One trace covers provisioning, every group chat round and every tool call
+        configure_tracing()
+        telemetry = RunTelemetry()
+        telemetry.start()
+
+        # Provision files, vector stores and agents; independent steps run concurrently
+        console.print(Panel.fit("[bold]Provisioning files, vector stores and agents...[/bold]", style="cyan"))
+        manifest = FileManifest(endpoint)
+        registry = AgentRegistry(project_client)
+        # Repeated job posting and screening questions are answered locally (RESPONSE_CACHE)
+        response_cache = ResponseCache.from_env()
+        if response_cache is not None:
+            stack.callback(response_cache.close)
+        # Ranked candidates go to RESULT_SINKS as typed records the moment the recruiter replies
+        sinks = open_sinks()
+        for sink in sinks:
+            stack.callback(sink.close)
+        results = ResultCollector(f"console-{datetime.now():%Y%m%d-%H%M%S}", sinks)
+
+        def on_step(name, event, elapsed):
+            telemetry.provisioning_step(name, event, elapsed)
+            if event == "done":
+                console.print(f"[green]✓ {name}[/green] ({elapsed:.2f}s)")
+            elif event == "failed":
+                console.print(f"[red]✗ {name}[/red] ({elapsed:.2f}s)")
+
+        with Progress(console=console) as progress:
+            upload_task = progress.add_task("Uploading resumes", total=None)
+            provisioned, graph = await provision_agents(
+                project_client,
+                deployment_name,
+                manifest,
+                registry,
+                resume_files,
+                on_step=on_step,
+                on_upload_progress=lambda done, total, path: progress.update(upload_task, completed=done, total=total),
+                local_tools=response_cache is not None,
+                text_index=text_index,
+            )
+            progress.update(upload_task, total=1, completed=1)
+
+        if len(provisioned["resume_paths"]) < len(resume_files):
+            console.print(f"[green]Pre-ranked {len(resume_files)} resumes[/green], screening the top {len(provisioned['resume_paths'])}")
+        if provisioned["search_tools"]:
+            chunks = sum(len(tool.search) for tool in provisioned["search_tools"].values())
+            console.print(f"[green]Local search ready[/green] ({len(provisioned['resume_paths'])} resumes, {chunks} chunks)")
+        else:
+            reused = sum(f.reused for f in provisioned["resume_files"])
+            console.print(f"[green]Resumes ready.[/green] ({reused} of {len(provisioned['resume_paths'])} reused from cache)")
+            resume_store_ids = ", ".join(store.id for store in provisioned["resumes_vector_stores"])
+            console.print(f"[green]Vector stores ready[/green] (resumes: [bold]{resume_store_ids}[/bold], "
+                          f"job description: [bold]{provisioned['job_description_vector_store'].id}[/bold])")
+        console.print(
+            f"[green]Agents ready.[/green] ({len(registry.reused)} reused, {len(registry.created)} created)"
+        )
+        console.print(provisioning_timings_table(graph))
+
+        # Clean up superseded agents in the background while the chat runs
+        gc_task = asyncio.create_task(collect_orphaned_agents(registry, console))
+
+        # Time each turn from agent selection to response, and its first streamed text chunk
+        agent_stats = AgentStatsCollector(on_tool_call=telemetry.tool_call)
 
         # Define agent response callback
         def agent_response_callback(message: ChatMessageContent) -> None:
@@ -251,37 +731,178 @@ async def main():
                     style="bright_blue" if message.name == "TalentAcquisitionSpecialist_agent" else "magenta"
                 )
             )
+            if message.name == "recruiter":
+                results.add_reply(str(message.content), source=message.name)
 
-        # Set up group chat orchestration
-        agents = [recruiter_agent, critic_agent]
-        group_chat_orchestration = GroupChatOrchestration(
-            members=agents,
-            manager=CustomGroupChatManager(max_rounds=10),
-            agent_response_callback=agent_response_callback,
-        )
-
-        # Start the runtime
-        runtime = InProcessRuntime()
-        runtime.start()
-
-        # Initial task/message
-        kickoff_message = (
-            "Please provide a summary of the job posting. (using myfiles_browser)"
-        )
+        def on_terminate(reason):
+            console.print(f"[yellow]Group chat ended: {reason.replace('_', ' ')}[/yellow]")
 
         # Run the orchestration
         console.print(Panel.fit("[bold yellow]\n--- Starting Group Chat ---\n[/bold yellow]", style="magenta"))
-        orchestration_result = await group_chat_orchestration.invoke(
-            task=kickoff_message,
-            runtime=runtime,
+        value, _ = await run_group_chat(
+            project_client,
+            provisioned,
+            agent_stats,
+            telemetry,
+            recruiter_plugins(project_client.agents, provisioned, agent_stats, response_cache, manifest),
+            agent_response_callback=agent_response_callback,
+            on_terminate=on_terminate,
         )
-
-        value = await orchestration_result.get()
         console.print(Panel.fit(f"[bold green]--- Group Chat Completed ---[/bold green]\n{value}", style="green"))
 
-        # Optional: Stop the runtime
-        await runtime.stop_when_idle()
+        await gc_task
+        await agent_stats.drain()
+        telemetry.finish("completed")
+        console.print(agent_latency_table(agent_stats))
+        if response_cache is not None:
+            cache_stats = response_cache.stats()
+            console.print(f"Response cache ({cache_stats['backend']}): {cache_stats['hits']} hits, "
+                          f"{cache_stats['misses']} misses, {cache_stats['entries']} entries")
+        if sinks:
+            console.print(f"{len(results.records)} candidate records from {results.rankings} rankings written to "
+                          f"{', '.join(type(sink).__name__ for sink in sinks)}")
+        summary = scheduler_summary(scheduler)
+        if summary:
+            console.print(f"[yellow]{summary}[/yellow]")
+
+def posting_name(path):
+    """Identifier for a job posting, from its file name"""
+    return re.sub(r"\W+", "_", os.path.splitext(os.path.basename(path))[0]).strip("_")
+
+async def screen_posting(project_client, deployment_name, manifest, registry, path, shared,
+                         response_cache=None, text_index=None, results=None):
+    """Provision one posting's agents on top of ``shared`` and run its group chat; returns a result row.
+
+    ``results`` (a ``ResultCollector`` for this posting) receives its rankings as they are produced.
+    """
+    name = posting_name(path)
+    results = results or ResultCollector(posting=name)
+
+    def agent_response_callback(message):
+        if message.name == "recruiter":
+            results.add_reply(str(message.content), source=message.name)
+
+    telemetry = RunTelemetry(name)
+    telemetry.start()
+    agent_stats = AgentStatsCollector(on_tool_call=telemetry.tool_call)
+    started = time.perf_counter()
+    row = {"posting": name, "job_description": path}
+    try:
+        provisioned, _ = await provision_agents(
+            project_client, deployment_name, manifest, registry, shared["resume_paths"],
+            on_step=telemetry.provisioning_step, local_tools=response_cache is not None,
+            job_description_path=path, posting=name, shared=shared, text_index=text_index,
+        )
+        value, manager = await run_group_chat(
+            project_client, provisioned, agent_stats, telemetry,
+            recruiter_plugins(project_client.agents, provisioned, agent_stats, response_cache, manifest),
+            agent_response_callback=agent_response_callback,
+        )
+        await agent_stats.drain()
+        telemetry.finish("completed")
+        row.update(
+            status="completed",
+            termination_reason=manager.termination_reason,
+            candidates=[record._asdict() for record in results.latest()],
+            result=str(value.content),
+        )
+    except Exception as e:
+        telemetry.finish("error")
+        row.update(status="error", error=str(e))
+    row["seconds"] = round(time.perf_counter() - started, 3)
+    row["tokens"] = agent_stats.total_tokens()
+    return row
+
+async def run_batch(job_dir, concurrency=DEFAULT_BATCH_CONCURRENCY, output="batch_results.json"):
+    """Screen every job description PDF in ``job_dir`` against one shared resume pool.
+
+    Resumes, their vector stores, the screening agents and the critic are
+    provisioned once; each posting adds its job description, job posting agent
+    and recruiter, and runs its own group chat, at most ``concurrency`` at a time.
+    """
+    load_dotenv()
+    postings = sorted(glob.glob(os.path.join(job_dir, "*.pdf")))
+    resume_files = sorted(glob.glob("resumes/*.pdf"))
+    if not postings or not resume_files:
+        console.print(f"[red]Need job description PDFs in {job_dir} and resume PDFs in resumes/.[/red]")
+        return
+    text_index = await asyncio.to_thread(ingest_documents, [*postings, *resume_files])
+    settings = connection_settings()
+    if settings is None:
+        return
+    fake, endpoint, deployment_name = settings
+
+    # Batch requests yield to interactive ones wherever they share a scheduler
+    request_priority.set("batch")
+    scheduler = RequestScheduler()
+    async with AsyncExitStack() as stack:
+        project_client = await open_project_client(stack, fake, endpoint, scheduler)
+        configure_tracing()
+        manifest = FileManifest(endpoint)
+        registry = AgentRegistry(project_client)
+        response_cache = ResponseCache.from_env()
+        if response_cache is not None:
+            stack.callback(response_cache.close)
+        sinks = open_sinks()
+        for sink in sinks:
+            stack.callback(sink.close)
+        batch_id = f"batch-{datetime.now():%Y%m%d-%H%M%S}"
+
+        # The first posting provisions everything; the rest reuse its resume side.
+        # Pre-ranking is per posting, so it is skipped: every posting screens the same pool.
+        console.print(Panel.fit(f"[bold]Provisioning {len(resume_files)} resumes for {len(postings)} postings...[/bold]",
+                                style="cyan"))
+        started = time.perf_counter()
+        shared, graph = await provision_agents(
+            project_client, deployment_name, manifest, registry, resume_files,
+            local_tools=response_cache is not None, prerank_top_k=0,
+            job_description_path=postings[0], posting=posting_name(postings[0]), text_index=text_index,
+        )
+        console.print(provisioning_timings_table(graph))
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def screen(path):
+            async with semaphore:
+                results = ResultCollector(batch_id, sinks, posting=posting_name(path))
+                # A registry session per posting, so a failed posting only rolls back its own agents
+                row = await screen_posting(project_client, deployment_name, manifest, registry.session(), path,
+                                           shared, response_cache, text_index, results)
+            style = "green" if row["status"] == "completed" else "red"
+            console.print(f"[{style}]{row['posting']}[/{style}]: {row['status']} in {row['seconds']:.1f}s"
+                          + (f", {len(row['candidates'])} candidates ({row['termination_reason']})"
+                             if row["status"] == "completed" else f": {row['error']}"))
+            return row
+
+        rows = await asyncio.gather(*(screen(path) for path in postings))
+        await collect_orphaned_agents(registry, console)
+
+    elapsed = time.perf_counter() - started
+    completed = sum(row["status"] == "completed" for row in rows)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": datetime.now().isoformat(),
+            "resumes": len(shared["resume_paths"]),
+            "postings": len(rows),
+            "completed": completed,
+            "seconds": round(elapsed, 3),
+            "results": rows,
+        }, f, indent=2)
+    console.print(f"[bold]{completed} of {len(rows)} postings screened in {elapsed:.1f}s[/bold]; results in {output}")
+    summary = scheduler_summary(scheduler)
+    if summary:
+        console.print(f"[yellow]{summary}[/yellow]")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Screen resumes against job postings with a group of agents.")
+    parser.add_argument("--batch-dir", help="screen every job description PDF in this directory instead of "
+                                            "job_description.pdf, sharing one resume vector store")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_BATCH_CONCURRENCY,
+                        help="postings screened at the same time in batch mode")
+    parser.add_argument("--output", default="batch_results.json", help="combined results file of batch mode")
+    args = parser.parse_args()
+    if args.batch_dir:
+        asyncio.run(run_batch(args.batch_dir, args.concurrency, args.output))
+    else:
+        asyncio.run(main())
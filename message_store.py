@@ -0,0 +1,136 @@
+"""Bounded storage for a run's message history.
+
+Only the most recent messages are kept in memory, as compact ``__slots__``
+records. With a transcript directory configured, every message is also
+appended to ``<run_id>.jsonl``, and older pages are read back from that file
+on demand through a sparse in-memory index of byte offsets. Without one,
+messages that fall out of the window are gone, and paging starts at the
+oldest retained message.
+"""
+import os
+import json
+import bisect
+from array import array
+from collections import deque
+
+DEFAULT_MAX_MESSAGES = int(os.environ.get("MAX_MESSAGES_IN_MEMORY", "500"))
+# Empty disables the on-disk transcript
+DEFAULT_TRANSCRIPT_DIR = os.environ.get("TRANSCRIPT_DIR", "")
+
+# One index entry (first seq and byte offset) per this many transcript lines
+INDEX_STRIDE = 64
+
+
+class Message:
+    __slots__ = ("seq", "timestamp", "sender", "content", "agent_type", "message_id")
+
+    def __init__(self, seq, timestamp, sender, content, agent_type, message_id=None):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.sender = sender
+        self.content = content
+        self.agent_type = agent_type
+        # Set on agent responses that were streamed as message.delta events first
+        self.message_id = message_id
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["seq"], data["timestamp"], data["sender"], data["content"], data["agent_type"], data.get("message_id")
+        )
+
+    def to_dict(self):
+        data = {
+            "timestamp": self.timestamp,
+            "sender": self.sender,
+            "content": self.content,
+            "agent_type": self.agent_type,
+            "seq": self.seq,
+        }
+        if self.message_id:
+            data["message_id"] = self.message_id
+        return data
+
+
+class MessageStore:
+    """Recent messages in a ring buffer, with an optional append-only JSONL transcript of all of them"""
+
+    def __init__(self, max_messages=DEFAULT_MAX_MESSAGES, transcript_path=None):
+        self.transcript_path = transcript_path
+        self.total = 0
+        self._recent = deque(maxlen=max_messages)
+        self._evicted_seq = 0
+        self._file = None
+        self._size = 0
+        self._index_seqs = array("q")
+        self._index_offsets = array("q")
+
+    @classmethod
+    def for_run(cls, run_id, transcript_dir=DEFAULT_TRANSCRIPT_DIR, **kwargs):
+        """Store for one run, with a transcript when ``transcript_dir`` is set"""
+        path = None
+        if transcript_dir and run_id:
+            os.makedirs(transcript_dir, exist_ok=True)
+            path = os.path.join(transcript_dir, f"{run_id}.jsonl")
+        return cls(transcript_path=path, **kwargs)
+
+    def __len__(self):
+        return self.total
+
+    def append(self, message):
+        """Store a published message dict (must carry its ``seq``)"""
+        record = Message.from_dict(message)
+        if len(self._recent) == self._recent.maxlen:
+            self._evicted_seq = self._recent[0].seq
+        self._recent.append(record)
+        if self.transcript_path:
+            self._write(record)
+        self.total += 1
+
+    def _write(self, record):
+        if self._file is None:
+            # Start a fresh transcript; reopen for appending after close()
+            self._file = open(self.transcript_path, "ab" if self.total else "wb")
+        line = json.dumps(record.to_dict()).encode("utf-8") + b"\n"
+        if self.total % INDEX_STRIDE == 0:
+            self._index_seqs.append(record.seq)
+            self._index_offsets.append(self._size)
+        self._file.write(line)
+        self._size += len(line)
+
+    def recent(self):
+        """Messages still held in memory, oldest first"""
+        return [record.to_dict() for record in self._recent]
+
+    def page(self, since=0, limit=200):
+        """Return ``(messages, has_more)`` for up to ``limit`` messages with seq greater than ``since``"""
+        if since < self._evicted_seq and self.transcript_path:
+            return self._page_from_transcript(since, limit)
+        start = bisect.bisect_right(self._recent, since, key=lambda record: record.seq)
+        end = min(start + limit, len(self._recent))
+        messages = [self._recent[i].to_dict() for i in range(start, end)]
+        return messages, end < len(self._recent)
+
+    def _page_from_transcript(self, since, limit):
+        if self._file is not None:
+            self._file.flush()
+        block = max(0, bisect.bisect_right(self._index_seqs, since) - 1)
+        messages = []
+        has_more = False
+        with open(self.transcript_path, "rb") as transcript:
+            transcript.seek(self._index_offsets[block])
+            for line in transcript:
+                message = json.loads(line)
+                if message["seq"] <= since:
+                    continue
+                if len(messages) == limit:
+                    has_more = True
+                    break
+                messages.append(message)
+        return messages, has_more
+
+    def close(self):
+        """Close the transcript file; a later append reopens it"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
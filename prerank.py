@@ -0,0 +1,166 @@
+"""Local BM25 pre-ranking of resumes against the job description.
+
+Before any resume is uploaded, resume and job description PDFs are reduced to
+text and matched with BM25 over a fixed vocabulary. The vocabulary is the
+skill lists from ``create_data.py`` plus the keywords of the job
+description's qualifications. Only the ``PRERANK_TOP_K`` best resumes go on to
+the vector stores and the LLM screening agents, so for large pools agent
+round trips and tokens scale with K instead of the pool size. Scoring is a
+single sparse matrix-vector product, and ties keep input order, so the
+selection is deterministic.
+"""
+import os
+import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+from pypdf import PdfReader
+
+from create_data import CERTIFICATIONS, CLOUD_TECHNOLOGIES, DATABASES, FRAMEWORKS, PROGRAMMING_LANGUAGES
+
+# 0 disables pre-ranking
+DEFAULT_PRERANK_TOP_K = int(os.environ.get("PRERANK_TOP_K", "0"))
+
+SKILL_PHRASES = PROGRAMMING_LANGUAGES + FRAMEWORKS + CLOUD_TECHNOLOGIES + DATABASES + CERTIFICATIONS
+
+STOPWORDS = frozenset("""
+a an and are as at be background by for from in into is of on or our strong the their this to track with you
+years experience record major complex
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+# Below this many files the process pool costs more than it saves
+_PARALLEL_EXTRACTION_THRESHOLD = 64
+
+
+def tokenize(text):
+    """Lower-case tokens that keep skill spellings such as 'c#', 'c++' and 'vue.js' intact"""
+    return [token.rstrip(".") for token in _TOKEN.findall(text.lower())]
+
+
+def extract_text(path):
+    """Plain text of a PDF"""
+    return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+
+def extract_texts(paths, workers=None):
+    """Extract many PDFs, in worker processes when there are enough of them"""
+    if len(paths) < _PARALLEL_EXTRACTION_THRESHOLD:
+        return [extract_text(path) for path in paths]
+    # Spawned workers: forking a process that runs an event loop and threads is unsafe
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(pool.map(extract_text, paths, chunksize=32))
+
+
+def qualifications_section(job_text):
+    """The qualifications and additional requirements of a job posting, or the whole text"""
+    match = re.search(r"Qualifications:(.*?)(?:Contoso is committed|\Z)", job_text, re.S | re.I)
+    return match.group(1) if match else job_text
+
+
+def build_vocabulary(query_text, phrases=SKILL_PHRASES):
+    """Skill phrases plus the query's own keywords, as token tuples"""
+    vocabulary = {tuple(tokenize(phrase)) for phrase in phrases}
+    vocabulary.update(
+        (token,) for token in tokenize(query_text)
+        if len(token) > 2 and token.isalpha() and token not in STOPWORDS
+    )
+    vocabulary.discard(())
+    return sorted(vocabulary)
+
+
+class BM25Index:
+    """Sparse BM25 document-term matrix over a fixed vocabulary of single- and multi-word terms"""
+
+    def __init__(self, vocabulary, k1=1.5, b=0.75):
+        self.vocabulary = list(vocabulary)
+        self.k1 = k1
+        self.b = b
+        self._term_ids = {term: i for i, term in enumerate(self.vocabulary)}
+        self._first_tokens = {term[0] for term in self.vocabulary}
+        self._max_length = max((len(term) for term in self.vocabulary), default=1)
+        self.matrix = None
+        self.idf = None
+
+    def _term_counts(self, tokens):
+        counts = {}
+        for start, token in enumerate(tokens):
+            if token not in self._first_tokens:
+                continue
+            for length in range(1, self._max_length + 1):
+                term_id = self._term_ids.get(tuple(tokens[start:start + length]))
+                if term_id is not None:
+                    counts[term_id] = counts.get(term_id, 0) + 1
+        return counts
+
+    def fit(self, documents):
+        """Index ``documents`` (strings); returns self"""
+        rows, cols, data, lengths = [], [], [], []
+        for row, document in enumerate(documents):
+            tokens = tokenize(document)
+            lengths.append(len(tokens))
+            for term_id, count in self._term_counts(tokens).items():
+                rows.append(row)
+                cols.append(term_id)
+                data.append(count)
+        shape = (len(lengths), len(self.vocabulary))
+        tf = sparse.csr_matrix((np.asarray(data, dtype=np.float64), (rows, cols)), shape=shape)
+
+        lengths = np.asarray(lengths, dtype=np.float64)
+        average_length = lengths.mean() if len(lengths) and lengths.mean() > 0 else 1.0
+        document_frequency = np.bincount(tf.indices, minlength=shape[1])
+        self.idf = np.log((shape[0] - document_frequency + 0.5) / (document_frequency + 0.5) + 1.0)
+
+        # BM25 term saturation, applied to the stored non-zeros only
+        row_lengths = np.repeat(lengths, np.diff(tf.indptr))
+        norm = self.k1 * (1 - self.b + self.b * row_lengths / average_length)
+        tf.data = tf.data * (self.k1 + 1) / (tf.data + norm)
+        self.matrix = tf
+        return self
+
+    def query_vector(self, query_text):
+        weights = np.zeros(len(self.vocabulary))
+        for term_id, count in self._term_counts(tokenize(query_text)).items():
+            weights[term_id] = count
+        return weights * self.idf
+
+    def score(self, query_text):
+        """BM25 score of every indexed document for ``query_text``"""
+        return self.matrix @ self.query_vector(query_text)
+
+    def top_k(self, query_text, k):
+        """``(index, score)`` of the ``k`` best documents, best first, ties in index order"""
+        scores = self.score(query_text)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        candidates = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        # argpartition may cut a tie arbitrarily; widen to every document tied with the k-th score
+        threshold = scores[candidates].min()
+        candidates = np.flatnonzero(scores >= threshold)
+        order = np.lexsort((candidates, -scores[candidates]))[:k]
+        return [(int(candidates[i]), float(scores[candidates[i]])) for i in order]
+
+
+def rank_texts(job_text, resume_texts, top_k):
+    """Return ``(index, score)`` for the ``top_k`` resume texts that best match the job's qualifications"""
+    query = qualifications_section(job_text)
+    index = BM25Index(build_vocabulary(query)).fit(resume_texts)
+    return index.top_k(query, top_k)
+
+
+def prerank_resumes(job_description_path, resume_paths, top_k=DEFAULT_PRERANK_TOP_K, workers=None, index=None):
+    """Return ``(path, score)`` for the ``top_k`` best resumes, best first (CPU-bound; run in a thread).
+
+    With a ``text_index.TextIndex`` that holds all the files, their stored text is used.
+    """
+    paths = [job_description_path, *resume_paths]
+    if index is not None and all(index.document_id(path) is not None for path in paths):
+        job_text, *resume_texts = (index.document_text(path) for path in paths)
+    else:
+        job_text = extract_text(job_description_path)
+        resume_texts = extract_texts(list(resume_paths), workers)
+    return [(resume_paths[i], score) for i, score in rank_texts(job_text, resume_texts, top_k)]
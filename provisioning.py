@@ -0,0 +1,105 @@
+"""Run provisioning steps as a small dependency graph.
+
+Steps whose dependencies are satisfied run concurrently, so total latency is
+the critical path through the graph rather than the sum of all steps. If a
+step fails, every other in-flight step is cancelled and the cleanup hooks of
+the steps that already completed run in reverse order.
+"""
+import time
+import asyncio
+
+
+class ProvisioningError(Exception):
+    """Raised when a provisioning step fails; wraps the original error"""
+
+    def __init__(self, step, error):
+        super().__init__(f"Provisioning step '{step}' failed: {error}")
+        self.step = step
+        self.error = error
+
+
+class ProvisioningGraph:
+    def __init__(self, on_step=None):
+        """``on_step(name, event, elapsed)`` is called with event "start", "done" or "failed"."""
+        self.steps = {}
+        self.timings = {}
+        self.on_step = on_step or (lambda name, event, elapsed: None)
+
+    def add_step(self, name, func, depends_on=(), cleanup=None):
+        """Register ``func(results)``, an async callable receiving the results of earlier steps.
+
+        ``cleanup(result)`` is awaited if a later step fails after this one succeeded.
+        """
+        if name in self.steps:
+            raise ValueError(f"Duplicate provisioning step '{name}'")
+        for dep in depends_on:
+            if dep not in self.steps:
+                raise ValueError(f"Step '{name}' depends on unknown step '{dep}'")
+        self.steps[name] = {"func": func, "depends_on": tuple(depends_on), "cleanup": cleanup}
+
+    async def run(self):
+        """Run all steps and return a dict of step name to result"""
+        results = {}
+        completed = []
+        tasks = {}
+        started = time.perf_counter()
+        failure = None
+
+        async def run_step(name, step):
+            nonlocal failure
+            await asyncio.gather(*(tasks[dep] for dep in step["depends_on"]))
+            step_start = time.perf_counter()
+            self.on_step(name, "start", 0.0)
+            try:
+                result = await step["func"](results)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failure = failure or ProvisioningError(name, e)
+                self.on_step(name, "failed", time.perf_counter() - step_start)
+                raise
+            finished = time.perf_counter()
+            self.timings[name] = {
+                "start": round(step_start - started, 3),
+                "duration": round(finished - step_start, 3),
+            }
+            results[name] = result
+            completed.append(name)
+            self.on_step(name, "done", finished - step_start)
+            return result
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                for name, step in self.steps.items():
+                    tasks[name] = group.create_task(run_step(name, step))
+        except BaseException as e:
+            await self._cleanup(completed, results)
+            if failure is not None and isinstance(e, BaseExceptionGroup):
+                raise failure from failure.error
+            raise
+        finally:
+            self.timings["total"] = {"start": 0.0, "duration": round(time.perf_counter() - started, 3)}
+        return results
+
+    async def _cleanup(self, completed, results):
+        for name in reversed(completed):
+            cleanup = self.steps[name]["cleanup"]
+            if cleanup is None:
+                continue
+            try:
+                await cleanup(results[name])
+            except Exception:
+                pass  # Best effort: the original failure is what gets reported
+
+    def critical_path(self):
+        """Return the chain of steps that determined the total duration"""
+        finish = {name: t["start"] + t["duration"] for name, t in self.timings.items() if name != "total"}
+        if not finish:
+            return []
+        path = [max(finish, key=finish.get)]
+        while self.steps[path[-1]]["depends_on"]:
+            deps = [d for d in self.steps[path[-1]]["depends_on"] if d in finish]
+            if not deps:
+                break
+            path.append(max(deps, key=finish.get))
+        return list(reversed(path))
@@ -0,0 +1,101 @@
+"""Parse, merge and format the ranked candidate tables agents reply with."""
+import re
+from collections import namedtuple
+
+# score is normalised to 0-100; source names the shard or agent that produced the row
+RankedCandidate = namedtuple("RankedCandidate", ["name", "score", "notes", "source"])
+
+RANKING_FORMAT_INSTRUCTIONS = (
+    "Answer with a markdown table with the columns Candidate, Score and Notes, "
+    "one row per candidate, best first. Score each candidate from 0 to 100."
+)
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+# The maximum of a score given as "x/y" or "x out of y"
+_SCALE = re.compile(r"(?:/|\bout of\b)\s*(\d+(?:\.\d+)?)", re.IGNORECASE)
+_NAME_COLUMNS = ("candidate", "name")
+_SCORE_COLUMNS = ("score", "rating", "match")
+_RANK_COLUMNS = ("rank", "#")
+
+
+def _cells(line):
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def _is_separator(cells):
+    cells = [cell for cell in cells if cell]
+    return bool(cells) and all(re.fullmatch(r":?-{2,}:?", cell.replace(" ", "")) for cell in cells)
+
+
+def parse_score(text):
+    """Normalise '85', '85%', '8.5/10', '4/5' or '7 out of 10' to 0-100; None if there is no number
+
+    Bare numbers are taken as already on the 0-100 scale the agents are asked for.
+    """
+    text = text.replace(",", ".")
+    numbers = _NUMBER.findall(text)
+    if not numbers:
+        return None
+    value = float(numbers[0])
+    scale = _SCALE.search(text)
+    if scale and float(scale.group(1)) > 0:
+        return 100 * value / float(scale.group(1))
+    return value
+
+
+def _column(header, names):
+    for index, title in enumerate(header):
+        if any(name in title.lower() for name in names):
+            return index
+    return None
+
+
+def parse_rankings(text, source=None):
+    """Return the candidates in the first markdown table of ``text`` that has a candidate column"""
+    lines = text.splitlines()
+    for i, line in enumerate(lines[:-1]):
+        if "|" not in line or not _is_separator(_cells(lines[i + 1])):
+            continue
+        header = _cells(line)
+        name_column = _column(header, _NAME_COLUMNS)
+        if name_column is None:
+            continue
+        score_column = _column(header, _SCORE_COLUMNS)
+        skipped = {name_column, score_column, _column(header, _RANK_COLUMNS)}
+        candidates = []
+        for row in lines[i + 2:]:
+            if "|" not in row:
+                break
+            cells = _cells(row)
+            if len(cells) <= name_column or not cells[name_column]:
+                continue
+            name = re.sub(r"[*_`]", "", cells[name_column]).strip()
+            score = parse_score(cells[score_column]) if score_column is not None and score_column < len(cells) else None
+            notes = " ".join(cell for j, cell in enumerate(cells) if j not in skipped)
+            candidates.append(RankedCandidate(name, score, notes, source))
+        if candidates:
+            return candidates
+    return []
+
+
+def merge_rankings(rankings, top_k=10):
+    """Merge ranked lists into one top-K list; a candidate found in several lists keeps its best score"""
+    best = {}
+    for ranking in rankings:
+        for position, candidate in enumerate(ranking):
+            key = candidate.name.lower()
+            # Unscored rows rank below scored ones, in their original order
+            sort_key = (candidate.score if candidate.score is not None else -1, -position)
+            if key not in best or sort_key > best[key][0]:
+                best[key] = (sort_key, candidate)
+    ordered = sorted(best.values(), key=lambda item: item[0], reverse=True)
+    return [candidate for _, candidate in ordered[:top_k]]
+
+
+def format_rankings(candidates):
+    """Render candidates as a markdown table"""
+    lines = ["| Rank | Candidate | Score | Notes | Source |", "|---|---|---|---|---|"]
+    for rank, candidate in enumerate(candidates, 1):
+        score = f"{candidate.score:.0f}" if candidate.score is not None else "-"
+        lines.append(f"| {rank} | {candidate.name} | {score} | {candidate.notes} | {candidate.source or ''} |")
+    return "\n".join(lines)
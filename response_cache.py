@@ -0,0 +1,162 @@
+"""Cache of agent replies for repeated questions against unchanged data.
+
+A reply is keyed on the agent's definition (model, instructions and tools,
+but not the IDs of its vector stores), the content hash of the files in
+those vector stores, and the normalized prompt. So a changed instruction, a
+changed resume set or a different question each miss the cache, while the
+same job posting summary or screening question asked in the next run is
+answered locally, even if its vector stores were recreated meanwhile.
+Entries expire after ``RESPONSE_CACHE_TTL`` seconds and the least recently
+used ones are evicted beyond ``RESPONSE_CACHE_MAX_ENTRIES``. The ``memory``
+backend lasts for the process; ``sqlite`` keeps entries across restarts.
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+from collections import OrderedDict
+
+CACHE_BACKENDS = ("off", "memory", "sqlite")
+DEFAULT_CACHE_BACKEND = os.environ.get("RESPONSE_CACHE", "off")
+DEFAULT_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH", ".response_cache.sqlite")
+DEFAULT_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "86400"))
+DEFAULT_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+
+
+def normalize_prompt(prompt):
+    """Case, whitespace and punctuation-insensitive form of a prompt"""
+    return " ".join(re.sub(r"[^\w\s]", " ", prompt.lower()).split())
+
+
+def cache_key(agent_fingerprint, content_hash, prompt, scope=""):
+    """Key for one agent's reply to ``prompt`` over the given data; ``scope`` separates projects"""
+    payload = json.dumps([scope, agent_fingerprint, content_hash, normalize_prompt(prompt)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _MemoryStore:
+    def __init__(self):
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, value, created_at):
+        self._entries[key] = (value, created_at)
+        self._entries.move_to_end(key)
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+    def evict(self, max_entries):
+        evicted = 0
+        while len(self._entries) > max_entries:
+            self._entries.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def __len__(self):
+        return len(self._entries)
+
+    def close(self):
+        pass
+
+
+class _SQLiteStore:
+    def __init__(self, path):
+        # Only ever used from the event loop thread, but not necessarily the one that opened it
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+
+    def get(self, key):
+        row = self._db.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._db.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+        return row
+
+    def put(self, key, value, created_at):
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses (key, value, created_at, used_at) VALUES (?, ?, ?, ?)",
+            (key, value, created_at, created_at),
+        )
+
+    def delete(self, key):
+        self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def evict(self, max_entries):
+        cursor = self._db.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (max_entries,),
+        )
+        return cursor.rowcount
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+
+class ResponseCache:
+    """TTL and LRU-bounded map from cache keys to reply texts, with hit statistics"""
+
+    def __init__(self, backend="memory", path=DEFAULT_CACHE_PATH, ttl=DEFAULT_CACHE_TTL,
+                 max_entries=DEFAULT_CACHE_MAX_ENTRIES):
+        if backend not in CACHE_BACKENDS or backend == "off":
+            raise ValueError(f"Unknown response cache backend {backend!r}")
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._store = _SQLiteStore(path) if backend == "sqlite" else _MemoryStore()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls, backend=DEFAULT_CACHE_BACKEND):
+        """The configured cache, or None when caching is off"""
+        return None if backend == "off" else cls(backend)
+
+    def get(self, key):
+        """The cached reply for ``key``, or None"""
+        entry = self._store.get(key)
+        if entry is not None and self.ttl and time.time() - entry[1] > self.ttl:
+            self._store.delete(key)
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value):
+        self._store.put(key, value, time.time())
+        self.evictions += self._store.evict(self.max_entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "entries": len(self._store),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        self._store.close()
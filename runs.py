@@ -0,0 +1,112 @@
+"""Run many screening workflows concurrently, each with its own ID, log and stats."""
+import os
+import uuid
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+
+from scheduler import request_priority
+
+DEFAULT_MAX_CONCURRENT_RUNS = int(os.environ.get("MAX_CONCURRENT_RUNS", "4"))
+# Finished runs kept in memory for /api/runs/<id>/...; the oldest are evicted first
+DEFAULT_MAX_RETAINED_RUNS = int(os.environ.get("MAX_RETAINED_RUNS", "50"))
+
+FINISHED_STATUSES = ("completed", "error", "cancelled")
+
+
+class Run:
+    def __init__(self, run_id, workflow, priority="interactive"):
+        self.id = run_id
+        self.workflow = workflow
+        self.priority = priority
+        self.task = None
+        self.created_at = datetime.now()
+
+    @property
+    def status(self):
+        return self.workflow.status
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    def summary(self):
+        return {
+            "run_id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "created_at": self.created_at.isoformat(),
+            "messages": len(self.workflow.messages),
+        }
+
+
+class RunManager:
+    def __init__(self, workflow_factory, max_concurrent=DEFAULT_MAX_CONCURRENT_RUNS,
+                 max_retained=DEFAULT_MAX_RETAINED_RUNS):
+        """``workflow_factory(run_id)`` returns a new AgentWorkflow-like object for each run."""
+        self.workflow_factory = workflow_factory
+        self.max_concurrent = max_concurrent
+        self.max_retained = max_retained
+        self.runs = OrderedDict()
+        self._slots = asyncio.Semaphore(max_concurrent)
+
+    @property
+    def latest(self):
+        return next(reversed(self.runs.values()), None)
+
+    @property
+    def running(self):
+        return [run for run in self.runs.values() if run.status == "running"]
+
+    @property
+    def queued(self):
+        return [run for run in self.runs.values() if run.status == "queued"]
+
+    def get(self, run_id):
+        return self.runs.get(run_id)
+
+    def start(self, priority="interactive"):
+        """Create a run and schedule it; it waits in the queue if all slots are busy.
+
+        ``priority`` ("interactive" or "batch") orders its agent service requests against other runs'.
+        """
+        run_id = uuid.uuid4().hex[:12]
+        run = Run(run_id, self.workflow_factory(run_id), priority)
+        run.workflow.status = "queued"
+        self.runs[run_id] = run
+        run.task = asyncio.create_task(self._execute(run))
+        self._evict_finished()
+        return run
+
+    async def _execute(self, run):
+        # The task has its own context, so this only applies to this run
+        request_priority.set(run.priority)
+        try:
+            async with self._slots:
+                await run.workflow.run_workflow()
+        except asyncio.CancelledError:
+            run.workflow.status = "cancelled"
+            run.workflow.add_message("system", "Workflow cancelled.")
+        finally:
+            # Release the transcript file handle; finished runs are read back on demand
+            run.workflow.messages.close()
+
+    def cancel(self, run_id):
+        """Cancel a queued or running run; returns False if it already finished"""
+        run = self.runs.get(run_id)
+        if run is None or run.finished:
+            return False
+        run.task.cancel()
+        return True
+
+    async def shutdown(self):
+        """Cancel every unfinished run and wait for them to stop"""
+        tasks = [run.task for run in self.runs.values() if run.task and not run.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _evict_finished(self):
+        finished = [run_id for run_id, run in self.runs.items() if run.finished]
+        for run_id in finished[:max(0, len(self.runs) - self.max_retained)]:
+            del self.runs[run_id]
@@ -0,0 +1,362 @@
+"""One scheduler for every request to the agent service: rate limits, Retry-After, adaptive concurrency and priorities.
+
+Requests fall into operation classes (file uploads, vector store
+operations, agent management, thread and message writes, runs, reads),
+each with its own concurrency limit and optional token bucket. By default
+neither limits anything until the service pushes back: client-side rates
+are opt-in (``AGENT_RATE_LIMITS``) and concurrency is unbounded. A request
+waits until its class has a free slot (and a token, if it has a rate);
+waiting requests are served interactive before batch, then oldest first. A
+429 response pauses its class for the ``Retry-After`` the service asked for
+and empties its bucket, so the waiting requests do not all retry at once,
+halves the class's concurrency (once per burst of throttled requests) and
+requeues the request. Successes under load raise the limit by about one per
+window of requests (AIMD). Throughput settles just under the service limit
+instead of alternating between bursts and retry storms.
+
+For Azure the scheduler sits in the HTTP pipeline of the project client
+(``pipeline_options``), so it also covers requests the SDK makes on its own,
+such as the polls of ``create_and_poll``. The fake backend sends its
+simulated round trips through it.
+"""
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+import contextlib
+import contextvars
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from azure.core.pipeline.policies import AsyncHTTPPolicy, AsyncRetryPolicy
+
+OPERATION_CLASSES = ("upload", "vector_store", "agent", "thread", "run", "read")
+# Requests per second by operation class as class:rate pairs, e.g. "upload:20,run:30"; a bucket
+# holds one second's worth. Classes that are not listed are only limited by their concurrency.
+DEFAULT_RATE_LIMITS = os.environ.get("AGENT_RATE_LIMITS", "")
+# 0 = no upper bound
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("AGENT_MAX_CONCURRENCY", "0"))
+# 0 = start at the upper bound, so only 429s lower the limit
+DEFAULT_INITIAL_CONCURRENCY = int(os.environ.get("AGENT_INITIAL_CONCURRENCY", "0"))
+# Times a throttled request is requeued before its 429 is passed on
+DEFAULT_THROTTLE_RETRIES = int(os.environ.get("THROTTLE_RETRIES", "8"))
+# Pause after a 429 that has no Retry-After header
+DEFAULT_RETRY_AFTER = float(os.environ.get("THROTTLE_DEFAULT_RETRY_AFTER", "1"))
+DECREASE_FACTOR = 0.5
+
+PRIORITIES = ("interactive", "batch")
+# Priority of the requests made in the current context; tasks inherit it from the code that creates them
+request_priority = contextvars.ContextVar("request_priority", default="interactive")
+
+
+@contextlib.contextmanager
+def priority(name):
+    """Send the requests made inside the block with priority ``name``"""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority {name!r}, expected one of {PRIORITIES}")
+    token = request_priority.set(name)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+def parse_rate_limits(spec):
+    """``{class: requests per second}`` from a ``class:rate,class:rate`` spec"""
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = entry.partition(":")
+        if name not in OPERATION_CLASSES:
+            raise ValueError(f"Invalid rate limit {entry!r}, expected class:rate with class one of {OPERATION_CLASSES}")
+        limits[name] = float(rate)
+    return limits
+
+
+def request_class(method, url):
+    """Operation class of an HTTP request to the agent service"""
+    path = urlparse(url).path
+    if method.upper() == "GET":
+        return "read"
+    if "/vector_stores" in path:
+        return "vector_store"
+    if "/files" in path:
+        return "upload"
+    if "/assistants" in path:
+        return "agent"
+    if "/runs" in path:
+        return "run"
+    return "thread"
+
+
+class Throttled(Exception):
+    """A 429 response, raised inside the scheduler so that it can requeue the request"""
+
+    def __init__(self, retry_after=None, response=None, replayable=True):
+        super().__init__(f"Throttled, retry after {retry_after}s")
+        self.retry_after = retry_after
+        self.response = response
+        # False if the request cannot be sent again, e.g. its body stream cannot be rewound
+        self.replayable = replayable
+
+
+def retry_after(headers):
+    """Seconds from a ``Retry-After`` (seconds or HTTP date) or ``retry-after-ms`` header, or None"""
+    headers = {name.lower(): value for name, value in (headers or {}).items()}
+    for name, scale in (("retry-after-ms", 0.001), ("x-ms-retry-after-ms", 0.001), ("retry-after", 1)):
+        value = headers.get(name)
+        if not value:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            try:
+                return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def throttle_delay(error, default=DEFAULT_RETRY_AFTER):
+    """Seconds to wait before retrying if ``error`` is a 429, otherwise None"""
+    if isinstance(error, Throttled):
+        delay = error.retry_after
+    elif getattr(error, "status_code", None) == 429:
+        delay = retry_after(getattr(getattr(error, "response", None), "headers", None))
+    else:
+        return None
+    return default if delay is None else delay
+
+
+class _Lane:
+    """Token bucket, AIMD concurrency limit and wait queue of one operation class"""
+
+    def __init__(self, rate, initial_concurrency, now):
+        self.rate = rate
+        self.capacity = max(1.0, rate) if rate else 0.0
+        self.tokens = self.capacity
+        self.refilled = now
+        self.limit = float(initial_concurrency)  # inf = unbounded
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.decreased_at = 0.0
+        self.waiting = []  # heap of (priority, seq, enqueued, future)
+        self.timer = None
+        self.counters = Counter()
+
+    def refill(self, now):
+        if self.rate and now > self.refilled:
+            self.tokens = min(self.capacity, self.tokens + (now - self.refilled) * self.rate)
+            self.refilled = now
+
+
+class RequestScheduler:
+    """Admits requests to the agent service by operation class; see the module docstring.
+
+    ``run(operation, send)`` waits for admission, awaits ``send()`` and
+    requeues it while it is throttled, at most ``retries`` times.
+    """
+
+    def __init__(self, rate_limits=DEFAULT_RATE_LIMITS, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 initial_concurrency=DEFAULT_INITIAL_CONCURRENCY, retries=DEFAULT_THROTTLE_RETRIES,
+                 default_retry_after=DEFAULT_RETRY_AFTER, clock=time.monotonic):
+        self.rate_limits = parse_rate_limits(rate_limits) if isinstance(rate_limits, str) else dict(rate_limits)
+        self.max_concurrency = max_concurrency if max_concurrency > 0 else math.inf
+        self.initial_concurrency = min(initial_concurrency, self.max_concurrency) if initial_concurrency > 0 \
+            else self.max_concurrency
+        self.retries = retries
+        self.default_retry_after = default_retry_after
+        self.clock = clock
+        self.lanes = {}
+        self._seq = itertools.count()
+
+    def lane(self, operation):
+        lane = self.lanes.get(operation)
+        if lane is None:
+            lane = self.lanes[operation] = _Lane(self.rate_limits.get(operation), self.initial_concurrency, self.clock())
+        return lane
+
+    async def run(self, operation, send):
+        lane = self.lane(operation)
+        rank = PRIORITIES.index(request_priority.get())
+        # Requeued requests keep their place in line
+        seq = next(self._seq)
+        lane.counters["requests"] += 1
+        attempt = 0
+        while True:
+            await self._acquire(lane, rank, seq)
+            started = self.clock()
+            try:
+                result = await send()
+            except Exception as e:
+                delay = throttle_delay(e, self.default_retry_after)
+                if delay is None:
+                    self._release(lane)
+                    raise
+                self._throttled(lane, started, delay)
+                self._release(lane)
+                attempt += 1
+                if attempt > self.retries or not getattr(e, "replayable", True):
+                    lane.counters["gave_up"] += 1
+                    raise
+                lane.counters["retries"] += 1
+                continue
+            except BaseException:
+                self._release(lane)
+                raise
+            self._succeeded(lane)
+            self._release(lane)
+            return result
+
+    async def _acquire(self, lane, rank, seq):
+        enqueued = self.clock()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(lane.waiting, (rank, seq, enqueued, future))
+        self._pump(lane)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as the caller was cancelled
+                self._release(lane)
+            raise
+        lane.counters[f"{PRIORITIES[rank]}_admitted"] += 1
+        lane.counters[f"{PRIORITIES[rank]}_wait_ms"] += round((self.clock() - enqueued) * 1000)
+
+    def _release(self, lane):
+        lane.in_flight -= 1
+        self._pump(lane)
+
+    def _succeeded(self, lane):
+        # Only grow while the limit is what holds requests back
+        if lane.waiting or lane.in_flight >= lane.limit:
+            lane.limit = min(self.max_concurrency, lane.limit + 1 / lane.limit)
+
+    def _throttled(self, lane, started, delay):
+        now = self.clock()
+        lane.counters["throttled"] += 1
+        lane.paused_until = max(lane.paused_until, now + delay)
+        # Start from an empty bucket when the pause ends instead of a burst
+        lane.tokens = 0.0
+        lane.refilled = max(lane.refilled, lane.paused_until)
+        # Requests sent before the last decrease were part of the same burst
+        if started >= lane.decreased_at:
+            # An unbounded lane starts from the concurrency the service just refused
+            current = lane.in_flight if lane.limit == math.inf else lane.limit
+            lane.limit = max(1.0, current * DECREASE_FACTOR)
+            lane.decreased_at = now
+            lane.counters["decreases"] += 1
+
+    def _pump(self, lane):
+        """Admit waiting requests while the lane has capacity; otherwise wake up when it will"""
+        now = self.clock()
+        lane.refill(now)
+        wake_at = None
+        while lane.waiting:
+            future = lane.waiting[0][3]
+            if future.done():
+                heapq.heappop(lane.waiting)
+                continue
+            if lane.in_flight + 1 > lane.limit:
+                break
+            if now < lane.paused_until:
+                wake_at = lane.paused_until
+                break
+            if lane.rate and lane.tokens < 1:
+                wake_at = now + (1 - lane.tokens) / lane.rate
+                break
+            heapq.heappop(lane.waiting)
+            if lane.rate:
+                lane.tokens -= 1
+            lane.in_flight += 1
+            future.set_result(None)
+        if wake_at is not None and lane.timer is None:
+            def wake():
+                lane.timer = None
+                self._pump(lane)
+
+            lane.timer = asyncio.get_running_loop().call_later(max(0.0, wake_at - now), wake)
+
+    def stats(self):
+        """Concurrency limits, queue lengths, throttles, retries and waiting times by operation class"""
+        return {
+            name: {
+                "limit": round(lane.limit, 2) if lane.limit != math.inf else None,
+                "in_flight": lane.in_flight,
+                "waiting": sum(not entry[3].done() for entry in lane.waiting),
+                "rate": lane.rate,
+                **lane.counters,
+            }
+            for name, lane in self.lanes.items()
+        }
+
+
+def _stream_positions(http_request):
+    """``[(stream, position)]`` of the body and file streams of a request, or None if one cannot report its position"""
+    streams = [http_request.body] if hasattr(http_request.body, "read") else []
+    for value in (getattr(http_request, "files", None) or {}).values():
+        stream = value[1] if isinstance(value, (tuple, list)) else value
+        if hasattr(stream, "read"):
+            streams.append(stream)
+    try:
+        return [(stream, stream.tell()) for stream in streams]
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _rewind(positions):
+    """Seek the streams back to where the first attempt started; False if they cannot be"""
+    if positions is None:
+        return False
+    try:
+        for stream, position in positions:
+            stream.seek(position)
+    except (AttributeError, OSError, ValueError):
+        return False
+    return True
+
+
+class SchedulingPolicy(AsyncHTTPPolicy):
+    """Sends every request of an Azure SDK client through a ``RequestScheduler``.
+
+    As with azure-core's retry policy, a throttled request is only sent again
+    once its body and file streams are back where the first attempt read them
+    from; a request whose streams cannot be rewound gets its 429.
+    """
+
+    def __init__(self, scheduler):
+        super().__init__()
+        self.scheduler = scheduler
+
+    async def send(self, request):
+        operation = request_class(request.http_request.method, request.http_request.url)
+        positions = _stream_positions(request.http_request)
+
+        async def attempt():
+            response = await self.next.send(request)
+            if response.http_response.status_code == 429:
+                raise Throttled(retry_after(response.http_response.headers), response, _rewind(positions))
+            return response
+
+        try:
+            return await self.scheduler.run(operation, attempt)
+        except Throttled as e:
+            # Out of retries: the client raises its usual HttpResponseError for the 429
+            return e.response
+
+
+class ThrottleRetryPolicy(AsyncRetryPolicy):
+    """azure-core's retry policy, except that 429 responses are left to the scheduler"""
+
+    def is_retry(self, settings, response):
+        if response.http_response.status_code == 429:
+            return False
+        return super().is_retry(settings, response)
+
+
+def pipeline_options(scheduler):
+    """Keyword arguments for ``AIProjectClient`` that route its agent requests through ``scheduler``"""
+    return {"per_call_policies": [SchedulingPolicy(scheduler)], "retry_policy": ThrottleRetryPolicy()}
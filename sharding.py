@@ -0,0 +1,50 @@
+"""Partition resumes across several vector stores and screening agents.
+
+With ``RESUME_SHARDS`` above 1, each shard gets its own resumes vector store
+and ``CandidateScreening_agent_<n>``. The recruiter then calls a local
+``screen_candidates`` function (see ``connected.py``), which queries every shard in
+parallel and merges their rankings. Retrieval cost and store size therefore
+depend on the shard size, not on the size of the whole candidate pool.
+"""
+import os
+from collections import defaultdict
+
+SHARD_STRATEGIES = ("round_robin", "by_role")
+DEFAULT_RESUME_SHARDS = int(os.environ.get("RESUME_SHARDS", "1"))
+DEFAULT_SHARD_STRATEGY = os.environ.get("SHARD_STRATEGY", "round_robin")
+
+
+def role_from_filename(path):
+    """'Resume_DevOps_Engineer_Alexander_Kumar.pdf' -> 'DevOps_Engineer'"""
+    parts = os.path.splitext(os.path.basename(path))[0].split("_")
+    if parts and parts[0].lower() == "resume":
+        parts = parts[1:]
+    # The last two parts are the candidate's first and last name
+    return "_".join(parts[:-2]) or "unknown"
+
+
+def partition(paths, shards=DEFAULT_RESUME_SHARDS, strategy=DEFAULT_SHARD_STRATEGY):
+    """Split ``paths`` into at most ``shards`` non-empty lists (one empty list if there are no paths).
+
+    round_robin deals files out in order. by_role keeps all resumes for one
+    role in the same shard and balances shard sizes, largest role first.
+    """
+    if strategy not in SHARD_STRATEGIES:
+        raise ValueError(f"Unknown shard strategy {strategy!r}, expected one of {SHARD_STRATEGIES}")
+    shards = max(1, min(shards, len(paths) or 1))
+    buckets = [[] for _ in range(shards)]
+    if strategy == "round_robin":
+        for i, path in enumerate(paths):
+            buckets[i % shards].append(path)
+    else:
+        by_role = defaultdict(list)
+        for path in paths:
+            by_role[role_from_filename(path)].append(path)
+        for role in sorted(by_role, key=lambda role: (-len(by_role[role]), role)):
+            min(buckets, key=len).extend(by_role[role])
+    return [bucket for bucket in buckets if bucket] or [[]]
+
+
+def shard_name(base, index, count):
+    """Step/agent name for shard ``index``; unsharded runs keep the original name"""
+    return base if count == 1 else f"{base}_{index + 1}"
@@ -0,0 +1,173 @@
+"""Prometheus metrics and OpenTelemetry traces for screening runs.
+
+Each run is one trace. Its root span ``screening_run`` has a child span for
+every provisioning step (uploads, vector stores, agents), every group chat
+round, and every tool call an agent made during a round. Connected-agent and
+file-search calls are reconstructed from run-step timestamps. Span durations
+also feed the ``screening_phase_duration_seconds`` histogram, so a slow
+stage shows up in both places. The histogram is labelled by phase only;
+step, agent and tool names vary per posting and shard and stay on the spans.
+
+Traces are exported according to ``TRACE_EXPORTER``:
+- ``none`` (the default) keeps spans in-process only.
+- ``file`` appends one JSON span per line to ``TRACE_FILE``.
+- ``otlp`` sends spans to the collector at ``OTEL_EXPORTER_OTLP_ENDPOINT``. This needs the
+  ``opentelemetry-exporter-otlp-proto-http`` package.
+"""
+import os
+import time
+import json
+
+from prometheus_client import Counter, Gauge, Histogram
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.trace import Status, StatusCode
+
+TRACE_EXPORTERS = ("none", "file", "otlp")
+DEFAULT_TRACE_EXPORTER = os.environ.get("TRACE_EXPORTER", "none")
+DEFAULT_TRACE_FILE = os.environ.get("TRACE_FILE", "traces.jsonl")
+
+RUNS_QUEUED = Gauge("screening_runs_queued", "Runs waiting for a free run slot")
+RUNS_IN_FLIGHT = Gauge("screening_runs_in_flight", "Runs currently executing")
+SSE_SUBSCRIBERS = Gauge("screening_sse_subscribers", "Open server-sent event streams across all runs")
+RUNS_FINISHED = Counter("screening_runs_finished", "Finished runs by final status", ["status"])
+CHATS_TERMINATED = Counter("screening_chats_terminated", "Finished group chats by termination reason", ["reason"])
+PHASE_SECONDS = Histogram(
+    "screening_phase_duration_seconds",
+    "Duration of pipeline phases: prerank, upload, vector_store, agent, round, tool_call and run",
+    ["phase"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160, 320, 640),
+)
+
+tracer = trace.get_tracer("connected_agents")
+_configured = False
+
+
+def configure_tracing(exporter=DEFAULT_TRACE_EXPORTER, path=DEFAULT_TRACE_FILE):
+    """Install the global tracer provider once; later calls are no-ops"""
+    global _configured
+    if _configured:
+        return
+    if exporter not in TRACE_EXPORTERS:
+        raise ValueError(f"Unknown trace exporter {exporter!r}, expected one of {TRACE_EXPORTERS}")
+    provider = TracerProvider(resource=Resource.create({"service.name": "connected-agents"}))
+    if exporter == "file":
+        trace_file = open(path, "a", encoding="utf-8")
+        span_exporter = ConsoleSpanExporter(
+            out=trace_file,
+            formatter=lambda span: json.dumps(json.loads(span.to_json())) + "\n",
+        )
+        provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    elif exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _configured = True
+
+
+def step_phase(step_name):
+    """Map a provisioning step name to its phase label"""
+    if step_name.endswith("_file") or step_name.endswith("_files"):
+        return "upload"
+    if "_vector_store" in step_name:
+        return "vector_store"
+    if step_name.endswith("_prerank"):
+        return "prerank"
+    return "agent"
+
+
+def _ns(moment):
+    return int(moment.timestamp() * 1e9)
+
+
+class RunTelemetry:
+    """Spans and phase metrics for one run; every span belongs to the run's trace"""
+
+    def __init__(self, run_id=None):
+        self.run_id = run_id
+        self._root = None
+        self._context = None
+        self._steps = {}
+        self._rounds = {}
+        self._round_contexts = {}
+        self._round_started = {}
+        self._round = 0
+        self._started = None
+
+    def start(self):
+        # Durations are timed here: spans without a configured SDK provider record no times
+        self._started = time.perf_counter()
+        self._root = tracer.start_span("screening_run", attributes={"run.id": self.run_id or ""})
+        self._context = trace.set_span_in_context(self._root)
+
+    def finish(self, status):
+        """End the run span and any span left open by a failure or cancellation"""
+        for span in [*self._steps.values(), *self._rounds.values()]:
+            span.set_status(Status(StatusCode.ERROR, status))
+            span.end()
+        self._steps.clear()
+        self._rounds.clear()
+        RUNS_FINISHED.labels(status).inc()
+        if self._root is not None:
+            self._root.set_attribute("run.status", status)
+            if status != "completed":
+                self._root.set_status(Status(StatusCode.ERROR, status))
+            self._root.end()
+            PHASE_SECONDS.labels("run").observe(time.perf_counter() - self._started)
+            self._root = None
+
+    def chat_terminated(self, reason):
+        """The group chat manager ended the chat for ``reason``"""
+        CHATS_TERMINATED.labels(reason).inc()
+        if self._root is not None:
+            self._root.set_attribute("chat.termination_reason", reason)
+            self._root.set_attribute("chat.rounds", self._round)
+
+    def provisioning_step(self, name, event, elapsed):
+        """``ProvisioningGraph`` ``on_step`` callback"""
+        phase = step_phase(name)
+        if event == "start":
+            self._steps[name] = tracer.start_span(
+                f"provision {name}", context=self._context, attributes={"phase": phase, "step": name}
+            )
+            return
+        span = self._steps.pop(name, None)
+        if span is None:
+            return
+        if event == "failed":
+            span.set_status(Status(StatusCode.ERROR))
+        span.end()
+        PHASE_SECONDS.labels(phase).observe(elapsed)
+
+    def turn_started(self, agent_name):
+        self._round += 1
+        self._round_started[agent_name] = time.perf_counter()
+        self._rounds[agent_name] = tracer.start_span(
+            f"round {self._round} {agent_name}",
+            context=self._context,
+            attributes={"phase": "round", "agent.name": agent_name, "round": self._round},
+        )
+
+    def turn_finished(self, message):
+        agent_name = message.name or str(message.role)
+        span = self._rounds.pop(agent_name, None)
+        if span is None:
+            return
+        span.set_attribute("content.length", len(str(message.content)))
+        span.end()
+        PHASE_SECONDS.labels("round").observe(time.perf_counter() - self._round_started.pop(agent_name))
+        # Tool calls are only known once the round's run steps have been fetched
+        self._round_contexts[agent_name] = trace.set_span_in_context(span)
+
+    def tool_call(self, agent_name, tool, started_at, completed_at):
+        """``AgentStatsCollector`` ``on_tool_call`` callback; times come from service run steps"""
+        span = tracer.start_span(
+            f"tool_call {tool}",
+            context=self._round_contexts.get(agent_name, self._context),
+            attributes={"phase": "tool_call", "agent.name": agent_name, "tool": tool},
+            start_time=_ns(started_at),
+        )
+        span.end(end_time=_ns(completed_at))
+        PHASE_SECONDS.labels("tool_call").observe((completed_at - started_at).total_seconds())
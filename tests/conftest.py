@@ -0,0 +1,15 @@
+import os
+import sys
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from fake_backend import FakeProjectClient
+
+
+@pytest.fixture
+def fake_client():
+    """A fake project client with instant service calls and agent turns"""
+    return FakeProjectClient(latency="0", agent_latency="0", seed=1)
@@ -0,0 +1,73 @@
+import asyncio
+
+from agent_registry import AgentRegistry, fingerprint_definition
+
+
+def create(registry, instructions="Screen resumes."):
+    return registry.get_or_create(model="fake-model", name="screener", instructions=instructions)
+
+
+def test_identical_definition_is_reused(fake_client):
+    async def scenario():
+        first = await create(AgentRegistry(fake_client))
+        # A new registry finds the agent through its fingerprint metadata
+        registry = AgentRegistry(fake_client)
+        second = await create(registry)
+        changed = await create(registry, "Screen resumes carefully.")
+        return first, second, changed, registry
+
+    first, second, changed, registry = asyncio.run(scenario())
+
+    assert second.id == first.id
+    assert changed.id != first.id
+    assert registry.reused == [first.id] and registry.created == [changed.id]
+
+
+def test_fingerprint_covers_the_definition():
+    base = fingerprint_definition("model", "agent", "Do it.", 0.1)
+    assert base == fingerprint_definition("model", "agent", "Do it.", 0.1)
+    assert base != fingerprint_definition("model", "agent", "Do it.", 0.2)
+    assert base != fingerprint_definition("other", "agent", "Do it.", 0.1)
+
+
+def test_concurrent_sessions_create_a_definition_once(fake_client):
+    registry = AgentRegistry(fake_client)
+
+    async def scenario():
+        return await asyncio.gather(*(create(registry.session()) for _ in range(3)))
+
+    agents = asyncio.run(scenario())
+
+    assert len({agent.id for agent in agents}) == 1
+    assert fake_client.agents.calls["create_agent"] == 1
+
+
+def test_rollback_spares_agents_other_sessions_use(fake_client):
+    registry = AgentRegistry(fake_client)
+    first, second = registry.session(), registry.session()
+
+    async def scenario():
+        agent = await create(first)
+        await create(second)
+        await first.delete_if_created(agent)
+        return agent
+
+    agent = asyncio.run(scenario())
+
+    assert agent.id in fake_client.agents._agents
+    assert agent.id in registry.in_use
+
+
+def test_garbage_collection_spares_agents_of_every_session(fake_client):
+    registry = AgentRegistry(fake_client)
+
+    async def scenario():
+        used = await create(registry.session())
+        unused = await create(AgentRegistry(fake_client), "An older definition.")
+        deleted = await registry.session().collect_garbage(policy="all")
+        return used, unused, deleted
+
+    used, unused, deleted = asyncio.run(scenario())
+
+    assert deleted == [unused.id]
+    assert used.id in fake_client.agents._agents
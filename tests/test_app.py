@@ -0,0 +1,47 @@
+import asyncio
+import os
+
+import app as server
+import create_data
+from clients import FAKE_ENDPOINT, ProjectClientPool
+from file_cache import FileManifest
+
+
+def test_a_failed_run_stops_its_agent_cleanup(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    create_data.create_job_posting()
+    create_data.generate_resumes(2, "resumes", seed=1, workers=1)
+    cleanup = {}
+
+    async def slow_cleanup(self, registry):
+        cleanup["started"] = True
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cleanup["cancelled"] = True
+            raise
+
+    async def failing_chat(self, task, runtime, **kwargs):
+        await asyncio.sleep(0)
+        raise RuntimeError("chat failed")
+
+    monkeypatch.setattr(server.AgentWorkflow, "collect_orphaned_agents", slow_cleanup)
+    monkeypatch.setattr(server.GroupChatOrchestration, "invoke", failing_chat)
+    monkeypatch.setattr(server, "response_cache", None)
+
+    async def scenario():
+        pool = ProjectClientPool(backend="fake")
+        await pool.get_client()
+        pool.manifest = FileManifest(FAKE_ENDPOINT, path=os.path.join(tmp_path, "agent_cache.json"))
+        workflow = server.AgentWorkflow("run-1", pool=pool)
+        try:
+            await asyncio.wait_for(workflow.run_workflow(), 5)
+            # Not left to be cancelled when the event loop closes
+            return workflow, dict(cleanup)
+        finally:
+            await pool.close()
+
+    workflow, cleanup_when_finished = asyncio.run(scenario())
+
+    assert workflow.status == "error"
+    assert cleanup_when_finished == {"started": True, "cancelled": True}
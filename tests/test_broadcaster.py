@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+
+from broadcaster import HEARTBEAT, Broadcaster, format_sse
+
+
+def sequence_numbers(subscriber):
+    return [entry[0] for entry in subscriber.buffer if entry is not HEARTBEAT]
+
+
+async def read_frames(broadcaster, last_event_id, count):
+    frames = []
+    stream = broadcaster.stream(last_event_id)
+    async for frame in stream:
+        frames.append(frame)
+        if len(frames) == count:
+            break
+    await stream.aclose()
+    return frames
+
+
+def test_format_sse():
+    assert format_sse(3, '{"a": 1}', "message.delta") == 'id: 3\nevent: message.delta\ndata: {"a": 1}\n\n'
+    assert format_sse(4, "{}") == "id: 4\ndata: {}\n\n"
+
+
+def test_reconnect_replays_retained_events_after_last_event_id():
+    async def scenario():
+        broadcaster = Broadcaster(heartbeat_interval=0)
+        for i in range(5):
+            broadcaster.publish({"content": f"message {i}"})
+        # Streaming deltas reach live subscribers only
+        broadcaster.publish({"delta": "tok"}, event="message.delta", retain=False)
+        broadcaster.publish({"content": "message 5"})
+        return broadcaster, broadcaster.subscribe(last_event_id=3), broadcaster.subscribe()
+
+    broadcaster, resumed, fresh = asyncio.run(scenario())
+
+    assert broadcaster.seq == 7
+    assert sequence_numbers(resumed) == [4, 5, 7]
+    assert resumed.dropped == 0
+    assert sequence_numbers(fresh) == []
+
+
+def test_replay_older_than_the_history_reports_the_gap():
+    async def scenario():
+        broadcaster = Broadcaster(history_size=5, buffer_size=3, heartbeat_interval=0)
+        for i in range(10):
+            broadcaster.publish({"i": i})
+        return broadcaster.subscribe(last_event_id=2)
+
+    subscriber = asyncio.run(scenario())
+
+    # Events 3-5 left the history and 6-7 do not fit the buffer
+    assert sequence_numbers(subscriber) == [8, 9, 10]
+    assert subscriber.dropped == 5
+
+
+def test_stream_resumes_with_sse_frames():
+    async def scenario():
+        broadcaster = Broadcaster(heartbeat_interval=0)
+        for i in range(3):
+            broadcaster.publish({"i": i})
+        reader = asyncio.ensure_future(read_frames(broadcaster, 1, 3))
+        await asyncio.sleep(0)
+        broadcaster.publish({"i": 3})
+        frames = await reader
+        return broadcaster, frames
+
+    broadcaster, frames = asyncio.run(scenario())
+
+    assert [frame.splitlines()[0] for frame in frames] == ["id: 2", "id: 3", "id: 4"]
+    assert json.loads(frames[-1].splitlines()[1][len("data: "):]) == {"i": 3, "seq": 4}
+    assert broadcaster.subscriber_count == 0
+
+
+@pytest.mark.parametrize("policy", ["drop_oldest", "disconnect"])
+def test_slow_consumers(policy):
+    async def scenario():
+        broadcaster = Broadcaster(buffer_size=2, heartbeat_interval=0, slow_consumer_policy=policy)
+        subscriber = broadcaster.subscribe()
+        for i in range(5):
+            broadcaster.publish({"i": i})
+        return broadcaster, subscriber
+
+    broadcaster, subscriber = asyncio.run(scenario())
+
+    if policy == "drop_oldest":
+        assert sequence_numbers(subscriber) == [4, 5] and subscriber.dropped == 3
+        assert broadcaster.subscriber_count == 1
+    else:
+        assert subscriber.closed and broadcaster.subscriber_count == 0
+        assert sequence_numbers(subscriber) == [1, 2]
+
+
+def test_dropped_events_are_announced_before_the_rest():
+    async def scenario():
+        broadcaster = Broadcaster(history_size=2, heartbeat_interval=0)
+        for i in range(4):
+            broadcaster.publish({"i": i})
+        return await read_frames(broadcaster, 0, 3)
+
+    frames = asyncio.run(scenario())
+
+    assert frames[0] == 'event: dropped\ndata: {"type": "dropped", "count": 2}\n\n'
+    assert [frame.splitlines()[0] for frame in frames[1:]] == ["id: 3", "id: 4"]
+
+
+def test_idle_subscribers_get_heartbeats():
+    async def scenario():
+        broadcaster = Broadcaster(heartbeat_interval=0.01)
+        return await read_frames(broadcaster, None, 2)
+
+    assert asyncio.run(scenario()) == [": heartbeat\n\n"] * 2
+
+
+def test_unknown_slow_consumer_policy():
+    with pytest.raises(ValueError):
+        Broadcaster(slow_consumer_policy="block")
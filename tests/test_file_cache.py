@@ -0,0 +1,156 @@
+import asyncio
+
+from fake_backend import FakeProjectClient
+from file_cache import FileManifest, get_or_create_vector_store, upload_files_cached
+
+
+def write_files(tmp_path, count, prefix="resume"):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"{prefix}_{i}.pdf"
+        path.write_text(f"{prefix} {i}")
+        paths.append(str(path))
+    return paths
+
+
+def test_unchanged_files_are_reused_across_manifests(tmp_path, fake_client):
+    paths = write_files(tmp_path, 3)
+    manifest_path = str(tmp_path / "manifest.json")
+
+    first = asyncio.run(upload_files_cached(fake_client, paths, FileManifest("fake://test", manifest_path)))
+    second = asyncio.run(upload_files_cached(fake_client, paths, FileManifest("fake://test", manifest_path)))
+
+    assert [f.reused for f in first] == [False] * 3
+    assert [f.reused for f in second] == [True] * 3
+    assert [f.id for f in second] == [f.id for f in first]
+    assert fake_client.agents.files.uploads == 3
+
+
+def test_manifest_is_scoped_per_endpoint(tmp_path, fake_client):
+    paths = write_files(tmp_path, 2)
+    manifest_path = str(tmp_path / "manifest.json")
+    asyncio.run(upload_files_cached(fake_client, paths, FileManifest("fake://one", manifest_path)))
+
+    other = asyncio.run(upload_files_cached(fake_client, paths, FileManifest("fake://two", manifest_path)))
+
+    assert not any(f.reused for f in other)
+
+
+def test_changed_and_stale_files_are_uploaded_again(tmp_path, fake_client):
+    paths = write_files(tmp_path, 3)
+    manifest = FileManifest("fake://test", str(tmp_path / "manifest.json"))
+    first = asyncio.run(upload_files_cached(fake_client, paths, manifest))
+
+    # One file changes locally, another disappears remotely
+    with open(paths[0], "a") as f:
+        f.write(" updated")
+    asyncio.run(fake_client.agents.files.delete(first[1].id))
+    second = asyncio.run(upload_files_cached(fake_client, paths, manifest))
+
+    assert [f.reused for f in second] == [False, False, True]
+    assert second[0].id != first[0].id and second[1].id != first[1].id
+    assert fake_client.agents.files.uploads == 5
+
+
+def test_identical_contents_are_uploaded_once(tmp_path, fake_client):
+    paths = write_files(tmp_path, 2)
+    (tmp_path / "copy.pdf").write_text("resume 0")
+    paths.append(str(tmp_path / "copy.pdf"))
+
+    files = asyncio.run(upload_files_cached(fake_client, paths, FileManifest("fake://test", str(tmp_path / "m.json"))))
+
+    assert files[0].id == files[2].id
+    assert fake_client.agents.files.uploads == 2
+
+
+def test_vector_store_is_updated_incrementally(tmp_path, fake_client):
+    paths = write_files(tmp_path, 3)
+    manifest = FileManifest("fake://test", str(tmp_path / "manifest.json"))
+    files = asyncio.run(upload_files_cached(fake_client, paths, manifest))
+    agents = fake_client.agents
+
+    store = asyncio.run(get_or_create_vector_store(fake_client, manifest, "resumes", files[:2]))
+    again = asyncio.run(get_or_create_vector_store(fake_client, manifest, "resumes", files[1:]))
+
+    assert again.id == store.id
+    assert agents.vector_store(store.id).file_ids == [files[1].id, files[2].id]
+    assert agents.calls["vector_stores.create_and_poll"] == 1
+    assert agents.calls["vector_store_file_batches.create_and_poll"] == 1
+    assert agents.calls["vector_store_files.delete"] == 1
+
+
+def test_deleted_vector_store_is_recreated(tmp_path, fake_client):
+    paths = write_files(tmp_path, 2)
+    manifest = FileManifest("fake://test", str(tmp_path / "manifest.json"))
+    files = asyncio.run(upload_files_cached(fake_client, paths, manifest))
+    store = asyncio.run(get_or_create_vector_store(fake_client, manifest, "resumes", files))
+    asyncio.run(fake_client.agents.vector_stores.delete(store.id))
+
+    recreated = asyncio.run(get_or_create_vector_store(fake_client, manifest, "resumes", files))
+
+    assert recreated.id != store.id
+    assert manifest.vector_stores["resumes"]["id"] == recreated.id
+
+
+def test_concurrent_runs_upload_each_file_once(tmp_path):
+    # Uploads take long enough for the two runs to overlap
+    fake_client = FakeProjectClient(latency="fixed:0.01", agent_latency="0", seed=1)
+    paths = write_files(tmp_path, 6)
+    manifest = FileManifest("fake://test", str(tmp_path / "manifest.json"))
+
+    async def two_runs():
+        return await asyncio.gather(
+            upload_files_cached(fake_client, paths, manifest),
+            upload_files_cached(fake_client, list(reversed(paths)), manifest),
+        )
+
+    first, second = asyncio.run(two_runs())
+
+    assert fake_client.agents.files.uploads == 6
+    assert [f.id for f in first] == [f.id for f in reversed(second)]
+
+
+def test_concurrent_runs_do_not_detach_each_others_files(tmp_path, fake_client):
+    paths = write_files(tmp_path, 4)
+    manifest = FileManifest("fake://test", str(tmp_path / "manifest.json"))
+    agents = fake_client.agents
+
+    async def two_runs():
+        files = await upload_files_cached(fake_client, paths, manifest)
+        return files, await asyncio.gather(*(
+            get_or_create_vector_store(fake_client, manifest, "resumes", files) for _ in range(2)
+        ))
+
+    files, (first, second) = asyncio.run(two_runs())
+
+    assert first.id == second.id
+    assert agents.calls["vector_stores.create_and_poll"] == 1
+    assert agents.calls["vector_store_files.delete"] == 0
+    assert sorted(agents.vector_store(first.id).file_ids) == sorted(f.id for f in files)
+
+
+def test_invalidating_a_stale_id_keeps_a_newer_upload(tmp_path):
+    manifest = FileManifest("fake://test", str(tmp_path / "manifest.json"))
+    manifest.files["abc"] = {"file_id": "new-id"}
+
+    manifest.invalidate_file("abc", "old-id")
+    assert manifest.files["abc"]["file_id"] == "new-id"
+    manifest.invalidate_file("abc", "new-id")
+    assert "abc" not in manifest.files
+
+
+def test_a_new_process_does_not_reuse_ids_of_an_earlier_one(tmp_path):
+    paths = write_files(tmp_path, 3)
+    manifest_path = str(tmp_path / "manifest.json")
+    asyncio.run(upload_files_cached(FakeProjectClient(latency="0", seed=1), paths,
+                                    FileManifest("fake://test", manifest_path)))
+
+    # A later process with the same seed first uploads other files, then reads the persisted manifest
+    client = FakeProjectClient(latency="0", seed=1)
+    others = write_files(tmp_path, 3, prefix="job")
+    for path in others:
+        asyncio.run(client.agents.files.upload_and_poll(file_path=path))
+    files = asyncio.run(upload_files_cached(client, paths, FileManifest("fake://test", manifest_path)))
+
+    assert not any(f.reused for f in files)
+    assert [client.agents.files.files[f.id].filename for f in files] == [f"resume_{i}.pdf" for i in range(3)]
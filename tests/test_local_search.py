@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+
+from local_search import (SEARCH_TOOL_DEFINITIONS, BruteForceIndex, HashingEmbedder, IVFIndex, LocalSearch, SearchTool,
+                          TfidfEmbedder, embed_chunks)
+from text_index import TextIndex
+
+
+def read_texts(paths):
+    texts = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            texts.append(f.read())
+    return texts
+
+
+def write_documents(tmp_path, texts):
+    paths = []
+    for i, text in enumerate(texts):
+        path = tmp_path / f"doc_{i}.txt"
+        path.write_text(text, encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def clustered_vectors(n, dim, clusters, seed):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(clusters, size=n)] + 0.3 * rng.normal(size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_ivf_recall_against_brute_force():
+    vectors = clustered_vectors(5000, 32, 40, seed=0)
+    queries = clustered_vectors(50, 32, 40, seed=0)[:50]
+    exact, approximate = BruteForceIndex(vectors), IVFIndex(vectors, probes=8)
+
+    found = 0
+    for query in queries:
+        truth, truth_scores = exact.search(query, 10)
+        ids, scores = approximate.search(query, 10)
+        assert list(scores) == sorted(scores, reverse=True)
+        assert np.allclose(vectors[ids] @ query, scores)
+        found += len(set(truth.tolist()) & set(ids.tolist()))
+    assert found / (10 * len(queries)) >= 0.9
+    # Probing every list is exact
+    ids, _ = IVFIndex(vectors, probes=len(vectors)).search(queries[0], 10)
+    assert set(ids.tolist()) == set(exact.search(queries[0], 10)[0].tolist())
+
+
+def test_brute_force_returns_the_best_first():
+    vectors = np.eye(4, dtype=np.float32)
+    ids, scores = BruteForceIndex(vectors).search(np.array([0.1, 0.9, 0.5, 0], dtype=np.float32), 3)
+    assert ids.tolist() == [1, 2, 0] and np.allclose(scores, [0.9, 0.5, 0.1])
+
+
+def test_search_finds_the_relevant_document(tmp_path):
+    paths = write_documents(tmp_path, [
+        "Senior Python developer with Kubernetes and Azure experience.",
+        "Pastry chef specialised in sourdough bread and croissants.",
+        "Accountant with payroll, audit and tax filing experience.",
+    ])
+    index = TextIndex(str(tmp_path / "index"))
+    index.update(paths, extract=read_texts)
+
+    for embedder in (HashingEmbedder(), TfidfEmbedder()):
+        search = LocalSearch.build(index, paths, embedder)
+        assert search.search("kubernetes python developer", 1)[0].path == os.path.normpath(paths[0])
+        assert os.path.basename(paths[1]) in SearchTool(search, top_k=1).search_documents("sourdough bread")
+
+
+def test_search_tool_definition():
+    function = SEARCH_TOOL_DEFINITIONS[0].function
+    assert function.name == "search_documents"
+    assert function.parameters["required"] == ["query"]
+    assert set(function.parameters["properties"]) == {"query"}
+
+
+def test_cached_embeddings_of_unchanged_chunks_survive_an_update(tmp_path):
+    paths = write_documents(tmp_path, [f"document {i} about topic{i} " * 80 for i in range(3)])
+    index = TextIndex(str(tmp_path / "index"), chunk_size=200, chunk_overlap=40)
+    index.update(paths, extract=read_texts)
+    embedder = HashingEmbedder(dim=64)
+    before = {i: row for i, row in enumerate(np.array(embed_chunks(index, np.arange(index.num_chunks), embedder)))}
+    kept_text = {index.chunk(i): before[i] for i in index.document_chunks(paths[0])}
+
+    (tmp_path / "doc_1.txt").write_text("an entirely new text " * 40, encoding="utf-8")
+    index.update(paths, extract=read_texts)
+    complete, partial, missing = index.embeddings_paths(embedder.name)
+    assert not os.path.exists(complete) and os.path.exists(partial)
+    assert set(np.load(missing).tolist()) == set(index.document_chunks(paths[1]))
+
+    # Carried rows are not recomputed, so a marker left in them shows up in the result
+    rows = np.load(partial)
+    marked = index.document_chunks(paths[0]).start
+    rows[marked] = 0
+    np.save(partial, rows)
+    vectors = embed_chunks(index, np.arange(index.num_chunks), embedder)
+
+    assert os.path.exists(complete) and not os.path.exists(partial) and not os.path.exists(missing)
+    assert not vectors[marked].any()
+    fresh = embedder.embed([index.chunk(i) for i in range(index.num_chunks)])
+    for i in range(index.num_chunks):
+        if i != marked:
+            assert np.allclose(vectors[i], fresh[i])
+        if i in index.document_chunks(paths[0]) and i != marked:
+            assert np.allclose(vectors[i], kept_text[index.chunk(i)])
@@ -0,0 +1,76 @@
+import json
+
+from message_store import INDEX_STRIDE, MessageStore
+
+
+def message(seq):
+    return {"timestamp": f"t{seq}", "sender": "recruiter", "content": f"message {seq}", "agent_type": "agent", "seq": seq}
+
+
+def fill(store, count):
+    # Sequence numbers have gaps where streaming deltas were published
+    seqs = [2 * i + 1 for i in range(count)]
+    for seq in seqs:
+        store.append(message(seq))
+    return seqs
+
+
+def test_ring_buffer_keeps_the_most_recent_messages():
+    store = MessageStore(max_messages=5)
+    seqs = fill(store, 12)
+
+    assert len(store) == 12
+    assert [m["seq"] for m in store.recent()] == seqs[-5:]
+    # Without a transcript, paging from an evicted position starts at the oldest retained message
+    messages, has_more = store.page(since=0, limit=3)
+    assert [m["seq"] for m in messages] == seqs[-5:-2] and has_more
+    messages, has_more = store.page(since=seqs[-2], limit=3)
+    assert [m["seq"] for m in messages] == seqs[-1:] and not has_more
+
+
+def test_message_ids_round_trip():
+    store = MessageStore(max_messages=2)
+    store.append({**message(1), "message_id": "m1"})
+    store.append(message(2))
+
+    assert store.recent()[0]["message_id"] == "m1"
+    assert "message_id" not in store.recent()[1]
+
+
+def test_transcript_pages_back_beyond_the_ring_buffer(tmp_path):
+    store = MessageStore.for_run("run-1", transcript_dir=str(tmp_path), max_messages=10)
+    count = 3 * INDEX_STRIDE + 5
+    seqs = fill(store, count)
+
+    for since in (0, seqs[INDEX_STRIDE - 1], seqs[INDEX_STRIDE] + 1, seqs[-20]):
+        messages, has_more = store.page(since=since, limit=25)
+        expected = [seq for seq in seqs if seq > since]
+        assert [m["seq"] for m in messages] == expected[:25]
+        assert has_more == (len(expected) > 25)
+    assert store.page(since=seqs[1], limit=1)[0][0] == message(seqs[2])
+
+    store.close()
+    with open(tmp_path / "run-1.jsonl", encoding="utf-8") as f:
+        assert [json.loads(line)["seq"] for line in f] == seqs
+
+
+def test_appending_after_close_continues_the_transcript(tmp_path):
+    store = MessageStore.for_run("run-2", transcript_dir=str(tmp_path), max_messages=2)
+    store.append(message(1))
+    store.close()
+    store.append(message(2))
+    store.append(message(3))
+
+    messages, has_more = store.page(since=0, limit=10)
+    assert [m["seq"] for m in messages] == [1, 2, 3] and not has_more
+
+    # A new store for the same run starts a fresh transcript
+    again = MessageStore.for_run("run-2", transcript_dir=str(tmp_path), max_messages=1)
+    again.append(message(10))
+    again.append(message(11))
+    assert [m["seq"] for m in again.page(since=0)[0]] == [10, 11]
+
+
+def test_no_transcript_without_a_run_id_or_directory(tmp_path):
+    assert MessageStore.for_run(None, transcript_dir=str(tmp_path)).transcript_path is None
+    assert MessageStore.for_run("run-3", transcript_dir="").transcript_path is None
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from provisioning import ProvisioningError, ProvisioningGraph
+
+
+def step(events, name, delay=0.0, result=None, error=None):
+    async def run(results):
+        events.append(("start", name, sorted(results)))
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        events.append(("end", name))
+        return result if result is not None else name.upper()
+
+    return run
+
+
+def test_steps_run_after_their_dependencies_and_concurrently_otherwise():
+    events, reported = [], []
+    graph = ProvisioningGraph(on_step=lambda name, event, elapsed: reported.append((name, event)))
+    graph.add_step("files", step(events, "files", 0.02))
+    graph.add_step("store", step(events, "store", 0.01), depends_on=["files"])
+    graph.add_step("job_agent", step(events, "job_agent", 0.05))
+    graph.add_step("screener", step(events, "screener", 0.01), depends_on=["store", "job_agent"])
+
+    results = asyncio.run(graph.run())
+
+    assert results == {"files": "FILES", "store": "STORE", "job_agent": "JOB_AGENT", "screener": "SCREENER"}
+    starts = [event[1] for event in events if event[0] == "start"]
+    assert starts[:2] == ["files", "job_agent"]
+    # A step sees the results of everything it depends on
+    assert ("start", "store", ["files"]) in events
+    assert ("start", "screener", ["files", "job_agent", "store"]) in events
+    assert graph.critical_path() == ["job_agent", "screener"]
+    assert graph.timings["total"]["duration"] < 0.05 + 0.02 + 0.01 + 0.01
+    assert ("screener", "done") in reported and ("files", "start") in reported
+
+
+def test_a_failure_cancels_running_steps_and_cleans_up_completed_ones():
+    events, cleaned = [], []
+
+    async def cleanup(result):
+        cleaned.append(result)
+
+    graph = ProvisioningGraph()
+    graph.add_step("files", step(events, "files"), cleanup=cleanup)
+    graph.add_step("store", step(events, "store", 0.01), depends_on=["files"], cleanup=cleanup)
+    graph.add_step("slow_agent", step(events, "slow_agent", 1.0), cleanup=cleanup)
+    graph.add_step("agent", step(events, "agent", 0.02, error=RuntimeError("quota exceeded")), depends_on=["store"])
+    graph.add_step("after", step(events, "after"), depends_on=["agent"])
+
+    with pytest.raises(ProvisioningError) as error:
+        asyncio.run(graph.run())
+
+    assert error.value.step == "agent"
+    assert isinstance(error.value.error, RuntimeError) and "quota exceeded" in str(error.value)
+    # Completed steps are cleaned up in reverse order; cancelled and unstarted ones are not
+    assert cleaned == ["STORE", "FILES"]
+    assert ("end", "slow_agent") not in events
+    assert not any(event[1] == "after" for event in events)
+
+
+def test_a_failing_cleanup_does_not_hide_the_original_error():
+    async def broken_cleanup(result):
+        raise OSError("cleanup failed")
+
+    graph = ProvisioningGraph()
+    graph.add_step("files", step([], "files"), cleanup=broken_cleanup)
+    graph.add_step("agent", step([], "agent", error=ValueError("bad model")), depends_on=["files"])
+
+    with pytest.raises(ProvisioningError, match="bad model"):
+        asyncio.run(graph.run())
+
+
+def test_invalid_graphs_are_rejected():
+    graph = ProvisioningGraph()
+    graph.add_step("files", step([], "files"))
+    with pytest.raises(ValueError):
+        graph.add_step("files", step([], "files"))
+    with pytest.raises(ValueError):
+        graph.add_step("store", step([], "store"), depends_on=["missing"])
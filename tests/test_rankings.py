@@ -0,0 +1,61 @@
+import pytest
+
+from rankings import RankedCandidate, format_rankings, merge_rankings, parse_rankings, parse_score
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("85", 85),
+    ("85%", 85),
+    ("8.5/10", 85),
+    ("4/5", 80),
+    ("7 out of 10", 70),
+    ("3 Out Of 4", 75),
+    ("8,5 / 10", 85),
+    # Bare numbers are already on the 0-100 scale, however low
+    ("7", 7),
+    ("10", 10),
+    ("0", 0),
+    ("n/a", None),
+    ("", None),
+])
+def test_parse_score(text, expected):
+    assert parse_score(text) == expected
+
+
+def test_parse_rankings_reads_the_candidate_table():
+    text = (
+        "Here are the results.\n\n"
+        "| Rank | Candidate | Score | Notes |\n"
+        "|---|---|---|---|\n"
+        "| 1 | **Ada Lovelace** | 92 | Strong fit |\n"
+        "| 2 | Alan Turing | 9/10 | Good fit |\n"
+        "| 3 | Grace Hopper | - | No score |\n"
+        "\nThanks."
+    )
+    candidates = parse_rankings(text, source="shard_1")
+    assert candidates == [
+        RankedCandidate("Ada Lovelace", 92, "Strong fit", "shard_1"),
+        RankedCandidate("Alan Turing", 90, "Good fit", "shard_1"),
+        RankedCandidate("Grace Hopper", None, "No score", "shard_1"),
+    ]
+
+
+def test_parse_rankings_without_a_table():
+    assert parse_rankings("No candidates matched.") == []
+
+
+def test_merge_keeps_each_candidates_best_score_across_shards():
+    first = [RankedCandidate("Ada", 70, "", "a"), RankedCandidate("Bob", 60, "", "a"), RankedCandidate("Cy", None, "", "a")]
+    second = [RankedCandidate("ada", 90, "", "b"), RankedCandidate("Dee", 80, "", "b"), RankedCandidate("Eve", None, "", "b")]
+
+    merged = merge_rankings([first, second], top_k=10)
+
+    assert [(c.name, c.score, c.source) for c in merged] == [
+        ("ada", 90, "b"), ("Dee", 80, "b"), ("Bob", 60, "a"), ("Cy", None, "a"), ("Eve", None, "b"),
+    ]
+    assert [c.name for c in merge_rankings([first, second], top_k=2)] == ["ada", "Dee"]
+
+
+def test_format_rankings():
+    table = format_rankings([RankedCandidate("Ada", 91.6, "Strong", "shard_1"), RankedCandidate("Bob", None, "", None)])
+    assert table.splitlines()[2:] == ["| 1 | Ada | 92 | Strong | shard_1 |", "| 2 | Bob | - |  |  |"]
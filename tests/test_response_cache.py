@@ -0,0 +1,59 @@
+import asyncio
+
+from azure.ai.agents.models import FileSearchTool
+
+from agent_registry import AgentRegistry
+from connected import response_cache_key
+from fake_backend import FakeProjectClient
+from file_cache import FileManifest, get_or_create_vector_store, upload_files_cached
+from response_cache import ResponseCache, cache_key, normalize_prompt
+
+
+def test_normalized_prompts_share_a_key():
+    assert normalize_prompt("  Summarise the JOB posting!") == "summarise the job posting"
+    assert cache_key("agent", "data", "Summarise the job posting.") == cache_key("agent", "data", "summarise the  job posting")
+    assert cache_key("agent", "data", "prompt", scope="a") != cache_key("agent", "data", "prompt", scope="b")
+
+
+def test_sqlite_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache("sqlite", path=path)
+    cache.put("key", "answer")
+    cache.close()
+
+    cache = ResponseCache("sqlite", path=path)
+    assert cache.get("key") == "answer"
+    assert cache.get("other") is None
+    cache.close()
+
+
+def test_key_survives_a_recreated_vector_store_of_the_same_files(tmp_path):
+    paths = []
+    for i in range(2):
+        path = tmp_path / f"resume_{i}.pdf"
+        path.write_text(f"resume {i}")
+        paths.append(str(path))
+    manifest_path = str(tmp_path / "manifest.json")
+
+    async def screening_agent(instructions="Screen resumes."):
+        # A new process: a fresh service where the store of the last run no longer exists
+        client = FakeProjectClient(latency="0", agent_latency="0")
+        manifest = FileManifest("fake://test", manifest_path)
+        files = await upload_files_cached(client, paths, manifest)
+        store = await get_or_create_vector_store(client, manifest, "resumes", files)
+        tool = FileSearchTool(vector_store_ids=[store.id])
+        agent = await AgentRegistry(client).get_or_create(
+            model="fake-model", name="screener", instructions=instructions,
+            tools=tool.definitions, tool_resources=tool.resources,
+        )
+        return agent, manifest
+
+    first, first_manifest = asyncio.run(screening_agent())
+    second, second_manifest = asyncio.run(screening_agent())
+    changed, changed_manifest = asyncio.run(screening_agent("Screen resumes strictly."))
+
+    assert first.tool_resources.file_search.vector_store_ids != second.tool_resources.file_search.vector_store_ids
+    key = response_cache_key(first, "Rank the candidates", first_manifest)
+    assert key is not None
+    assert response_cache_key(second, "Rank the candidates", second_manifest) == key
+    assert response_cache_key(changed, "Rank the candidates", changed_manifest) != key
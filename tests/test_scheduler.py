@@ -0,0 +1,261 @@
+import asyncio
+import io
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from azure.core.rest import HttpRequest
+
+from fake_backend import FakeAgentsClient
+from scheduler import (RequestScheduler, SchedulingPolicy, Throttled, parse_rate_limits, priority, request_class,
+                       retry_after, throttle_delay)
+
+
+class Service:
+    """Counts concurrent sends and throttles those beyond ``capacity`` with ``retry_after``"""
+
+    def __init__(self, capacity=None, retry_after=0.01, duration=0.005):
+        self.capacity = capacity
+        self.retry_after = retry_after
+        self.duration = duration
+        self.in_flight = 0
+        self.peak = 0
+        self.throttled = 0
+
+    async def send(self):
+        self.in_flight += 1
+        try:
+            self.peak = max(self.peak, self.in_flight)
+            if self.capacity is not None and self.in_flight > self.capacity:
+                self.throttled += 1
+                raise Throttled(self.retry_after)
+            await asyncio.sleep(self.duration)
+            return "ok"
+        finally:
+            self.in_flight -= 1
+
+
+def run_all(scheduler, send, count, operation="thread"):
+    async def scenario():
+        return await asyncio.gather(*(scheduler.run(operation, send) for _ in range(count)))
+
+    return asyncio.run(scenario())
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("") == {}
+    assert parse_rate_limits("upload:20, run:2.5") == {"upload": 20.0, "run": 2.5}
+    with pytest.raises(ValueError):
+        parse_rate_limits("uploads:20")
+
+
+def test_request_class():
+    assert request_class("GET", "https://x/threads/t1/runs/r1") == "read"
+    assert request_class("POST", "https://x/files") == "upload"
+    assert request_class("POST", "https://x/vector_stores/vs1/file_batches") == "vector_store"
+    assert request_class("DELETE", "https://x/assistants/a1") == "agent"
+    assert request_class("POST", "https://x/threads/t1/runs") == "run"
+    assert request_class("POST", "https://x/threads/t1/messages") == "thread"
+
+
+def test_retry_after_headers():
+    assert retry_after({"Retry-After": "3"}) == 3
+    assert retry_after({"retry-after-ms": "250", "Retry-After": "3"}) == 0.25
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 < retry_after({"Retry-After": later}) <= 30
+    assert retry_after({"Retry-After": "soon"}) is None
+    assert retry_after(None) is None
+    assert throttle_delay(Throttled(None), default=2) == 2
+    assert throttle_delay(ValueError()) is None
+
+
+def test_requests_are_not_limited_by_default():
+    service = Service()
+    results = run_all(RequestScheduler(rate_limits="", max_concurrency=0, initial_concurrency=0), service.send, 50)
+
+    assert results == ["ok"] * 50
+    assert service.peak == 50
+
+
+def test_token_bucket_limits_the_request_rate():
+    scheduler = RequestScheduler(rate_limits="thread:20", max_concurrency=0, initial_concurrency=0)
+    service = Service(duration=0)
+    start = time.perf_counter()
+    run_all(scheduler, service.send, 30)
+    elapsed = time.perf_counter() - start
+
+    # A full bucket of 20, then 10 more at 20 per second
+    assert 0.4 <= elapsed < 1.5
+    assert scheduler.stats()["thread"]["rate"] == 20
+
+
+def test_retry_after_pauses_the_whole_class():
+    scheduler = RequestScheduler(rate_limits="", max_concurrency=0, initial_concurrency=0)
+    sent = []
+
+    async def first():
+        sent.append(("first", time.perf_counter()))
+        if len(sent) == 1:
+            raise Throttled(0.2)
+        return "first"
+
+    async def second():
+        sent.append(("second", time.perf_counter()))
+        return "second"
+
+    async def scenario():
+        start = time.perf_counter()
+        throttled = asyncio.ensure_future(scheduler.run("thread", first))
+        await asyncio.sleep(0.05)
+        # Sent during the pause, so it waits for it to end too
+        results = await asyncio.gather(throttled, scheduler.run("thread", second))
+        return start, results
+
+    start, results = asyncio.run(scenario())
+
+    assert results == ["first", "second"]
+    assert [name for name, _ in sent] == ["first", "first", "second"]
+    assert all(at - start >= 0.19 for _, at in sent[1:])
+    stats = scheduler.stats()["thread"]
+    assert (stats["throttled"], stats["retries"], stats["decreases"]) == (1, 1, 1)
+
+
+def test_aimd_settles_below_the_service_capacity():
+    scheduler = RequestScheduler(rate_limits="", max_concurrency=0, initial_concurrency=0, retries=20)
+    service = Service(capacity=4)
+
+    results = run_all(scheduler, service.send, 200)
+
+    assert results == ["ok"] * 200
+    stats = scheduler.stats()["thread"]
+    # The first 429 bounds the limit; afterwards it only probes just above the capacity
+    assert stats["limit"] is not None and stats["limit"] <= 8
+    assert service.peak <= 8
+    assert stats["decreases"] <= stats["throttled"] == service.throttled < 40
+
+
+def test_successes_under_load_raise_a_lowered_limit():
+    scheduler = RequestScheduler(rate_limits="", max_concurrency=16, initial_concurrency=2)
+    run_all(scheduler, Service().send, 100)
+
+    assert 2 < scheduler.stats()["thread"]["limit"] <= 16
+
+
+def test_interactive_requests_go_before_batch_ones():
+    scheduler = RequestScheduler(rate_limits="", max_concurrency=1)
+    order = []
+    release = None
+
+    async def hold():
+        await release.wait()
+
+    def record(name):
+        async def send():
+            order.append(name)
+
+        return send
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(scheduler.run("thread", hold))
+        await asyncio.sleep(0)
+        with priority("batch"):
+            batch = [asyncio.ensure_future(scheduler.run("thread", record(f"batch{i}"))) for i in range(2)]
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(scheduler.run("thread", record("interactive")))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, interactive, *batch)
+
+    asyncio.run(scenario())
+
+    assert order == ["interactive", "batch0", "batch1"]
+    with pytest.raises(ValueError):
+        with priority("urgent"):
+            pass
+
+
+def test_gives_up_after_the_retries():
+    scheduler = RequestScheduler(rate_limits="", retries=2, default_retry_after=0)
+
+    async def always_throttled():
+        raise Throttled(None)
+
+    with pytest.raises(Throttled):
+        run_all(scheduler, always_throttled, 1)
+    stats = scheduler.stats()["thread"]
+    assert (stats["throttled"], stats["retries"], stats["gave_up"]) == (3, 2, 1)
+    assert stats["in_flight"] == 0
+
+
+def test_fake_service_rate_limit_through_the_scheduler():
+    scheduler = RequestScheduler(rate_limits="", retries=20)
+    client = FakeAgentsClient(latency="0", rate_limit=100, retry_after=0.05, scheduler=scheduler, seed=1)
+
+    async def scenario():
+        return await asyncio.gather(*(client.threads.create() for _ in range(150)))
+
+    threads = asyncio.run(scenario())
+
+    assert len({thread.id for thread in threads}) == 150
+    assert client.calls["threads.create"] == 150 + sum(client.throttled.values())
+    assert scheduler.stats()["thread"]["throttled"] == sum(client.throttled.values())
+
+
+class NonSeekable(io.RawIOBase):
+    def __init__(self, data):
+        self.data = data
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        data, self.data = self.data, b""
+        return data
+
+
+class Transport:
+    """Stands in for the rest of the pipeline: reads the request body and answers with the next status"""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.bodies = []
+
+    async def send(self, request):
+        http_request = request.http_request
+        stream = http_request.body if hasattr(http_request.body, "read") else http_request.files["file"][1]
+        self.bodies.append(stream.read())
+        status = self.statuses.pop(0)
+        return SimpleNamespace(http_response=SimpleNamespace(status_code=status, headers={"Retry-After": "0"}))
+
+
+def send_through_policy(http_request, transport):
+    policy = SchedulingPolicy(RequestScheduler(rate_limits="", default_retry_after=0))
+    policy.next = transport
+    return asyncio.run(policy.send(SimpleNamespace(http_request=http_request)))
+
+
+def test_throttled_request_bodies_are_rewound_before_a_retry():
+    transport = Transport(429, 429, 200)
+    body = io.BytesIO(b"header" + b"payload")
+    body.seek(6)
+    response = send_through_policy(HttpRequest("POST", "https://x/threads", content=body), transport)
+
+    assert response.http_response.status_code == 200
+    assert transport.bodies == [b"payload"] * 3
+
+    transport = Transport(429, 200)
+    upload = HttpRequest("POST", "https://x/files", files={"file": ("a.pdf", io.BytesIO(b"%PDF"), "application/pdf")})
+    assert send_through_policy(upload, transport).http_response.status_code == 200
+    assert transport.bodies == [b"%PDF", b"%PDF"]
+
+
+def test_request_bodies_that_cannot_be_rewound_are_not_retried():
+    transport = Transport(429, 200)
+    response = send_through_policy(HttpRequest("POST", "https://x/threads", content=NonSeekable(b"payload")), transport)
+
+    assert response.http_response.status_code == 429
+    assert transport.bodies == [b"payload"]
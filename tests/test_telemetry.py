@@ -0,0 +1,15 @@
+from telemetry import PHASE_SECONDS, RunTelemetry
+
+
+def test_phase_histogram_is_labelled_by_phase_only():
+    telemetry = RunTelemetry("run-1")
+    telemetry.start()
+    for name in ("upload_job_000_files", "job_000_vector_store", "job_001_screener"):
+        telemetry.provisioning_step(name, "start", 0)
+        telemetry.provisioning_step(name, "finished", 0.1)
+    telemetry.finish("completed")
+
+    labels = {sample.labels.get("phase") for metric in PHASE_SECONDS.collect() for sample in metric.samples}
+    assert {"upload", "vector_store", "agent", "run"} <= labels
+    assert all(set(sample.labels) <= {"phase", "le"}
+               for metric in PHASE_SECONDS.collect() for sample in metric.samples)
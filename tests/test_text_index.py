@@ -0,0 +1,87 @@
+import os
+
+from text_index import TextIndex, chunk_spans
+
+
+class Extractor:
+    """Reads plain text files in place of PDFs and records which paths it was asked for"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, paths):
+        self.calls.append(list(paths))
+        texts = []
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                texts.append(f.read())
+        return texts
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def words(count, word):
+    return " ".join(f"{word}{i}" for i in range(count))
+
+
+def test_chunk_spans_are_word_aligned_and_overlapping():
+    data = words(300, "w").encode("utf-8")
+    spans = chunk_spans(data, size=200, overlap=50)
+
+    assert spans[0][0] == 0 and spans[-1][1] == len(data)
+    for (start, end), (next_start, _) in zip(spans, spans[1:]):
+        assert end - start <= 200
+        assert start < next_start < end
+        assert data[next_start - 1:next_start] == b" " and data[end:end + 1] in (b" ", b"")
+
+
+def test_update_extracts_only_new_and_changed_files(tmp_path):
+    directory = str(tmp_path / "index")
+    paths = [write(tmp_path / f"doc_{i}.txt", words(100, f"d{i}x")) for i in range(3)]
+    extract = Extractor()
+    index = TextIndex(directory, chunk_size=200, chunk_overlap=40)
+
+    first = index.update(paths, extract=extract)
+    assert (first["added"], first["unchanged"]) == (3, 0)
+    texts = {path: index.document_text(path) for path in paths}
+
+    # Touching a file without changing it is not a change
+    os.utime(paths[0], ns=(1, 1))
+    write(tmp_path / "doc_1.txt", "changed " + words(50, "c"))
+    added = write(tmp_path / "doc_3.txt", words(20, "new"))
+    second = index.update([paths[0], paths[1], added], extract=extract)
+
+    assert (second["added"], second["changed"], second["unchanged"], second["removed"]) == (1, 1, 1, 1)
+    assert extract.calls == [paths, [paths[1], added]]
+    assert index.paths == [os.path.normpath(p) for p in (paths[0], paths[1], added)]
+    assert index.document_text(paths[0]) == texts[paths[0]]
+    assert index.document_text(paths[1]).startswith("changed ")
+    assert index.document_id(paths[2]) is None
+    assert index.mtime_ns[0] == 1
+
+    # Chunks of every document point into that document's text
+    for path in index.paths:
+        chunks = [index.chunk(i) for i in index.document_chunks(path)]
+        assert chunks and all(chunk in index.document_text(path) for chunk in chunks)
+        assert all(index.chunk_document(i) == index.document_id(path) for i in index.document_chunks(path))
+
+
+def test_unchanged_update_keeps_the_generation_and_reopens(tmp_path):
+    directory = str(tmp_path / "index")
+    paths = [write(tmp_path / f"doc_{i}.txt", words(30, f"d{i}x")) for i in range(2)]
+    index = TextIndex(directory)
+    index.update(paths, extract=Extractor())
+    generation = index.generation
+
+    extract = Extractor()
+    stats = index.update(paths, extract=extract)
+    reopened = TextIndex(directory)
+
+    assert stats["unchanged"] == 2 and extract.calls == []
+    assert index.generation == generation == reopened.generation
+    assert reopened.paths == index.paths and reopened.num_chunks == index.num_chunks
+    # Different chunking settings start over
+    assert TextIndex(directory, chunk_size=100).generation is None
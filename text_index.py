@@ -0,0 +1,286 @@
+"""Local, incrementally updated text and chunk index of the resume and job description PDFs.
+
+Extracted text is stored once, UTF-8 encoded, in ``text.bin``. Everything
+else is a column of fixed-width NumPy arrays: per document its path, mtime,
+size, SHA-256 and text range, and per chunk its byte range. Chunks are
+overlapping word-aligned windows of that text, so overlap costs no extra
+storage. All files are opened memory-mapped, so opening an index of 100k
+resumes takes milliseconds and only the chunks that are read are paged in.
+
+An update re-extracts only files whose size or mtime changed and whose
+content hash differs; the text of unchanged files is copied over. Every
+update writes a new generation directory and then switches the ``CURRENT``
+pointer, so readers never see a half-written index. Chunk embeddings cached
+in the old generation (see ``local_search``) are carried over for the
+chunks of unchanged files; only the chunks of new and changed files are
+left to embed.
+"""
+import os
+import re
+import json
+import shutil
+import time
+
+import numpy as np
+
+from file_cache import file_sha256
+from prerank import extract_texts
+
+# Empty disables the ingestion stage
+DEFAULT_INDEX_DIR = os.environ.get("TEXT_INDEX_DIR", ".text_index")
+DEFAULT_CHUNK_SIZE = int(os.environ.get("TEXT_CHUNK_SIZE", "1000"))
+DEFAULT_CHUNK_OVERLAP = int(os.environ.get("TEXT_CHUNK_OVERLAP", "200"))
+
+FORMAT_VERSION = 1
+_WORD = re.compile(rb"\S+")
+# Rows copied per step when carrying embeddings over to a new generation
+_CARRY_BATCH = 65536
+_ARRAYS = ("path_offsets", "mtime_ns", "size", "sha256", "text_offsets", "doc_chunks", "chunk_starts", "chunk_ends")
+
+
+def chunk_spans(data, size=DEFAULT_CHUNK_SIZE, overlap=DEFAULT_CHUNK_OVERLAP):
+    """Byte ranges of word-aligned windows of about ``size`` bytes over ``data``, overlapping by about ``overlap``"""
+    words = [match.span() for match in _WORD.finditer(data)]
+    spans = []
+    i = 0
+    while i < len(words):
+        start = words[i][0]
+        j = i
+        while j + 1 < len(words) and words[j + 1][1] - start <= size:
+            j += 1
+        end = words[j][1]
+        spans.append((start, end))
+        if j + 1 == len(words):
+            break
+        # Step back over the words that fall in the overlap, but always move forward
+        k = j + 1
+        while k - 1 > i and words[k - 1][0] >= end - overlap:
+            k -= 1
+        i = k
+    return spans
+
+
+def _open_array(path):
+    # np.load cannot map an empty array file
+    array = np.load(path, mmap_mode="r")
+    return array if array.size else np.zeros(array.shape, dtype=array.dtype)
+
+
+def _open_blob(path):
+    return np.memmap(path, dtype=np.uint8, mode="r") if os.path.getsize(path) else np.zeros(0, dtype=np.uint8)
+
+
+class TextIndex:
+    """Read side of the index plus ``update``; documents keep the order of the paths they were indexed in"""
+
+    def __init__(self, directory=DEFAULT_INDEX_DIR, chunk_size=DEFAULT_CHUNK_SIZE, chunk_overlap=DEFAULT_CHUNK_OVERLAP):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.generation = None
+        self._paths = None
+        self._lookup = None
+        self._open()
+
+    def _open(self):
+        self._paths = self._lookup = None
+        current = os.path.join(self.directory, "CURRENT")
+        info = None
+        if os.path.exists(current):
+            with open(current, "r", encoding="utf-8") as f:
+                generation = f.read().strip()
+            try:
+                with open(os.path.join(self.directory, generation, "index.json"), "r", encoding="utf-8") as f:
+                    info = json.load(f)
+            except (OSError, ValueError):
+                info = None
+        # A different format or chunking is rebuilt from scratch on the next update
+        if info is None or (info["version"], info["chunk_size"], info["chunk_overlap"]) != (
+                FORMAT_VERSION, self.chunk_size, self.chunk_overlap):
+            self.generation = None
+            self.path_blob = self.text = np.zeros(0, dtype=np.uint8)
+            self.path_offsets = self.text_offsets = self.doc_chunks = np.zeros(1, dtype=np.int64)
+            self.mtime_ns = self.size = self.chunk_starts = self.chunk_ends = np.zeros(0, dtype=np.int64)
+            self.sha256 = np.zeros((0, 32), dtype=np.uint8)
+            return
+        self.generation = generation
+        base = os.path.join(self.directory, generation)
+        for name in _ARRAYS:
+            setattr(self, name, _open_array(os.path.join(base, f"{name}.npy")))
+        self.path_blob = _open_blob(os.path.join(base, "paths.bin"))
+        self.text = _open_blob(os.path.join(base, "text.bin"))
+
+    def __len__(self):
+        return len(self.mtime_ns)
+
+    @property
+    def num_chunks(self):
+        return len(self.chunk_starts)
+
+    @property
+    def paths(self):
+        """Indexed paths in document order (decoded on first use)"""
+        if self._paths is None:
+            blob = bytes(self.path_blob)
+            offsets = self.path_offsets.tolist()
+            self._paths = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(self))]
+        return self._paths
+
+    def document_id(self, path):
+        """Position of ``path`` in the index, or None"""
+        if self._lookup is None:
+            self._lookup = {p: i for i, p in enumerate(self.paths)}
+        return self._lookup.get(os.path.normpath(path))
+
+    def document_text(self, path):
+        i = self.document_id(path)
+        if i is None:
+            raise KeyError(path)
+        return bytes(self.text[self.text_offsets[i]:self.text_offsets[i + 1]]).decode("utf-8")
+
+    def chunk(self, i):
+        """Text of chunk ``i``"""
+        return bytes(self.text[self.chunk_starts[i]:self.chunk_ends[i]]).decode("utf-8")
+
+    def chunk_document(self, i):
+        """Document position of chunk ``i``"""
+        return int(np.searchsorted(self.doc_chunks, i, side="right")) - 1
+
+    def embeddings_paths(self, name):
+        """``(complete, partial, missing)`` paths of the cached ``name`` embeddings of the current generation.
+
+        ``partial`` holds the rows carried over from the previous generation and
+        ``missing`` the chunk numbers whose rows still have to be computed.
+        """
+        base = os.path.join(self.directory, self.generation, f"embeddings-{name}")
+        return f"{base}.npy", f"{base}.partial.npy", f"{base}.missing.npy"
+
+    def document_chunks(self, path):
+        """Chunk numbers of ``path``"""
+        i = self.document_id(path)
+        if i is None:
+            raise KeyError(path)
+        return range(int(self.doc_chunks[i]), int(self.doc_chunks[i + 1]))
+
+    def update(self, paths, extract=extract_texts):
+        """Index exactly ``paths``, re-extracting only new and changed files; returns counts and timing.
+
+        ``extract(paths)`` returns the text of each path (PDF extraction by default).
+        """
+        started = time.perf_counter()
+        paths = [os.path.normpath(path) for path in paths]
+        plan = []  # (path, mtime_ns, size, sha256 digest, old document or None)
+        stats = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+        for path in paths:
+            stat = os.stat(path)
+            old = self.document_id(path)
+            if old is not None and self.mtime_ns[old] == stat.st_mtime_ns and self.size[old] == stat.st_size:
+                plan.append((path, stat.st_mtime_ns, stat.st_size, self.sha256[old].tobytes(), old))
+                continue
+            digest = bytes.fromhex(file_sha256(path))
+            if old is not None and self.sha256[old].tobytes() == digest:
+                # Touched but unchanged: keep the text, record the new mtime
+                plan.append((path, stat.st_mtime_ns, stat.st_size, digest, old))
+            else:
+                stats["changed" if old is not None else "added"] += 1
+                plan.append((path, stat.st_mtime_ns, stat.st_size, digest, None))
+        stats["unchanged"] = len(paths) - stats["added"] - stats["changed"]
+        stats["removed"] = len(set(self.paths) - set(paths))
+
+        untouched = len(plan) == len(self) and all(entry[4] == i for i, entry in enumerate(plan))
+        if untouched and all(self.mtime_ns[i] == entry[1] for i, entry in enumerate(plan)):
+            stats.update(chunks=self.num_chunks, seconds=time.perf_counter() - started)
+            return stats
+
+        new_paths = [entry[0] for entry in plan if entry[4] is None]
+        new_texts = iter(extract(new_paths) if new_paths else [])
+        self._write(plan, new_texts)
+        self._open()
+        stats.update(chunks=self.num_chunks, seconds=time.perf_counter() - started)
+        return stats
+
+    def _write(self, plan, new_texts):
+        previous = self.generation
+        generation = f"gen-{int(previous.split('-')[1]) + 1 if previous else 1}"
+        base = os.path.join(self.directory, generation)
+        shutil.rmtree(base, ignore_errors=True)
+        os.makedirs(base)
+
+        path_offsets, text_offsets, doc_chunks = [0], [0], [0]
+        starts, ends = [], []
+        sources = []  # previous chunk number of every chunk, -1 for new ones
+        with open(os.path.join(base, "paths.bin"), "wb") as path_file, \
+                open(os.path.join(base, "text.bin"), "wb") as text_file:
+            for path, _, _, _, old in plan:
+                encoded_path = path.encode("utf-8")
+                path_file.write(encoded_path)
+                path_offsets.append(path_offsets[-1] + len(encoded_path))
+                base_offset = text_offsets[-1]
+                if old is not None:
+                    # Copy the stored text and shift its chunk ranges
+                    data = bytes(self.text[self.text_offsets[old]:self.text_offsets[old + 1]])
+                    shift = base_offset - int(self.text_offsets[old])
+                    first, last = int(self.doc_chunks[old]), int(self.doc_chunks[old + 1])
+                    starts.extend((self.chunk_starts[first:last] + shift).tolist())
+                    ends.extend((self.chunk_ends[first:last] + shift).tolist())
+                    sources.extend(range(first, last))
+                else:
+                    data = next(new_texts).encode("utf-8")
+                    for start, end in chunk_spans(data, self.chunk_size, self.chunk_overlap):
+                        starts.append(base_offset + start)
+                        ends.append(base_offset + end)
+                        sources.append(-1)
+                text_file.write(data)
+                text_offsets.append(base_offset + len(data))
+                doc_chunks.append(len(starts))
+
+        columns = {
+            "path_offsets": np.asarray(path_offsets, dtype=np.int64),
+            "mtime_ns": np.asarray([entry[1] for entry in plan], dtype=np.int64),
+            "size": np.asarray([entry[2] for entry in plan], dtype=np.int64),
+            # Raw digest bytes; a fixed-width bytes dtype would drop trailing NULs
+            "sha256": np.frombuffer(b"".join(entry[3] for entry in plan), dtype=np.uint8).reshape(-1, 32),
+            "text_offsets": np.asarray(text_offsets, dtype=np.int64),
+            "doc_chunks": np.asarray(doc_chunks, dtype=np.int64),
+            "chunk_starts": np.asarray(starts, dtype=np.int64),
+            "chunk_ends": np.asarray(ends, dtype=np.int64),
+        }
+        for name, array in columns.items():
+            np.save(os.path.join(base, f"{name}.npy"), array)
+        with open(os.path.join(base, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": FORMAT_VERSION, "documents": len(plan), "chunks": len(starts),
+                       "chunk_size": self.chunk_size, "chunk_overlap": self.chunk_overlap}, f)
+        if previous:
+            self._carry_embeddings(os.path.join(self.directory, previous), base, np.asarray(sources, dtype=np.int64))
+
+        current = os.path.join(self.directory, "CURRENT")
+        with open(f"{current}.tmp", "w", encoding="utf-8") as f:
+            f.write(generation)
+        os.replace(f"{current}.tmp", current)
+        if previous:
+            # Open maps of the old generation stay valid on POSIX; elsewhere it is removed next time
+            shutil.rmtree(os.path.join(self.directory, previous), ignore_errors=True)
+
+
+    def _carry_embeddings(self, previous_base, base, sources):
+        """Copy the cached embedding rows of kept chunks from the previous generation into a partial file of the new one"""
+        for filename in sorted(os.listdir(previous_base)):
+            match = re.fullmatch(r"embeddings-(.+?)(\.partial)?\.npy", filename)
+            if match is None or filename.endswith(".missing.npy"):
+                continue
+            missing = sources < 0
+            if match.group(2):
+                # The previous generation's rows were not complete either
+                missing |= np.isin(sources, np.load(os.path.join(previous_base, f"embeddings-{match.group(1)}.missing.npy")))
+            kept = np.flatnonzero(~missing)
+            if not len(kept):
+                continue
+            old = np.load(os.path.join(previous_base, filename), mmap_mode="r")
+            new = np.lib.format.open_memmap(os.path.join(base, f"embeddings-{match.group(1)}.partial.npy"), mode="w+",
+                                            dtype=old.dtype, shape=(len(sources), old.shape[1]))
+            for start in range(0, len(kept), _CARRY_BATCH):
+                rows = kept[start:start + _CARRY_BATCH]
+                new[rows] = old[sources[rows]]
+            new.flush()
+            del new, old
+            np.save(os.path.join(base, f"embeddings-{match.group(1)}.missing.npy"), np.flatnonzero(missing))
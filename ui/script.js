@@ -11,6 +11,15 @@ class AgentWorkflowUI {
         this.networkContainer = document.getElementById('agent-network');
         
         this.eventSource = null;
+        this.runId = null;
+        
+        // Status polling only fetches messages after the last seen sequence number
+        this.lastSeq = 0;
+        this.seenSeqs = new Set();
+        this.statusEtag = null;
+        this.statusPollTimer = null;
+        // Message bubbles still receiving message.delta events, by message ID
+        this.streamingMessages = new Map();
         this.network = null;
         this.nodes = new vis.DataSet();
         this.edges = new vis.DataSet();
@@ -240,6 +249,10 @@ class AgentWorkflowUI {
         this.steps = [];
         this.currentStep = -1;
         this.isReplayMode = false;
+        this.lastSeq = 0;
+        this.seenSeqs.clear();
+        this.streamingMessages.clear();
+        this.statusEtag = null;
         
         // Reset communication edges to default state (don't remove them)
         this.edges.update({ id: 'critic-recruiter', color: { color: '#484f58' }, width: 1 });
@@ -255,8 +268,10 @@ class AgentWorkflowUI {
             const data = await response.json();
             
             if (response.ok) {
-                this.updateStatus('Running', 'active');
+                this.runId = data.run_id;
+                this.updateStatus(data.status === 'queued' ? 'Queued' : 'Running', 'active');
                 this.connectToEventStream();
+                this.startStatusPolling();
             } else {
                 this.showError(data.error || 'Failed to start workflow');
             }
@@ -265,12 +280,17 @@ class AgentWorkflowUI {
         }
     }
     
+    runUrl(endpoint) {
+        // Follow this tab's own run; fall back to the latest run
+        return this.runId ? `/api/runs/${this.runId}/${endpoint}` : `/api/${endpoint}`;
+    }
+    
     connectToEventStream() {
         if (this.eventSource) {
             this.eventSource.close();
         }
         
-        this.eventSource = new EventSource('/api/events');
+        this.eventSource = new EventSource(this.runUrl('events'));
         
         this.eventSource.onmessage = (event) => {
             const data = JSON.parse(event.data);
@@ -279,28 +299,78 @@ class AgentWorkflowUI {
             }
         };
         
+        // Partial agent responses; the complete message follows with the same message_id
+        this.eventSource.addEventListener('message.delta', (event) => {
+            this.handleDelta(JSON.parse(event.data));
+        });
+        
+        // The server dropped events because this client fell behind
+        this.eventSource.addEventListener('dropped', (event) => {
+            const data = JSON.parse(event.data);
+            console.warn(`Missed ${data.count} events, checking workflow status`);
+            this.checkWorkflowStatus(Math.max(0, this.lastSeq - data.count));
+        });
+        
+        // EventSource reconnects on its own and resumes via Last-Event-ID;
+        // checkWorkflowStatus closes the stream once the workflow has finished
         this.eventSource.onerror = (error) => {
             console.error('EventSource error:', error);
-            this.eventSource.close();
             this.checkWorkflowStatus();
         };
     }
     
     handleMessage(data) {
+        // Messages can arrive through both the event stream and status polling
+        if (data.seq) {
+            if (this.seenSeqs.has(data.seq)) return;
+            this.seenSeqs.add(data.seq);
+            this.lastSeq = Math.max(this.lastSeq, data.seq);
+        }
+        
         this.addMessage(data);
         
+        // A queued run has been picked up
+        if (data.agent_type === 'system' && data.content === 'Starting agent workflow...') {
+            this.updateStatus('Running', 'active');
+        }
+        
         if (data.agent_type && data.agent_type !== 'system' && data.agent_type !== 'error') {
             this.setAgentActive(data.agent_type);
             this.highlightCommunication(data.agent_type);
         }
         
-        if (data.content && data.content.includes('COMPLETED')) {
+        // The chat can end on the critic's COMPLETED or locally once the recruiter has ranked candidates
+        const finished = data.agent_type === 'system' && data.content && data.content.startsWith('Workflow completed');
+        if (finished || (data.content && data.content.includes('COMPLETED'))) {
             this.handleCompletion(data);
         }
         
         this.updateStatusInfo(data);
     }
     
+    handleDelta(data) {
+        let entry = this.streamingMessages.get(data.message_id);
+        if (!entry) {
+            const messageDiv = document.createElement('div');
+            messageDiv.className = `message ${data.agent_type} streaming`;
+            const time = new Date().toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+            messageDiv.innerHTML = `
+                <div class="message-header">
+                    <span class="message-sender ${data.agent_type}">${data.sender}</span>
+                    <span class="message-time">${time}</span>
+                </div>
+                <div class="message-content"></div>
+            `;
+            this.messagesContainer.appendChild(messageDiv);
+            entry = { div: messageDiv, content: messageDiv.querySelector('.message-content') };
+            this.streamingMessages.set(data.message_id, entry);
+            this.setAgentActive(data.agent_type);
+        }
+        // Plain text while streaming; the final message is rendered with formatting
+        entry.content.textContent += data.delta;
+        this.messagesContainer.scrollTop = this.messagesContainer.scrollHeight;
+    }
+    
     addMessage(data) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${data.agent_type}`;
@@ -319,7 +389,14 @@ class AgentWorkflowUI {
         
         messageDiv.addEventListener('click', () => this.showStepState(parseInt(messageDiv.dataset.stepId)));
         
-        this.messagesContainer.appendChild(messageDiv);
+        // The complete message takes the place of the bubble its deltas were streamed into
+        const streamed = data.message_id && this.streamingMessages.get(data.message_id);
+        if (streamed) {
+            this.streamingMessages.delete(data.message_id);
+            this.messagesContainer.replaceChild(messageDiv, streamed.div);
+        } else {
+            this.messagesContainer.appendChild(messageDiv);
+        }
         this.messagesContainer.scrollTop = this.messagesContainer.scrollHeight;
         
         // Initial step state capture (will be updated after delegation detection)
@@ -499,7 +576,7 @@ class AgentWorkflowUI {
     
     handleCompletion(data) {
         const content = data.content;
-        if (content.includes('candidates') && content.includes('|')) {
+        if (/candidate/i.test(content) && content.includes('|')) {
             this.showResults(content);
         }
         
@@ -548,19 +625,44 @@ class AgentWorkflowUI {
     
     showResults(content) {
         this.resultsSection.style.display = 'block';
-        this.resultsContainer.innerHTML = this.formatContent(content.split('COMPLETED')[0]);
+        this.resultsContainer.innerHTML = this.formatContent(content.replace(/^Workflow completed: /, '').split('COMPLETED')[0]);
         this.resultsSection.scrollIntoView({ behavior: 'smooth' });
     }
     
-    async checkWorkflowStatus() {
+    startStatusPolling() {
+        // Fallback for missed events; unchanged status costs a 304 with no body
+        this.stopStatusPolling();
+        this.statusPollTimer = setInterval(() => this.checkWorkflowStatus(), 5000);
+    }
+    
+    stopStatusPolling() {
+        if (this.statusPollTimer) {
+            clearInterval(this.statusPollTimer);
+            this.statusPollTimer = null;
+        }
+    }
+    
+    async checkWorkflowStatus(since = this.lastSeq) {
         try {
-            const response = await fetch('/api/status');
+            const headers = this.statusEtag ? { 'If-None-Match': this.statusEtag } : {};
+            const response = await fetch(`${this.runUrl('status')}?since=${since}&limit=500`, { headers });
+            if (response.status === 304) return;
+            
+            this.statusEtag = response.headers.get('ETag');
             const data = await response.json();
             
-            if (data.status === 'completed' || data.status === 'error') {
+            // Backfill any messages the event stream missed
+            data.messages.forEach(message => this.handleMessage(message));
+            if (data.has_more) {
+                setTimeout(() => this.checkWorkflowStatus(), 0);
+                return;
+            }
+            
+            if (data.status === 'completed' || data.status === 'error' || data.status === 'cancelled') {
                 this.updateStatus(data.status.charAt(0).toUpperCase() + data.status.slice(1), data.status);
                 this.startBtn.classList.remove('loading');
                 this.startBtn.innerHTML = '<svg class="icon" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><polygon points="5 3 19 12 5 21 5 3"></polygon></svg> Start Workflow';
+                this.stopStatusPolling();
                 
                 if (this.eventSource) {
                     this.eventSource.close();
@@ -594,6 +696,7 @@ class AgentWorkflowUI {
     }
     
     showError(message) {
+        this.stopStatusPolling();
         this.updateStatus('Error', 'error');
         this.startBtn.classList.remove('loading');
         this.startBtn.innerHTML = '<svg class="icon" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><polygon points="5 3 19 12 5 21 5 3"></polygon></svg> Start Workflow';
@@ -613,7 +716,8 @@ class AgentWorkflowUI {
     
     async showAgentDetails(agentName) {
         try {
-            const response = await fetch(`/api/agent/${agentName}`);
+            const query = this.runId ? `?run_id=${this.runId}` : '';
+            const response = await fetch(`/api/agent/${agentName}${query}`);
             if (!response.ok) {
                 console.error('Failed to fetch agent details');
                 return;
@@ -673,6 +777,30 @@ class AgentWorkflowUI {
                                 <span class="metric-value">${agentData.statistics.total_response_time}s</span>
                                 <span class="metric-label">Total Response Time</span>
                             </div>
+                            ${agentData.statistics.latency.count ? `
+                                <div class="metric">
+                                    <span class="metric-value">${agentData.statistics.latency.p50}s / ${agentData.statistics.latency.p95}s / ${agentData.statistics.latency.p99}s</span>
+                                    <span class="metric-label">Latency p50 / p95 / p99</span>
+                                </div>
+                            ` : ''}
+                            ${agentData.statistics.time_to_first_token.count ? `
+                                <div class="metric">
+                                    <span class="metric-value">${agentData.statistics.time_to_first_token.p50}s</span>
+                                    <span class="metric-label">Time to First Token (p50)</span>
+                                </div>
+                            ` : ''}
+                            ${agentData.statistics.tokens.total ? `
+                                <div class="metric">
+                                    <span class="metric-value">${agentData.statistics.tokens.prompt} / ${agentData.statistics.tokens.completion}</span>
+                                    <span class="metric-label">Prompt / Completion Tokens</span>
+                                </div>
+                            ` : ''}
+                            ${Object.entries(agentData.statistics.tool_calls).map(([tool, timing]) => `
+                                <div class="metric">
+                                    <span class="metric-value">${timing.count} × ${timing.p50}s</span>
+                                    <span class="metric-label">${tool} (calls × p50)</span>
+                                </div>
+                            `).join('')}
                             ${agentData.statistics.total_workflow_time ? `
                                 <div class="metric">
                                     <span class="metric-value">${agentData.statistics.total_workflow_time}s</span>
@@ -0,0 +1,69 @@
+import os
+import asyncio
+import random
+
+from azure.ai.agents.models import FilePurpose
+
+from scheduler import throttle_delay
+
+# Number of uploads allowed in flight at once (override with UPLOAD_CONCURRENCY)
+DEFAULT_UPLOAD_CONCURRENCY = int(os.environ.get("UPLOAD_CONCURRENCY", "8"))
+DEFAULT_UPLOAD_RETRIES = 3
+DEFAULT_UPLOAD_BACKOFF = 0.5
+
+
+async def upload_file(files_client, path, retries=DEFAULT_UPLOAD_RETRIES, backoff=DEFAULT_UPLOAD_BACKOFF):
+    """Upload a single file, retrying with exponential backoff and jitter"""
+    attempt = 0
+    while True:
+        try:
+            return await files_client.upload_and_poll(file_path=path, purpose=FilePurpose.AGENTS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # A 429 here has already been retried by the scheduler; retrying again would add to the load
+            if throttle_delay(e) is not None:
+                raise
+            attempt += 1
+            if attempt > retries:
+                raise
+            await asyncio.sleep(backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+
+
+async def upload_files(
+    files_client,
+    paths,
+    concurrency=None,
+    retries=DEFAULT_UPLOAD_RETRIES,
+    backoff=DEFAULT_UPLOAD_BACKOFF,
+    on_progress=None,
+):
+    """Upload files with bounded concurrency and return the file objects in input order.
+
+    ``files_client`` is ``project_client.agents.files`` (or anything exposing
+    ``upload_and_poll``). ``on_progress(done, total, path)`` is called after
+    each successful upload. If any file still fails after its retries, the
+    remaining uploads are cancelled and the error is raised.
+    """
+    paths = list(paths)
+    total = len(paths)
+    semaphore = asyncio.Semaphore(max(1, concurrency or DEFAULT_UPLOAD_CONCURRENCY))
+    done = 0
+
+    async def upload_one(path):
+        nonlocal done
+        async with semaphore:
+            file_obj = await upload_file(files_client, path, retries=retries, backoff=backoff)
+        done += 1
+        if on_progress:
+            on_progress(done, total, path)
+        return file_obj
+
+    tasks = [asyncio.ensure_future(upload_one(path)) for path in paths]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise